@@ -2,10 +2,32 @@
 Models for contentstore
 """
 # pylint: disable=no-member
+import json
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
 from django.db.models.fields import TextField
+from django.dispatch import receiver
 
 from config_models.models import ConfigurationModel
+from xmodule.modulestore.django import SignalHandler
+from xmodule_django.models import CourseKeyField
+
+# Seconds between a course being published and its search index being updated,
+# so that the publishes of a burst of edits are all indexed by one task
+SEARCH_INDEX_UPDATE_DELAY = 30
+
+# Seconds after which another update of a course's search index may be queued,
+# in case the one which was queued has been lost
+SEARCH_INDEX_UPDATE_LOCK_TIMEOUT = 10 * 60
+
+
+def search_index_update_lock_key(course_key):
+    """
+    The cache key which is set while an update of the course's search index is queued.
+    """
+    return u'contentstore.search_index_update.{}'.format(course_key)
 
 
 class VideoUploadConfig(ConfigurationModel):
@@ -19,3 +41,47 @@ class VideoUploadConfig(ConfigurationModel):
     def get_profile_whitelist(cls):
         """Get the list of profiles to include in the encoding download"""
         return [profile for profile in cls.current().profile_whitelist.split(",") if profile]
+
+
+class CoursewareIndexState(models.Model):
+    """
+    The version of each block of a course which was last added to the courseware
+    search index, so that the next update only indexes the blocks which changed.
+    """
+    course_id = CourseKeyField(max_length=255, db_index=True, unique=True)
+    # JSON object mapping usage ids to the versions returned by CoursewareSearchIndexer.index_course
+    indexed_versions = TextField(blank=True)
+    indexed = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def get_indexed_versions(cls, course_key):
+        """Get the versions of the blocks of the course in the index, or None if it was never indexed"""
+        try:
+            return json.loads(cls.objects.get(course_id=course_key).indexed_versions)
+        except (cls.DoesNotExist, ValueError):
+            return None
+
+    @classmethod
+    def set_indexed_versions(cls, course_key, indexed_versions):
+        """Record the versions of the blocks of the course in the index"""
+        state, __ = cls.objects.get_or_create(course_id=course_key)
+        state.indexed_versions = json.dumps(indexed_versions)
+        state.save()
+
+
+@receiver(SignalHandler.course_published)
+def listen_for_course_publish(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Update the courseware search index of the course in a celery task, once its
+    changes are published.
+
+    Only one update per course is queued at a time, and it waits
+    SEARCH_INDEX_UPDATE_DELAY seconds, so that it covers every publish made
+    until it starts.
+    """
+    if getattr(settings, 'SEARCH_ENGINE', None):
+        if not cache.add(search_index_update_lock_key(course_key), True, SEARCH_INDEX_UPDATE_LOCK_TIMEOUT):
+            return
+        # import here, because the tasks import the models
+        from contentstore.tasks import update_search_index
+        update_search_index.apply_async((unicode(course_key),), countdown=SEARCH_INDEX_UPDATE_DELAY)
@@ -4,13 +4,17 @@ This file contains celery tasks for contentstore views
 
 from celery.task import task
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils.translation import ugettext as _
 import json
 import logging
 from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.courseware_index import CoursewareSearchIndexer, SearchIndexingError
 from xmodule.course_module import CourseFields
 
 from xmodule.modulestore.exceptions import DuplicateCourseError, ItemNotFoundError
 from course_action_state.models import CourseRerunState
+from contentstore.models import CoursewareIndexState, search_index_update_lock_key
 from contentstore.utils import initialize_permissions
 from opaque_keys.edx.keys import CourseKey
 
@@ -61,6 +65,38 @@ def rerun_course(source_course_key_string, destination_course_key_string, user_i
         return "exception: " + unicode(exc)
 
 
+def index_course(course_key, incremental=True):
+    """
+    Bring the courseware search index of the course up to date, and record what it now holds.
+
+    Unless `incremental` is False, only the blocks which changed since the last
+    update are indexed again. Either way, the blocks deleted since are removed.
+    Raises SearchIndexingError if some of them could not be.
+    """
+    indexed_versions, error_list = CoursewareSearchIndexer.index_course(
+        modulestore(), course_key, CoursewareIndexState.get_indexed_versions(course_key), incremental
+    )
+    CoursewareIndexState.set_indexed_versions(course_key, indexed_versions)
+    if error_list:
+        raise SearchIndexingError(_('Error(s) present during indexing'), error_list)
+
+
+@task()
+def update_search_index(course_key_string):
+    """
+    Updates the courseware search index of a course in a new celery task, once it's been published.
+    """
+    course_key = CourseKey.from_string(course_key_string)
+    # Publishes from now on queue another update, as this one may not see them
+    cache.delete(search_index_update_lock_key(course_key))
+    try:
+        index_course(course_key)
+    except SearchIndexingError as exc:
+        logging.error(u'Search indexing error for course %s: %s', course_key_string, exc.error_list)
+        return "errors: " + u", ".join(exc.error_list)
+    return "succeeded"
+
+
 def deserialize_fields(json_fields):
     fields = json.loads(json_fields)
     for field_name, value in fields.iteritems():
@@ -22,7 +22,7 @@ from edxmako.shortcuts import render_to_response
 from xmodule.course_module import DEFAULT_START_DATE
 from xmodule.error_module import ErrorDescriptor
 from xmodule.modulestore.django import modulestore
-from xmodule.modulestore.courseware_index import CoursewareSearchIndexer, SearchIndexingError
+from xmodule.modulestore.courseware_index import SearchIndexingError
 from xmodule.contentstore.content import StaticContent
 from xmodule.tabs import PDFTextbookTabs
 from xmodule.partitions.partitions import UserPartition
@@ -60,7 +60,7 @@ from .component import (
     SPLIT_TEST_COMPONENT_TYPE,
     ADVANCED_COMPONENT_TYPES,
 )
-from contentstore.tasks import rerun_course
+from contentstore.tasks import rerun_course, index_course
 from contentstore.views.entrance_exam import create_entrance_exam, delete_entrance_exam
 
 from .library import LIBRARIES_ENABLED
@@ -133,7 +133,7 @@ def reindex_course_and_check_access(course_key, user):
     """
     if not has_course_author_access(user, course_key):
         raise PermissionDenied()
-    return CoursewareSearchIndexer.do_course_reindex(modulestore(), course_key)
+    return index_course(course_key, incremental=False)
 
 
 @login_required
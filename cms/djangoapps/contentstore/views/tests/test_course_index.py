@@ -12,10 +12,11 @@ from contentstore.utils import reverse_course_url, reverse_library_url, add_inst
 from student.auth import has_course_author_access
 from contentstore.views.course import course_outline_initial_state, reindex_course_and_check_access
 from contentstore.views.item import create_xblock_info, VisibilityState
+from contentstore.models import CoursewareIndexState, SEARCH_INDEX_UPDATE_DELAY, search_index_update_lock_key
 from course_action_state.models import CourseRerunState
 from util.date_utils import get_default_time_display
 from xmodule.modulestore import ModuleStoreEnum
-from xmodule.modulestore.courseware_index import CoursewareSearchIndexer
+from xmodule.modulestore.courseware_index import CoursewareSearchIndexer, DOCUMENT_TYPE
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory, LibraryFactory
@@ -24,6 +25,7 @@ from opaque_keys.edx.locator import CourseLocator
 from student.tests.factories import UserFactory
 from course_action_state.managers import CourseRerunUIStateManager
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from django.utils.translation import ugettext as _
 from search.api import perform_search
@@ -588,6 +590,81 @@ class TestCourseReIndex(CourseTestCase):
             course_id=unicode(self.course.id))
         self.assertEqual(response['total'], 1)
 
+    def test_index_only_changed_items(self):
+        """
+        Test that only the items which changed since the versions indexed last time are indexed again
+        """
+        versions, errors = CoursewareSearchIndexer.index_course(modulestore(), self.course.id)
+        self.assertEqual(errors, [])
+        self.assertIn(unicode(self.html.location), versions)
+
+        self.html.data = "<div>This is my changed HTML content</div>"
+        modulestore().update_item(self.html, ModuleStoreEnum.UserID.test)
+        modulestore().publish(self.html.location, ModuleStoreEnum.UserID.test)
+
+        with mock.patch('search.tests.mock_search_engine.MockSearchEngine.index') as mock_index:
+            new_versions, errors = CoursewareSearchIndexer.index_course(modulestore(), self.course.id, versions)
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            [call[0][1]['id'] for call in mock_index.call_args_list],
+            [unicode(self.html.location)]
+        )
+        self.assertNotEqual(new_versions[unicode(self.html.location)], versions[unicode(self.html.location)])
+
+    def test_index_removes_deleted_items(self):
+        """
+        Test that the items deleted since the versions indexed last time are removed from the index
+        """
+        versions, __ = CoursewareSearchIndexer.index_course(modulestore(), self.course.id)
+        modulestore().delete_item(
+            self.html.location, ModuleStoreEnum.UserID.test, revision=ModuleStoreEnum.RevisionOption.all
+        )
+
+        with mock.patch('search.tests.mock_search_engine.MockSearchEngine.remove') as mock_remove:
+            new_versions, errors = CoursewareSearchIndexer.index_course(modulestore(), self.course.id, versions)
+        self.assertEqual(errors, [])
+        mock_remove.assert_called_once_with(DOCUMENT_TYPE, unicode(self.html.location))
+        self.assertNotIn(unicode(self.html.location), new_versions)
+
+    def test_reindex_removes_deleted_items(self):
+        """
+        Test that a full reindex indexes every item again, and removes the items deleted since the last update
+        """
+        CoursewareIndexState.set_indexed_versions(
+            self.course.id, CoursewareSearchIndexer.index_course(modulestore(), self.course.id)[0]
+        )
+        modulestore().delete_item(
+            self.html.location, ModuleStoreEnum.UserID.test, revision=ModuleStoreEnum.RevisionOption.all
+        )
+
+        with mock.patch('search.tests.mock_search_engine.MockSearchEngine.index') as mock_index:
+            with mock.patch('search.tests.mock_search_engine.MockSearchEngine.remove') as mock_remove:
+                reindex_course_and_check_access(self.course.id, self.user)
+        self.assertIn(unicode(self.video.location), [call[0][1]['id'] for call in mock_index.call_args_list])
+        mock_remove.assert_called_once_with(DOCUMENT_TYPE, unicode(self.html.location))
+        self.assertNotIn(unicode(self.html.location), CoursewareIndexState.get_indexed_versions(self.course.id))
+
+    def test_publish_updates_index(self):
+        """
+        Test that publishing updates the index in a task, which records the versions indexed
+        """
+        CoursewareIndexState.objects.all().delete()
+        modulestore().publish(self.vertical.location, ModuleStoreEnum.UserID.test)
+        self.assertIn(unicode(self.html.location), CoursewareIndexState.get_indexed_versions(self.course.id))
+
+    def test_publishes_share_an_update(self):
+        """
+        Test that the publishes made while an update of the index is queued don't queue another one
+        """
+        cache.delete(search_index_update_lock_key(self.course.id))
+        with mock.patch('contentstore.tasks.update_search_index') as mock_update:
+            modulestore().publish(self.vertical.location, ModuleStoreEnum.UserID.test)
+            modulestore().publish(self.vertical.location, ModuleStoreEnum.UserID.test)
+        mock_update.apply_async.assert_called_once_with(
+            (unicode(self.course.id),), countdown=SEARCH_INDEX_UPDATE_DELAY
+        )
+        cache.delete(search_index_update_lock_key(self.course.id))
+
     @mock.patch('xmodule.video_module.VideoDescriptor.index_dictionary')
     def test_indexing_video_error_responses(self, mock_index_dictionary):
         """
@@ -1009,6 +1009,35 @@ class TestEditItem(TestEditItemSetup):
         self.assertIn("Incorrect RelativeTime value", parsed["error"])  # See xmodule/fields.py
 
 
+class TestEditItemAsyncInheritance(TestEditItemSetup):
+    """
+    Test xblock updates when Studio recomputes the metadata inheritance tree in the background.
+    """
+    def setUp(self):
+        super(TestEditItemAsyncInheritance, self).setUp()
+        draft_store = self.store._get_modulestore_by_type(ModuleStoreEnum.Type.mongo)
+        patcher = patch.object(draft_store, 'recompute_inheritance_async', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # don't start from the trees, flags and locks cached by other tests of the same course
+        draft_store.metadata_inheritance_cache_subsystem.clear()
+        self.addCleanup(draft_store.metadata_inheritance_cache_subsystem.clear)
+
+    @patch('xmodule.modulestore.mongo.base.threading.Thread')
+    def test_edit_burst(self, mock_thread):
+        """
+        A burst of edits starts one background recompute, and the author sees each edit at once.
+        """
+        for year in (2010, 2011, 2012):
+            self.client.ajax_post(
+                self.seq_update_url,
+                data={'metadata': {'due': '{}-11-22T04:00Z'.format(year)}}
+            )
+            problem = self.get_item_from_modulestore(self.problem_usage_key, verify_is_draft=True)
+            self.assertEqual(problem.due, datetime(year, 11, 22, 4, 0, tzinfo=UTC))
+        self.assertEqual(mock_thread.call_count, 1)
+
+
 class TestEditItemSplitMongo(TestEditItemSetup):
     """
     Tests for EditItem running on top of the SplitMongoModuleStore.
@@ -326,6 +326,9 @@ MODULESTORE = {
                         'default_class': 'xmodule.hidden_module.HiddenDescriptor',
                         'fs_root': DATA_DIR,
                         'render_template': 'edxmako.shortcuts.render_to_string',
+                        # Structures and definitions never change, so keep the most recently used in memory
+                        'structure_cache_size': 50,
+                        'definition_cache_size': 5000,
                     }
                 },
                 {
@@ -336,6 +339,8 @@ MODULESTORE = {
                         'default_class': 'xmodule.hidden_module.HiddenDescriptor',
                         'fs_root': DATA_DIR,
                         'render_template': 'edxmako.shortcuts.render_to_string',
+                        # Serve the last metadata inheritance tree while edits are recomputing it
+                        'recompute_inheritance_async': True,
                     }
                 }
             ]
@@ -343,6 +348,16 @@ MODULESTORE = {
     }
 }
 
+# Assets too big for memcache are copied to this local directory and served
+# from there, rather than being read from GridFS for every request.
+STATIC_CONTENT_DISK_CACHE = {
+    'DIRECTORY': os.path.join(tempfile.gettempdir(), 'edx_asset_cache'),
+    'MAX_SIZE': 2 * 1024 * 1024 * 1024,
+    'MAX_FILE_SIZE': 200 * 1024 * 1024,
+}
+# The size of the chunks in which assets are streamed to clients
+STATIC_CONTENT_STREAM_CHUNK_SIZE = 64 * 1024
+
 ############################ DJANGO_BUILTINS ################################
 # Change DEBUG/TEMPLATE_DEBUG in your environment settings files, not here
 DEBUG = False
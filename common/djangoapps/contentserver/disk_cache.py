@@ -0,0 +1,216 @@
+"""
+A local on-disk cache of assets which are too big for memcache.
+
+Assets are copied to the cache directory from GridFS by a background thread
+the first time they're served, and served from then on from a memory map of
+the file. The pages of a memory
+map belong to the OS page cache rather than to the worker, so serving large
+videos and PDFs doesn't grow the worker, and byte ranges are a slice away
+instead of another GridFS query.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from xmodule.contentstore.content import StaticContentStream
+
+log = logging.getLogger(__name__)
+
+
+def _cache_file_name(content):
+    """
+    The name of the file caching `content`. The last modification time is a
+    part of it, so replacing an asset never serves the stale file.
+    """
+    key = u'{}|{}'.format(unicode(content.location), content.last_modified_at.isoformat())
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+class AssetDiskCache(object):
+    """
+    A least-recently-used cache of asset files, bounded by their total size.
+
+    The cache directory may be shared by the workers of a host. Each worker
+    keeps its own index of the files in it (seeded from the directory when the
+    cache is created) and evicts by it, so the bound is approximate when
+    several workers write to the same directory.
+    """
+    def __init__(self, directory, max_size, max_file_size=None):
+        """
+        Arguments:
+            directory (str): Where the cached files are kept. Created if it doesn't exist.
+            max_size (int): The total size, in bytes, of the cached files.
+            max_file_size (int): The largest asset to cache. Defaults to `max_size`.
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.max_file_size = max_file_size if max_file_size is not None else max_size
+        self._files = OrderedDict()
+        self._size = 0
+        self._filling = set()
+        self._lock = threading.Lock()
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        # Seed the index with the files from earlier processes, oldest first
+        existing = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.startswith('.') or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            existing.append((stat.st_atime, name, stat.st_size))
+        for __, name, size in sorted(existing):
+            self._files[name] = size
+            self._size += size
+
+    def should_cache(self, content):
+        """
+        Whether `content` may be stored in this cache.
+        """
+        return (
+            content.length is not None and
+            0 < content.length <= self.max_file_size and
+            content.last_modified_at is not None
+        )
+
+    def get(self, content):
+        """
+        Return a StaticContentStream over the memory map of the cached copy of
+        `content`, or None if it isn't cached.
+
+        `content` only needs the attributes of the asset, not its data.
+        """
+        name = _cache_file_name(content)
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, 'rb') as cached_file:
+                data = mmap.mmap(cached_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, OSError, ValueError):
+            # Not cached, evicted by another worker, or empty
+            with self._lock:
+                self._forget(name)
+            return None
+
+        with self._lock:
+            if name in self._files:
+                self._files[name] = self._files.pop(name)
+            else:
+                self._files[name] = len(data)
+                self._size += len(data)
+        return self._stream(content, data)
+
+    def fill_in_background(self, content, load):
+        """
+        Copy the asset `content` to the cache on a background thread, unless
+        this process is already copying it. `load` is called on that thread,
+        and returns a new StaticContentStream of the asset to copy from, so
+        that `content` itself can go on being served.
+        """
+        if not self.should_cache(content):
+            return
+
+        name = _cache_file_name(content)
+        with self._lock:
+            if name in self._filling:
+                return
+            self._filling.add(name)
+
+        fill = threading.Thread(
+            target=self._fill, args=(name, content.location, load), name=u'fill-asset-cache-{}'.format(name)
+        )
+        fill.daemon = True
+        try:
+            fill.start()
+        except Exception:  # pylint: disable=broad-except
+            with self._lock:
+                self._filling.discard(name)
+            raise
+
+    def _fill(self, name, location, load):
+        """
+        Copy the StaticContentStream returned by `load` to the cache, then let
+        the asset `name` be copied again.
+        """
+        try:
+            cached = self.put(load())
+            cached.close()
+        except Exception:  # pylint: disable=broad-except
+            log.exception(u"Unable to cache asset %s on disk", unicode(location))
+        finally:
+            with self._lock:
+                self._filling.discard(name)
+
+    def put(self, content):
+        """
+        Copy the data of the StaticContentStream `content` to the cache, and
+        return a StaticContentStream reading the cached copy. `content` is
+        closed. Returns `content` itself if it can't be cached.
+        """
+        if not self.should_cache(content):
+            return content
+
+        name = _cache_file_name(content)
+        path = os.path.join(self.directory, name)
+        # Write to a temporary file and rename it, so that no other request
+        # ever sees a partly written file
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.')
+        try:
+            with os.fdopen(handle, 'wb') as temp_file:
+                for chunk in content.stream_data():
+                    temp_file.write(chunk)
+            os.rename(temp_path, path)
+        except (IOError, OSError):
+            log.exception(u"Unable to cache asset %s on disk", unicode(content.location))
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return content
+
+        with self._lock:
+            self._forget(name)
+            self._files[name] = content.length
+            self._size += content.length
+            self._evict()
+        content.close()
+        return self.get(content)
+
+    def _stream(self, content, data):
+        """
+        A StaticContentStream of `content` reading from `data`.
+        """
+        return StaticContentStream(
+            content.location, content.name, content.content_type, data,
+            last_modified_at=content.last_modified_at, thumbnail_location=content.thumbnail_location,
+            import_path=content.import_path, length=len(data), locked=content.locked,
+            content_digest=content.content_digest
+        )
+
+    def _forget(self, name):
+        """
+        Drop `name` from the index. The caller must hold the lock.
+        """
+        size = self._files.pop(name, None)
+        if size is not None:
+            self._size -= size
+
+    def _evict(self):
+        """
+        Remove the least recently used files until the cache fits in
+        `max_size`. The caller must hold the lock.
+
+        Files which are still being served stay readable until their memory
+        maps are closed.
+        """
+        while self._size > self.max_size and self._files:
+            name, size = self._files.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
@@ -2,15 +2,21 @@
 Middleware to serve assets.
 """
 
+import calendar
+import hashlib
 import logging
+from functools import partial
+from uuid import uuid4
 
+from django.conf import settings
 from django.http import (
     HttpResponse, HttpResponseNotModified, HttpResponseForbidden
 )
+from django.utils.http import http_date, parse_http_date_safe
 from student.models import CourseEnrollment
 
 from xmodule.assetstore.assetmgr import AssetManager
-from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG
+from xmodule.contentstore.content import StaticContent, StaticContentStream, XASSET_LOCATION_TAG
 from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.locator import AssetLocator
@@ -18,11 +24,146 @@ from cache_toolbox.core import get_cached_content, set_cached_content
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.exceptions import NotFoundError
 
+from contentserver.disk_cache import AssetDiskCache
+
 # TODO: Soon as we have a reasonable way to serialize/deserialize AssetKeys, we need
 # to change this file so instead of using course_id_partial, we're just using asset keys
 
 log = logging.getLogger(__name__)
 
+# The size of the chunks in which asset data is read and written out
+DEFAULT_STREAM_CHUNK_SIZE = 64 * 1024
+
+_DISK_CACHE = {}
+
+
+def get_asset_disk_cache():
+    """
+    Return the AssetDiskCache configured by the STATIC_CONTENT_DISK_CACHE
+    setting, or None if it isn't configured.
+    """
+    config = getattr(settings, 'STATIC_CONTENT_DISK_CACHE', None)
+    if not config or not config.get('DIRECTORY'):
+        return None
+    directory = config['DIRECTORY']
+    if directory not in _DISK_CACHE:
+        _DISK_CACHE[directory] = AssetDiskCache(directory, config['MAX_SIZE'], config.get('MAX_FILE_SIZE'))
+    return _DISK_CACHE[directory]
+
+
+def get_etag(content):
+    """
+    Returns the strong entity tag of the asset `content`: the md5 of its data
+    computed by GridFS. Assets cached before the md5 was kept get one which
+    changes whenever the asset is replaced, as that updates its last
+    modification time.
+    """
+    content_digest = getattr(content, 'content_digest', None)
+    if content_digest is None:
+        key = u'{}|{}|{}'.format(unicode(content.location), content.last_modified_at.isoformat(), content.length)
+        content_digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+    return '"{}"'.format(content_digest)
+
+
+def etag_matches(etag, header_value):
+    """
+    Whether `etag` is one of the entity tags listed in the If-None-Match
+    header `header_value`.
+    """
+    etags = [value.strip() for value in header_value.split(',')]
+    # Weak comparison, as is the rule for If-None-Match
+    return '*' in etags or etag in etags or 'W/' + etag in etags
+
+
+def not_modified_since(header_value, last_modified, legacy_last_modified_str):
+    """
+    Whether the asset last modified at the timestamp `last_modified` hasn't
+    been modified since the date in the If-Modified-Since header `header_value`.
+
+    Dates in the format previously sent in Last-Modified,
+    `legacy_last_modified_str`, are still recognized.
+    """
+    if header_value == legacy_last_modified_str:
+        return True
+    # Only the part before any ';length=' extension is the date
+    if_modified_since = parse_http_date_safe(header_value.split(';')[0].strip())
+    return if_modified_since is not None and last_modified <= if_modified_since
+
+
+def if_range_matches(header_value, etag, last_modified_str, legacy_last_modified_str):
+    """
+    Whether the If-Range header `header_value` validates the current
+    representation of the asset, in which case its Range header is honoured.
+
+    If-Range requires strong comparisons: an entity tag must be the same as
+    `etag`, and a date must be exactly the last modification date.
+    """
+    header_value = header_value.strip()
+    if header_value.startswith('"') or header_value.startswith('W/'):
+        return header_value == etag
+    return header_value in (last_modified_str, legacy_last_modified_str)
+
+
+def coalesce_ranges(ranges, content_length):
+    """
+    Returns the satisfiable ranges out of the (first, last) tuples `ranges`,
+    sorted, with overlapping and adjacent ranges merged. This serves clients
+    asking for many small or overlapping ranges with as few parts as possible.
+    """
+    satisfiable = sorted(
+        (first, last) for first, last in ranges if 0 <= first <= last < content_length
+    )
+    coalesced = []
+    for first, last in satisfiable:
+        if coalesced and first <= coalesced[-1][1] + 1:
+            coalesced[-1] = (coalesced[-1][0], max(coalesced[-1][1], last))
+        else:
+            coalesced.append((first, last))
+    return coalesced
+
+
+def multipart_byteranges(content, ranges, boundary, chunk_size):
+    """
+    Returns an iterator over the `multipart/byteranges` body of the parts of
+    `content` in `ranges`, and the length of that body.
+
+    The data of each part is streamed straight from `content`, so only a chunk
+    of it is in memory at a time.
+    See http://www.w3.org/Protocols/rfc2616/rfc2616-sec19.html#sec19.2
+    """
+    content_type = content.content_type
+    if isinstance(content_type, unicode):
+        content_type = content_type.encode('utf-8')
+    part_header_format = (
+        '\r\n--{boundary}\r\n'
+        'Content-Type: {content_type}\r\n'
+        'Content-Range: bytes {first}-{last}/{length}\r\n\r\n'
+    )
+    part_headers = [
+        part_header_format.format(
+            boundary=boundary, content_type=content_type, first=first, last=last, length=content.length
+        )
+        for first, last in ranges
+    ]
+    closing = '\r\n--{boundary}--\r\n'.format(boundary=boundary)
+    body_length = (
+        sum(len(header) for header in part_headers) +
+        sum(last - first + 1 for first, last in ranges) +
+        len(closing)
+    )
+
+    def body():
+        """
+        The parts, one after another.
+        """
+        for part_header, (first, last) in zip(part_headers, ranges):
+            yield part_header
+            for chunk in content.stream_data_in_range(first, last, chunk_size):
+                yield chunk
+        yield closing
+
+    return body(), body_length
+
 
 class StaticContentServer(object):
     def process_request(self, request):
@@ -51,7 +192,8 @@ class StaticContentServer(object):
                     return response
 
                 # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
-                # this is because I haven't been able to find a means to stream data out of memcached
+                # this is because I haven't been able to find a means to stream data out of memcached.
+                # Bigger assets may go in the disk cache, once we know that they're going to be served.
                 if content.length is not None:
                     if content.length < 1048576:
                         # since we've queried as a stream, let's read in the stream into memory to set in cache
@@ -76,28 +218,44 @@ class StaticContentServer(object):
                         return HttpResponseForbidden('Unauthorized')
 
             # convert over the DB persistent last modified timestamp to a HTTP compatible
-            # timestamp, so we can simply compare the strings
-            last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
+            # timestamp. Clients may send back the format we used to send, so keep it around.
+            last_modified = calendar.timegm(content.last_modified_at.utctimetuple())
+            last_modified_str = http_date(last_modified)
+            legacy_last_modified_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
+
+            etag = get_etag(content)
 
-            # see if the client has cached this content, if so then compare the
-            # timestamps, if they are the same then just return a 304 (Not Modified)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
-                if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
-                if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
+            # see if the client has cached this content, if so then compare the entity tags
+            # or, failing that, the timestamps, and if they match just return a 304 (Not Modified)
+            if 'HTTP_IF_NONE_MATCH' in request.META:
+                if etag_matches(etag, request.META['HTTP_IF_NONE_MATCH']):
+                    return self._not_modified(etag, last_modified_str)
+            elif 'HTTP_IF_MODIFIED_SINCE' in request.META:
+                if not_modified_since(
+                    request.META['HTTP_IF_MODIFIED_SINCE'], last_modified, legacy_last_modified_str
+                ):
+                    return self._not_modified(etag, last_modified_str)
+
+            # Serve assets too big for memcache from the disk cache, rather than from GridFS
+            if isinstance(content, StaticContentStream):
+                content = self._from_disk_cache(content)
+            chunk_size = getattr(settings, 'STATIC_CONTENT_STREAM_CHUNK_SIZE', DEFAULT_STREAM_CHUNK_SIZE)
 
             # *** File streaming within a byte range ***
             # If a Range is provided, parse Range attribute of the request
             # Add Content-Range in the response if Range is structurally correct
-            # Request -> Range attribute structure: "Range: bytes=first-[last]"
-            # Response -> Content-Range attribute structure: "Content-Range: bytes first-last/totalLength"
+            # Request -> Range attribute structure: "Range: bytes=first-[last](, first-[last])*"
+            # Response -> Content-Range attribute structure: "Content-Range: bytes first-last/totalLength",
+            # in the headers of each part of a multipart/byteranges response if there are several ranges.
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
+            # If-Range makes the Range conditional: if the asset has changed, the full content is sent instead.
+            # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.27
             response = None
-            if request.META.get('HTTP_RANGE'):
-                # Data from cache (StaticContent) has no easy byte management, so we use the DB instead (StaticContentStream)
-                if type(content) == StaticContent:
-                    content = AssetManager.find(loc, as_stream=True)
-
+            if request.META.get('HTTP_RANGE') and (
+                'HTTP_IF_RANGE' not in request.META or if_range_matches(
+                    request.META['HTTP_IF_RANGE'], etag, last_modified_str, legacy_last_modified_str
+                )
+            ):
                 header_value = request.META['HTTP_RANGE']
                 try:
                     unit, ranges = parse_range_header(header_value, content.length)
@@ -110,42 +268,73 @@ class StaticContentServer(object):
                     if unit != 'bytes':
                         # Only accept ranges in bytes
                         log.warning(u"Unknown unit in Range header: %s for content: %s", header_value, unicode(loc))
-                    elif len(ranges) > 1:
-                        # According to Http/1.1 spec content for multiple ranges should be sent as a multipart message.
-                        # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
-                        # But we send back the full content.
-                        log.warning(
-                            u"More than 1 ranges in Range header: %s for content: %s", header_value, unicode(loc)
-                        )
                     else:
-                        first, last = ranges[0]
-
-                        if 0 <= first <= last < content.length:
-                            # If the byte range is satisfiable
-                            response = HttpResponse(content.stream_data_in_range(first, last))
+                        ranges = coalesce_ranges(ranges, content.length)
+                        if not ranges:
+                            log.warning(
+                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
+                            )
+                            response = HttpResponse(status=416)  # Requested Range Not Satisfiable
+                            response['Content-Range'] = 'bytes */{length}'.format(length=content.length)
+                            return response
+                        elif len(ranges) == 1:
+                            first, last = ranges[0]
+                            response = HttpResponse(content.stream_data_in_range(first, last, chunk_size))
                             response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
                                 first=first, last=last, length=content.length
                             )
                             response['Content-Length'] = str(last - first + 1)
-                            response.status_code = 206  # Partial Content
+                            response['Content-Type'] = content.content_type
                         else:
-                            log.warning(
-                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
-                            )
-                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                            # According to Http/1.1 spec content for multiple ranges should be sent as a
+                            # multipart message.
+                            # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
+                            boundary = uuid4().hex
+                            body, body_length = multipart_byteranges(content, ranges, boundary, chunk_size)
+                            response = HttpResponse(body)
+                            response['Content-Length'] = str(body_length)
+                            response['Content-Type'] = 'multipart/byteranges; boundary={}'.format(boundary)
+                        response.status_code = 206  # Partial Content
 
             # If Range header is absent or syntactically invalid return a full content response.
             if response is None:
-                response = HttpResponse(content.stream_data())
+                response = HttpResponse(content.stream_data(chunk_size))
                 response['Content-Length'] = content.length
+                response['Content-Type'] = content.content_type
 
             # "Accept-Ranges: bytes" tells the user that only "bytes" ranges are allowed
             response['Accept-Ranges'] = 'bytes'
-            response['Content-Type'] = content.content_type
-            response['Last-Modified'] = last_modified_at_str
+            response['Last-Modified'] = last_modified_str
+            response['ETag'] = etag
 
             return response
 
+    def _not_modified(self, etag, last_modified_str):
+        """
+        A 304 (Not Modified) response, with the validators of the asset.
+        """
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['Last-Modified'] = last_modified_str
+        return response
+
+    def _from_disk_cache(self, content):
+        """
+        Return the StaticContentStream `content`, read from GridFS, as a
+        StaticContentStream over its copy in the disk cache. If it isn't
+        cached yet, start copying it there in the background, and return
+        `content`, so that this request is served from GridFS without waiting.
+        """
+        disk_cache = get_asset_disk_cache()
+        if disk_cache is None or not disk_cache.should_cache(content):
+            return content
+        cached = disk_cache.get(content)
+        if cached is None:
+            disk_cache.fill_in_background(content, partial(AssetManager.find, content.location, as_stream=True))
+            return content
+        content.close()
+        return cached
+
 
 def parse_range_header(header_value, content_length):
     """
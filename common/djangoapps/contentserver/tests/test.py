@@ -17,7 +17,7 @@ from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.xml_importer import import_from_xml
 
-from contentserver.middleware import parse_range_header
+from contentserver.middleware import coalesce_ranges, parse_range_header
 from student.models import CourseEnrollment
 
 log = logging.getLogger(__name__)
@@ -110,6 +110,31 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
         resp = self.client.get(self.url_locked)
         self.assertEqual(resp.status_code, 200)
 
+    def test_etag(self):
+        """
+        Test that a request with the entity tag of the asset outputs 304 Not Modified.
+        """
+        resp = self.client.get(self.url_unlocked)
+        etag = resp['ETag']
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], etag)
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"other", {}'.format(etag))
+        self.assertEqual(resp.status_code, 304)
+
+    def test_etag_mismatch(self):
+        """
+        Test that a request with another entity tag outputs the full content,
+        even if the timestamps match.
+        """
+        resp = self.client.get(self.url_unlocked)
+        resp = self.client.get(
+            self.url_unlocked, HTTP_IF_NONE_MATCH='"other"', HTTP_IF_MODIFIED_SINCE=resp['Last-Modified']
+        )
+        self.assertEqual(resp.status_code, 200)
+
     def test_range_request_full_file(self):
         """
         Test that a range request from byte 0 to last,
@@ -146,7 +171,8 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
 
     def test_range_request_multiple_ranges(self):
         """
-        Test that multiple ranges in request outputs the full content.
+        Test that multiple ranges in request outputs a multipart/byteranges message
+        with a part for each range.
         """
         first_byte = self.length_unlocked / 4
         last_byte = self.length_unlocked / 2
@@ -154,9 +180,53 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
             first=first_byte, last=last_byte)
         )
 
-        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.status_code, 206)
         self.assertNotIn('Content-Range', resp)
-        self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+        self.assertTrue(resp['Content-Type'].startswith('multipart/byteranges; boundary='))
+        self.assertEqual(resp['Content-Length'], str(len(resp.content)))
+        for first, last in ((first_byte, last_byte), (self.length_unlocked - 100, self.length_unlocked - 1)):
+            self.assertIn(
+                'Content-Range: bytes {first}-{last}/{length}'.format(
+                    first=first, last=last, length=self.length_unlocked
+                ),
+                resp.content
+            )
+
+    def test_range_request_overlapping_ranges(self):
+        """
+        Test that overlapping ranges are merged into a single range.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-99, 50-199')
+
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp['Content-Range'], 'bytes 0-199/{length}'.format(length=self.length_unlocked))
+        self.assertEqual(resp['Content-Length'], '200')
+
+    def test_if_range(self):
+        """
+        Test that Range is honoured only if If-Range matches the asset.
+        """
+        resp = self.client.get(self.url_unlocked)
+        etag, last_modified = resp['ETag'], resp['Last-Modified']
+
+        for if_range in (etag, last_modified):
+            resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-99', HTTP_IF_RANGE=if_range)
+            self.assertEqual(resp.status_code, 206)
+
+        for if_range in ('"other"', 'W/' + etag, 'Thu, 01 Jan 1970 00:00:00 GMT'):
+            resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-99', HTTP_IF_RANGE=if_range)
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+
+    def test_if_modified_since(self):
+        """
+        Test that If-Modified-Since is compared as a date, not as a string.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(resp.status_code, 304)
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE='Thu, 01 Jan 1970 00:00:00 GMT')
+        self.assertEqual(resp.status_code, 200)
 
     @ddt.data(
         'bytes 0-',
@@ -191,6 +261,7 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
             first=(self.length_unlocked), last=(self.length_unlocked))
         )
         self.assertEqual(resp.status_code, 416)
+        self.assertEqual(resp['Content-Range'], 'bytes */{length}'.format(length=self.length_unlocked))
 
 
 @ddt.ddt
@@ -236,3 +307,21 @@ class ParseRangeHeaderTestCase(unittest.TestCase):
         self.assertRaisesRegexp(
             exception_class, exception_message_regex, parse_range_header, header_value, self.content_length
         )
+
+
+@ddt.ddt
+class CoalesceRangesTestCase(unittest.TestCase):
+    """
+    Tests for the coalesce_ranges function.
+    """
+    @ddt.data(
+        ([(100, 199)], [(100, 199)]),
+        ([(200, 299), (100, 199)], [(100, 299)]),
+        ([(100, 199), (150, 249), (500, 599)], [(100, 249), (500, 599)]),
+        ([(100, 999), (200, 299)], [(100, 999)]),
+        ([(100, 199), (10000, 10099), (300, 200)], [(100, 199)]),
+        ([(10000, 10099)], []),
+    )
+    @ddt.unpack
+    def test_coalesce_ranges(self, ranges, expected_ranges):
+        self.assertEqual(coalesce_ranges(ranges, 10000), expected_ranges)
@@ -0,0 +1,94 @@
+"""
+Tests for the disk cache of assets.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from StringIO import StringIO
+
+from mock import patch
+
+from opaque_keys.edx.locations import SlashSeparatedCourseKey
+from xmodule.contentstore.content import StaticContentStream
+
+from contentserver.disk_cache import AssetDiskCache
+
+
+class AssetDiskCacheTestCase(unittest.TestCase):
+    """
+    Tests of AssetDiskCache.
+    """
+    def setUp(self):
+        super(AssetDiskCacheTestCase, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+
+    def _content(self, name, data, last_modified_at=datetime(2014, 1, 1)):
+        """
+        A StaticContentStream of `data`, as read from GridFS.
+        """
+        return StaticContentStream(
+            self.course_key.make_asset_key('asset', name), name, 'video/mp4', StringIO(data),
+            last_modified_at=last_modified_at, length=len(data)
+        )
+
+    def test_put_and_get(self):
+        cache = AssetDiskCache(self.directory, 1000)
+        self.assertIsNone(cache.get(self._content('video.mp4', 'x' * 100)))
+
+        cached = cache.put(self._content('video.mp4', 'abcdefghij'))
+        self.assertEqual(''.join(cached.stream_data()), 'abcdefghij')
+
+        cached = cache.get(self._content('video.mp4', ''))
+        self.assertEqual(cached.length, 10)
+        self.assertEqual(''.join(cached.stream_data_in_range(2, 4)), 'cde')
+
+    def test_replaced_asset_not_served(self):
+        cache = AssetDiskCache(self.directory, 1000)
+        cache.put(self._content('video.mp4', 'old'))
+        self.assertIsNone(cache.get(self._content('video.mp4', 'new', last_modified_at=datetime(2014, 2, 1))))
+
+    def test_least_recently_used_evicted(self):
+        cache = AssetDiskCache(self.directory, 25)
+        cache.put(self._content('first.mp4', 'a' * 10))
+        cache.put(self._content('second.mp4', 'b' * 10))
+        cache.get(self._content('first.mp4', ''))
+        cache.put(self._content('third.mp4', 'c' * 10))
+
+        self.assertIsNotNone(cache.get(self._content('first.mp4', '')))
+        self.assertIsNone(cache.get(self._content('second.mp4', '')))
+        self.assertIsNotNone(cache.get(self._content('third.mp4', '')))
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+    def test_too_big_not_cached(self):
+        cache = AssetDiskCache(self.directory, 1000, max_file_size=5)
+        content = self._content('video.mp4', 'abcdefghij')
+        self.assertIs(cache.put(content), content)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_files_of_earlier_processes_indexed(self):
+        AssetDiskCache(self.directory, 25).put(self._content('first.mp4', 'a' * 10))
+        cache = AssetDiskCache(self.directory, 25)
+        cache.put(self._content('second.mp4', 'b' * 10))
+        cache.put(self._content('third.mp4', 'c' * 10))
+        self.assertIsNone(cache.get(self._content('first.mp4', '')))
+
+    @patch('contentserver.disk_cache.threading.Thread')
+    def test_fill_in_background(self, mock_thread):
+        cache = AssetDiskCache(self.directory, 1000)
+        content = self._content('video.mp4', 'abcdefghij')
+        cache.fill_in_background(content, lambda: self._content('video.mp4', 'abcdefghij'))
+        # A second request for the asset doesn't copy it again while it's being copied
+        cache.fill_in_background(content, lambda: self._content('video.mp4', 'abcdefghij'))
+        self.assertEqual(mock_thread.call_count, 1)
+        self.assertIsNone(cache.get(content))
+        # The request's own stream is left to be served
+        self.assertEqual(''.join(content.stream_data()), 'abcdefghij')
+
+        cache._fill(*mock_thread.call_args[1]['args'])  # pylint: disable=protected-access
+        self.assertEqual(''.join(cache.get(content).stream_data()), 'abcdefghij')
+        cache.fill_in_background(content, lambda: self._content('video.mp4', 'abcdefghij'))
+        self.assertEqual(mock_thread.call_count, 2)
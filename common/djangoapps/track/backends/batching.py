@@ -0,0 +1,200 @@
+"""
+Event tracker backend that queues events in memory and sends them to another
+backend in batches, from a background thread.
+
+Sending an event then only costs putting it in a queue, instead of a write to
+a database or a log in the request. It's configured around the backend it
+sends to::
+
+  TRACKING_BACKENDS = {
+      'mongo': {
+          'ENGINE': 'track.backends.batching.BatchingBackend',
+          'OPTIONS': {
+              'backend': {
+                  'ENGINE': 'track.backends.mongodb.MongoBackend',
+                  'OPTIONS': {...},
+              },
+              'max_queue_size': 10000,
+              'flush_size': 100,
+              'flush_interval': 1,
+              'overflow': 'drop',
+          }
+      }
+  }
+
+Events still queued when the process exits are sent on the way out, but the
+ones queued in a process which is killed are lost.
+"""
+
+from __future__ import absolute_import
+
+import atexit
+import logging
+import os
+import Queue
+import threading
+import time
+from importlib import import_module
+
+import dogstats_wrapper as dog_stats_api
+
+from track.backends import BaseBackend
+
+
+log = logging.getLogger(__name__)
+
+OVERFLOW_DROP = 'drop'
+OVERFLOW_BLOCK = 'block'
+
+
+def _instantiate_backend(config):
+    """
+    Instantiate a backend from its ENGINE and OPTIONS configuration.
+    """
+    module_name, __, class_name = config['ENGINE'].rpartition('.')
+    try:
+        cls = getattr(import_module(module_name), class_name)
+    except (ValueError, AttributeError, ImportError):
+        raise ValueError('Cannot find event track backend %s' % config['ENGINE'])
+    return cls(**config.get('OPTIONS', {}))
+
+
+def send_batch(backend, events):
+    """
+    Send a list of events with the backend's send_batch if it has one, or one
+    at a time otherwise.
+    """
+    if hasattr(backend, 'send_batch'):
+        backend.send_batch(events)
+    else:
+        for event in events:
+            backend.send(event)
+
+
+class BatchingBackend(BaseBackend):
+    """
+    Event tracker backend that sends events to another backend in batches.
+    """
+
+    def __init__(self, backend, max_queue_size=10000, flush_size=100, flush_interval=1.0,
+                 overflow=OVERFLOW_DROP, block_timeout=None, **kwargs):
+        """
+        :Parameters:
+
+          - `backend`: the ENGINE and OPTIONS of the backend to send to
+          - `max_queue_size`: the number of events waiting to be sent
+            above which the queue overflows
+          - `flush_size`: the largest number of events sent at once
+          - `flush_interval`: the longest time, in seconds, an event waits
+            for a batch to fill up
+          - `overflow`: 'drop' to drop events sent while the queue is full,
+            or 'block' to wait until there's room in the queue
+          - `block_timeout`: with 'block', the longest time, in seconds, to
+            wait before dropping the event, or None to wait as long as it takes
+
+        """
+        super(BatchingBackend, self).__init__(**kwargs)
+
+        if overflow not in (OVERFLOW_DROP, OVERFLOW_BLOCK):
+            raise ValueError('Invalid overflow policy %s' % overflow)
+
+        self.backend = _instantiate_backend(backend)
+        self.name = backend['ENGINE'].rpartition('.')[2]
+        self.max_queue_size = max_queue_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+
+        self._queue = Queue.Queue(max_queue_size)
+        self._dropped = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        atexit.register(self.flush)
+
+    def _start(self):
+        """
+        Start the flusher thread, unless it's running in this process already.
+        """
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # We've been forked: the events queued so far are the parent's to send.
+                self._queue = Queue.Queue(self.max_queue_size)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='track-batching-{}'.format(self.name))
+            self._thread.daemon = True
+            self._thread.start()
+
+    def send(self, event):
+        """Queue the event to be sent in a batch."""
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            self._start()
+
+        try:
+            if self.overflow == OVERFLOW_BLOCK:
+                self._queue.put(event, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+        except Queue.Full:
+            with self._lock:
+                self._dropped += 1
+
+    def _next_batch(self, timeout):
+        """
+        Return the next batch of at most `flush_size` events, waiting at most
+        `timeout` seconds for it to fill up.
+        """
+        batch = []
+        deadline = time.time() + timeout
+        while len(batch) < self.flush_size:
+            remaining = deadline - time.time()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except Queue.Empty:
+                break
+        return batch
+
+    def _send_batch(self, batch):
+        """
+        Send the batch of events to the backend, and report the state of the queue.
+        """
+        tags = [u'backend:{}'.format(self.name)]
+        with self._lock:
+            dropped, self._dropped = self._dropped, 0
+        dog_stats_api.gauge('track.batching.queue_depth', self._queue.qsize(), tags=tags)
+        dog_stats_api.gauge('track.batching.dropped', dropped, tags=tags)
+        if dropped:
+            log.warning(u"Dropped %d events for the %s tracking backend: its queue is full", dropped, self.name)
+        if not batch:
+            return
+
+        dog_stats_api.histogram('track.batching.batch_size', len(batch), tags=tags)
+        try:
+            with dog_stats_api.timer('track.batching.send', tags=tags):
+                send_batch(self.backend, batch)
+        except Exception:  # pylint: disable=broad-except
+            log.exception(u"Error sending %d events to the %s tracking backend", len(batch), self.name)
+
+    def _run(self):
+        """
+        Send the queued events in batches, forever.
+        """
+        while True:
+            self._send_batch(self._next_batch(self.flush_interval))
+
+    def flush(self):
+        """
+        Send every queued event now, from the calling thread.
+        """
+        while True:
+            batch = self._next_batch(0)
+            if not batch:
+                return
+            self._send_batch(batch)
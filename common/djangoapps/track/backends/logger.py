@@ -3,12 +3,11 @@
 from __future__ import absolute_import
 
 import logging
-import json
 
 from django.conf import settings
 
 from track.backends import BaseBackend
-from track.utils import DateTimeJSONEncoder
+from track.utils import serialize_event
 
 log = logging.getLogger('track.backends.logger')
 
@@ -33,7 +32,7 @@ class LoggerBackend(BaseBackend):
         self.event_logger = logging.getLogger(name)
 
     def send(self, event):
-        event_str = json.dumps(event, cls=DateTimeJSONEncoder)
+        event_str = serialize_event(event)
 
         # TODO: remove trucation of the serialized event, either at a
         # higher level during the emittion of the event, or by
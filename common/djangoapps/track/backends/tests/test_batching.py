@@ -0,0 +1,67 @@
+from __future__ import absolute_import
+
+import time
+
+from mock import patch
+
+from django.test import TestCase
+
+from track.backends.batching import BatchingBackend
+
+
+IN_MEMORY_BACKEND = {'ENGINE': 'track.tests.InMemoryBackend'}
+
+
+class TestBatchingBackend(TestCase):
+    def create_backend(self, **options):
+        backend = BatchingBackend(IN_MEMORY_BACKEND, **options)
+        self.addCleanup(backend.flush)
+        return backend
+
+    def test_events_sent_from_thread(self):
+        backend = self.create_backend(flush_interval=0.01)
+        events = [{'test': i} for i in xrange(5)]
+        for event in events:
+            backend.send(event)
+
+        deadline = time.time() + 5
+        while len(backend.backend.events) < len(events) and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(backend.backend.events, events)
+
+    @patch.object(BatchingBackend, '_start')
+    def test_events_sent_in_batches(self, _start):
+        backend = self.create_backend(flush_size=2)
+        with patch.object(backend.backend, 'send_batch', create=True) as send_batch:
+            for i in xrange(5):
+                backend.send({'test': i})
+            backend.flush()
+
+        batch_sizes = [len(call[0][0]) for call in send_batch.call_args_list]
+        self.assertEqual(batch_sizes, [2, 2, 1])
+
+    @patch.object(BatchingBackend, '_start')
+    @patch('track.backends.batching.dog_stats_api')
+    def test_overflow_drops_events(self, dog_stats_api, _start):
+        backend = self.create_backend(max_queue_size=2)
+        for i in xrange(3):
+            backend.send({'test': i})
+        backend.flush()
+
+        self.assertEqual(backend.backend.events, [{'test': 0}, {'test': 1}])
+        dog_stats_api.gauge.assert_any_call('track.batching.dropped', 1, tags=['backend:InMemoryBackend'])
+
+    @patch.object(BatchingBackend, '_start')
+    def test_overflow_blocks(self, _start):
+        backend = self.create_backend(max_queue_size=1, overflow='block', block_timeout=0.01)
+        start = time.time()
+        backend.send({'test': 0})
+        backend.send({'test': 1})
+        self.assertGreaterEqual(time.time() - start, 0.01)
+
+        backend.flush()
+        self.assertEqual(backend.backend.events, [{'test': 0}])
+
+    def test_invalid_overflow(self):
+        with self.assertRaises(ValueError):
+            BatchingBackend(IN_MEMORY_BACKEND, overflow='explode')
@@ -0,0 +1,63 @@
+"""
+Compare the time taken to serialize a typical tracking event with
+json.dumps and DateTimeJSONEncoder, and with track.utils.serialize_event.
+"""
+
+from datetime import datetime
+import json
+from optparse import make_option
+import timeit
+
+from django.core.management.base import BaseCommand
+from pytz import UTC
+
+from track.utils import DateTimeJSONEncoder, serialize_event
+
+
+def video_event():
+    """
+    Return a legacy video event, as logged by the LMS.
+    """
+    return {
+        'username': 'student',
+        'session': '1d3a6f6c5a1ec1b5fcf2c4f4a4e0b0e3',
+        'ip': '127.0.0.1',
+        'agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/40.0 Safari/537.36',
+        'host': 'courses.example.com',
+        'referer': 'https://courses.example.com/courses/edX/DemoX/Demo_Course/courseware/intro/video/',
+        'accept_language': 'en-US,en;q=0.8',
+        'event_source': 'browser',
+        'event_type': 'play_video',
+        'event': '{"id":"i4x-edX-DemoX-video-0b9e39477cf34507a7a48f74be381fdd","currentTime":12.35,"code":"html5"}',
+        'page': 'https://courses.example.com/courses/edX/DemoX/Demo_Course/courseware/intro/video/',
+        'time': datetime.now(UTC),
+        'context': {
+            'course_id': 'edX/DemoX/Demo_Course',
+            'org_id': 'edX',
+            'user_id': 42,
+            'path': '/event',
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmark the serialization of tracking events.\n"
+    help += "Usage: benchmark_event_serialization [--number N]"
+
+    option_list = BaseCommand.option_list + (
+        make_option('-n', '--number',
+                    type='int',
+                    default=100000,
+                    help='Number of events to serialize with each serializer'),
+    )
+
+    def handle(self, *args, **options):
+        number = options['number']
+        event = video_event()
+        serializers = [
+            ('json.dumps', lambda: json.dumps(event, cls=DateTimeJSONEncoder)),
+            ('serialize_event', lambda: serialize_event(event)),
+        ]
+        for name, serialize in serializers:
+            seconds = min(timeit.repeat(serialize, number=number, repeat=3))
+            self.stdout.write("{:<16} {:.2f} us per event\n".format(name, seconds * 1000000 / number))
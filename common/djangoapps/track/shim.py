@@ -1,11 +1,12 @@
 """Map new event context values to old top-level field values. Ensures events can be parsed by legacy parsers."""
 
-import json
 import logging
 
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import UsageKey
 
+from track.utils import serialize_event
+
 
 log = logging.getLogger(__name__)
 
@@ -19,6 +20,10 @@ CONTEXT_FIELDS_TO_INCLUDE = [
     'accept_language'
 ]
 
+# These fields are present elsewhere in the event once they're moved out of the context,
+# and client_id is only used for Segment.io web analytics and does not concern researchers
+CONTEXT_FIELDS_TO_REMOVE = frozenset(CONTEXT_FIELDS_TO_INCLUDE + ['client_id'])
+
 
 class LegacyFieldMappingProcessor(object):
     """Ensures all required fields are included in emitted events"""
@@ -62,11 +67,7 @@ class LegacyFieldMappingProcessor(object):
 def remove_shim_context(event):
     if 'context' in event:
         context = event['context']
-        # These fields are present elsewhere in the event at this point
-        context_fields_to_remove = set(CONTEXT_FIELDS_TO_INCLUDE)
-        # This field is only used for Segment.io web analytics and does not concern researchers
-        context_fields_to_remove.add('client_id')
-        for field in context_fields_to_remove:
+        for field in CONTEXT_FIELDS_TO_REMOVE:
             if field in context:
                 del context[field]
 
@@ -122,7 +123,7 @@ class VideoEventProcessor(object):
         if 'current_time' in payload:
             payload['currentTime'] = payload.pop('current_time')
 
-        event['event'] = json.dumps(payload)
+        event['event'] = serialize_event(payload)
 
         if 'context' not in event:
             return
@@ -1,11 +1,12 @@
 from datetime import datetime
 import json
 
-from pytz import UTC
+from mock import patch
+from pytz import UTC, timezone
 
 from django.test import TestCase
 
-from track.utils import DateTimeJSONEncoder
+from track.utils import DateTimeJSONEncoder, serialize_event
 
 
 class TestDateTimeJSONEncoder(TestCase):
@@ -35,3 +36,30 @@ class TestDateTimeJSONEncoder(TestCase):
         self.assertEqual(from_json['a_datetime'], an_iso_datetime)
         self.assertEqual(from_json['a_tz_datetime'], an_iso_datetime)
         self.assertEqual(from_json['a_date'], an_iso_date)
+
+
+class TestSerializeEvent(TestCase):
+    event = {
+        'number': 100,
+        'float': 12.35,
+        'string': 'hello',
+        'unicode': u'\u03a9',
+        'none': None,
+        'list': [1, 'two', {'three': 3}],
+        'object': {'a': 1, 'nested': {'b': [True, False]}},
+        'a_datetime': datetime(2012, 05, 01, 07, 27, 10, 20000),
+        'a_tz_datetime': datetime(2012, 05, 01, 07, 27, 10, 20000, tzinfo=UTC),
+        'another_tz_datetime': timezone('US/Eastern').localize(datetime(2012, 05, 01, 03, 27, 10)),
+        'a_date': datetime(2012, 05, 01).date(),
+    }
+
+    def test_same_as_encoder(self):
+        self.assertEqual(serialize_event(self.event), json.dumps(self.event, cls=DateTimeJSONEncoder))
+
+    def test_same_as_encoder_without_c_encoder(self):
+        with patch('track.utils._ITERENCODE_EVENT', None):
+            self.assertEqual(serialize_event(self.event), json.dumps(self.event, cls=DateTimeJSONEncoder))
+
+    def test_unserializable(self):
+        with self.assertRaises(TypeError):
+            serialize_event({'object': object()})
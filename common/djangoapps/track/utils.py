@@ -2,6 +2,7 @@
 
 from datetime import datetime, date
 import json
+from json.encoder import c_make_encoder, encode_basestring_ascii
 
 from pytz import UTC
 
@@ -16,7 +17,10 @@ class DateTimeJSONEncoder(json.JSONEncoder):
         datatime objects are converted to UTC.
         """
 
-        if isinstance(obj, datetime):
+        # Most event times are UTC already, and don't need converting
+        if type(obj) is datetime and obj.tzinfo is UTC:  # pylint: disable=unidiomatic-typecheck
+            return obj.isoformat()
+        elif isinstance(obj, datetime):
             if obj.tzinfo is None:
                 # Localize to UTC naive datetime objects
                 obj = UTC.localize(obj)
@@ -28,3 +32,28 @@ class DateTimeJSONEncoder(json.JSONEncoder):
             return obj.isoformat()
 
         return super(DateTimeJSONEncoder, self).default(obj)
+
+
+_EVENT_ENCODER = DateTimeJSONEncoder()
+
+if c_make_encoder is not None:
+    # json.dumps builds a new C encoder for every call, which costs about as
+    # much as encoding a whole event. This one is built once, and without the
+    # check for circular references, which needs state for each call.
+    _ITERENCODE_EVENT = c_make_encoder(
+        None, _EVENT_ENCODER.default, encode_basestring_ascii, None, ': ', ', ', False, False, True
+    )
+else:
+    _ITERENCODE_EVENT = None
+
+
+def serialize_event(event):
+    """
+    Serialize an event to JSON, the same way as json.dumps(event, cls=DateTimeJSONEncoder).
+
+    An event containing itself isn't detected as such, but makes this raise a
+    RuntimeError for exceeding the maximum recursion depth.
+    """
+    if _ITERENCODE_EVENT is None:
+        return _EVENT_ENCODER.encode(event)
+    return ''.join(_ITERENCODE_EVENT(event, 0))
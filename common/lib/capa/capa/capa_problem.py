@@ -25,6 +25,7 @@ from xml.sax.saxutils import unescape
 
 from capa.correctmap import CorrectMap
 import capa.inputtypes as inputtypes
+from capa import problem_cache
 import capa.customrender as customrender
 import capa.responsetypes as responsetypes
 from capa.util import contextualize_text, convert_files_to_filenames
@@ -159,11 +160,8 @@ class LoncapaProblem(object):
         problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
         self.problem_text = problem_text
 
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
-
-        # handle any <include file="foo"> tags
-        self._process_includes()
+        # parse problem XML file into an element tree, and handle any <include file="foo"> tags
+        self.tree = self._parse_problem(problem_text)
 
         # construct script processor context (eg for customresponse problems)
         self.context = self._extract_context(self.tree)
@@ -529,6 +527,25 @@ class LoncapaProblem(object):
 
     # ======= Private Methods Below ========
 
+    def _parse_problem(self, problem_text):
+        """
+        Return the element tree of `problem_text`, with its includes processed.
+
+        The parsed tree only depends on the XML, so it's cached between problems,
+        except for trees with includes: the included files can change on their own.
+        """
+        key = problem_cache.digest(problem_text)
+        tree = problem_cache.PARSED_PROBLEMS.get(key)
+        if tree is not None:
+            return tree
+
+        self.tree = etree.XML(problem_text)
+        has_includes = self.tree.find('.//include') is not None
+        self._process_includes()
+        if not has_includes:
+            problem_cache.PARSED_PROBLEMS.set(key, self.tree)
+        return self.tree
+
     def _process_includes(self):
         """
         Handle any <include file="foo"> tags by reading in the specified file and inserting it
@@ -654,21 +671,37 @@ class LoncapaProblem(object):
                 extra_files.append(("python_lib.zip", zip_lib))
                 python_path.append("python_lib.zip")
 
-            try:
-                safe_exec(
-                    all_code,
-                    context,
-                    random_seed=self.seed,
-                    python_path=python_path,
-                    extra_files=extra_files,
-                    cache=self.capa_system.cache,
-                    slug=self.problem_id,
-                    unsafely=self.capa_system.can_execute_unsafe_code(),
-                )
-            except Exception as err:
-                log.exception("Error while execing script code: " + all_code)
-                msg = "Error while executing script code: %s" % str(err).replace('<', '&lt;')
-                raise responsetypes.LoncapaProblemError(msg)
+            unsafely = self.capa_system.can_execute_unsafe_code()
+            # The results of the script only depend on these, so they're cached per seed.
+            # The globals it gets are the seed and the anonymous_student_id.
+            context_key = (
+                problem_cache.digest(all_code),
+                self.seed,
+                self.capa_system.anonymous_student_id,
+                tuple(python_path),
+                problem_cache.digest(zip_lib) if zip_lib is not None else None,
+                unsafely,
+            )
+            cached_context = problem_cache.SCRIPT_CONTEXTS.get(context_key)
+            if cached_context is not None:
+                context = cached_context
+            else:
+                try:
+                    safe_exec(
+                        all_code,
+                        context,
+                        random_seed=self.seed,
+                        python_path=python_path,
+                        extra_files=extra_files,
+                        cache=self.capa_system.cache,
+                        slug=self.problem_id,
+                        unsafely=unsafely,
+                    )
+                except Exception as err:
+                    log.exception("Error while execing script code: " + all_code)
+                    msg = "Error while executing script code: %s" % str(err).replace('<', '&lt;')
+                    raise responsetypes.LoncapaProblemError(msg)
+                problem_cache.SCRIPT_CONTEXTS.set(context_key, context)
 
         # Store code source in context, along with the Python path needed to run it correctly.
         context['script_code'] = all_code
@@ -0,0 +1,88 @@
+"""
+Process-wide caches of the reusable stages of building a LoncapaProblem.
+
+Building a problem parses its XML and executes its script, and both results
+only depend on their inputs: the parsed tree on the problem's XML, and the
+script context on the script, the random seed and the few values given to
+the script. Keeping them around saves the work when the same problem is
+loaded again, as happens when rendering a unit full of problems or rescoring
+every submission to a problem.
+
+Cached values are shared, so they are copied on the way in and the way out.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from copy import deepcopy
+
+# The number of parsed problem trees kept in memory
+PARSED_PROBLEM_CACHE_SIZE = 500
+
+# The number of executed script contexts kept in memory
+SCRIPT_CONTEXT_CACHE_SIZE = 2000
+
+
+class LRUCache(object):
+    """
+    A thread-safe, size-bounded mapping which forgets its least recently used
+    items first. Values are deep-copied as they are stored and retrieved.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return a copy of the value stored for `key`, or None.
+        """
+        with self._lock:
+            value = self._items.pop(key, None)
+            if value is None:
+                return None
+            self._items[key] = value
+        return deepcopy(value)
+
+    def set(self, key, value):
+        """
+        Store a copy of `value` for `key`.
+        """
+        if self.max_size <= 0:
+            return
+        value = deepcopy(value)
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = value
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        """
+        Forget every item.
+        """
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+PARSED_PROBLEMS = LRUCache(PARSED_PROBLEM_CACHE_SIZE)
+SCRIPT_CONTEXTS = LRUCache(SCRIPT_CONTEXT_CACHE_SIZE)
+
+
+def digest(text):
+    """
+    A hex digest identifying the string `text`, which may be unicode.
+    """
+    if isinstance(text, unicode):
+        text = text.encode('utf-8')
+    return hashlib.sha1(text).hexdigest()
+
+
+def clear_caches():
+    """
+    Empty every cache in this module.
+    """
+    PARSED_PROBLEMS.clear()
+    SCRIPT_CONTEXTS.clear()
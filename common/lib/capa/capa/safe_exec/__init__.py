@@ -1,3 +1,5 @@
 """Capa's specialized use of codejail.safe_exec."""
 
+from .cache import TwoTierCache
+from .pool import configure_pool
 from .safe_exec import safe_exec, update_hash
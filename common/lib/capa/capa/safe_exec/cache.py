@@ -0,0 +1,73 @@
+"""A cache of safe_exec results, in this process and in a shared cache."""
+
+import threading
+from collections import OrderedDict
+from copy import deepcopy
+
+from dogapi import dog_stats_api
+
+
+class TwoTierCache(object):
+    """
+    A cache for `safe_exec` with a least-recently-used cache in this process in
+    front of a shared cache, such as a Django cache backed by memcached.
+
+    Randomized problems are executed with a small number of seeds, so the same
+    results are looked up over and over. Keeping the most popular ones in the
+    process saves the round trip to the shared cache and the unpickling.
+    """
+
+    def __init__(self, shared_cache, max_size=1000):
+        """
+        `shared_cache` is an object with .get(key) and .set(key, value)
+        methods, or None to only cache in this process.  `max_size` is the
+        number of results kept in this process.
+        """
+        self.shared_cache = shared_cache
+        self.max_size = max_size
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_local(self, key):
+        """Return the result stored in this process for `key`, or None."""
+        with self._lock:
+            value = self._results.pop(key, None)
+            if value is not None:
+                self._results[key] = value
+        return value
+
+    def _set_local(self, key, value):
+        """Store `value` in this process, forgetting the least recently used results."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._results.pop(key, None)
+            self._results[key] = value
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+
+    def get(self, key):
+        value = self._get_local(key)
+        if value is not None:
+            dog_stats_api.increment('capa.safe_exec.cache.tier', tags=['tier:local'])
+        elif self.shared_cache is not None:
+            value = self.shared_cache.get(key)
+            if value is None:
+                return None
+            dog_stats_api.increment('capa.safe_exec.cache.tier', tags=['tier:shared'])
+            self._set_local(key, value)
+        else:
+            return None
+        # The results are given to the caller to change as it likes, so hand out a copy.
+        return deepcopy(value)
+
+    def set(self, key, value):
+        value = deepcopy(value)
+        self._set_local(key, value)
+        if self.shared_cache is not None:
+            self.shared_cache.set(key, value)
+
+    def clear(self):
+        """Forget the results stored in this process."""
+        with self._lock:
+            self._results.clear()
@@ -0,0 +1,362 @@
+"""
+A pool of pre-started sandboxed Python processes to execute code in.
+
+codejail starts a new sandboxed Python for every execution, and that Python
+then has to import numpy, scipy and the rest of the assumed imports before
+the code can run.  The workers of this pool are started once, with those
+modules imported, and then fork a child for each execution.  The child has
+the same resource limits as a codejail process and exits when it's done, so
+nothing one execution does can be seen by the next one.  A worker is stopped
+after a number of executions, so that it can't grow or go stale forever.
+
+The workers are started the way codejail starts its processes: as the sandbox
+user, running the sandbox's Python executable.
+"""
+
+import json
+import logging
+import os
+import os.path
+import select
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+from codejail.safe_exec import json_safe, SafeExecException
+
+log = logging.getLogger(__name__)
+
+# The program each worker runs.  It reads one JSON request per line from stdin,
+# forks a child to execute the code, and writes one JSON response per line to
+# stdout.  Passed with -c, so that the sandboxed Python doesn't need to read any
+# file outside of its execution directories.
+WORKER_CODE = r'''
+import json
+import os
+import resource
+import select
+import signal
+import sys
+import time
+import traceback
+
+for module_name in json.loads(sys.argv[1]):
+    try:
+        __import__(module_name)
+    except Exception:
+        pass
+
+OK_TYPES = (type(None), int, long, float, str, unicode, list, tuple, dict)
+
+
+def jsonable(value):
+    if not isinstance(value, OK_TYPES):
+        return False
+    try:
+        json.dumps(value)
+    except Exception:
+        return False
+    return True
+
+
+def execute(request, result_fd):
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.chdir(request["directory"])
+    limits = request["limits"]
+    if limits.get("CPU"):
+        resource.setrlimit(resource.RLIMIT_CPU, (limits["CPU"], limits["CPU"]))
+    if limits.get("VMEM"):
+        resource.setrlimit(resource.RLIMIT_AS, (limits["VMEM"], limits["VMEM"]))
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+    sys.path.extend(request["python_path"])
+
+    g_dict = request["globals"]
+    try:
+        exec request["code"] in g_dict
+    except BaseException:
+        result = {"error": traceback.format_exc()}
+    else:
+        result = {"globals": dict(
+            (key, value) for key, value in g_dict.iteritems()
+            if key != "__builtins__" and jsonable(value)
+        )}
+    with os.fdopen(result_fd, "w") as result_file:
+        json.dump(result, result_file)
+
+
+def serve(line):
+    # Nothing from earlier requests may be left around when the child is
+    # forked, so all the state of a request lives in this call.
+    request = json.loads(line)
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_fd)
+            execute(request, write_fd)
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+
+    deadline = time.time() + request["timeout"]
+    chunks = []
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0 or not select.select([read_fd], [], [], remaining)[0]:
+            os.kill(pid, signal.SIGKILL)
+            break
+        chunk = os.read(read_fd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(read_fd)
+
+    __, status = os.waitpid(pid, 0)
+    if os.WIFSIGNALED(status):
+        status = -os.WTERMSIG(status)
+    else:
+        status = os.WEXITSTATUS(status)
+    sys.stdout.write(json.dumps({"output": "".join(chunks), "status": status}) + "\n")
+    sys.stdout.flush()
+
+
+for line in iter(sys.stdin.readline, ""):
+    serve(line)
+'''
+
+
+class WorkerError(Exception):
+    """
+    A worker stopped responding, or sent something which isn't a response.
+    """
+    pass
+
+
+class SandboxWorker(object):
+    """
+    A sandboxed Python process running WORKER_CODE.
+    """
+    def __init__(self, argv):
+        # Like codejail, don't pass on the environment (or the stderr) of the
+        # web process to the sandbox.
+        with open(os.devnull, 'w') as devnull:
+            self.process = subprocess.Popen(
+                argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=devnull, close_fds=True,
+                cwd=tempfile.gettempdir(), env={}
+            )
+        self.executions = 0
+        self._buffer = ''
+
+    @property
+    def alive(self):
+        """
+        Whether the process is still running.
+        """
+        return self.process.poll() is None
+
+    def run(self, request, timeout):
+        """
+        Send `request` to the worker, and return its response.
+
+        Raises WorkerError if the worker doesn't respond within `timeout`
+        seconds, in which case the worker is stopped.
+        """
+        self.executions += 1
+        try:
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+        except (IOError, OSError) as exc:
+            self.stop()
+            raise WorkerError(u"Unable to send a request to the worker: {}".format(exc))
+
+        deadline = time.time() + timeout
+        stdout = self.process.stdout.fileno()
+        while "\n" not in self._buffer:
+            remaining = deadline - time.time()
+            if remaining <= 0 or not select.select([stdout], [], [], remaining)[0]:
+                self.stop()
+                raise WorkerError(u"The worker didn't respond in {} seconds".format(timeout))
+            chunk = os.read(stdout, 65536)
+            if not chunk:
+                self.stop()
+                raise WorkerError(u"The worker exited")
+            self._buffer += chunk
+
+        line, self._buffer = self._buffer.split("\n", 1)
+        try:
+            return json.loads(line)
+        except ValueError:
+            self.stop()
+            raise WorkerError(u"The worker sent an invalid response")
+
+    def stop(self):
+        """
+        Stop the process.
+        """
+        if self.alive:
+            try:
+                self.process.kill()
+            except OSError:
+                pass
+        self.process.wait()
+
+
+class SandboxPool(object):
+    """
+    A pool of SandboxWorkers, with the same interface as codejail's safe_exec.
+
+    Workers are started when they're first needed, and at most `size` idle
+    workers are kept.  Each worker executes at most `max_executions` pieces of
+    code before it's replaced.
+    """
+    def __init__(self, python_bin, user=None, size=4, max_executions=100, limits=None, preload=()):
+        """
+        Arguments:
+            python_bin (str): The sandbox's Python executable.
+            user (str): The sandbox user to run it as, or None to run it as the current user.
+            size (int): The number of idle workers to keep.
+            max_executions (int): The number of executions after which a worker is replaced.
+            limits (dict): The codejail limits of each execution: CPU seconds, VMEM bytes,
+                and the REALTIME seconds after which it's killed.
+            preload (list): The names of the modules to import in each worker.
+        """
+        self.argv = []
+        if user:
+            self.argv.extend(['sudo', '-u', user])
+        self.argv.extend([python_bin, '-E', '-B', '-c', WORKER_CODE, json.dumps(list(preload))])
+        self.size = size
+        self.max_executions = max_executions
+        self.limits = dict(limits or {})
+        self._idle = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @property
+    def timeout(self):
+        """
+        The number of seconds an execution may take before it's killed.
+        """
+        return self.limits.get('REALTIME') or 3 * max(self.limits.get('CPU', 1), 1)
+
+    def _checkout(self):
+        """
+        Return an idle worker, starting one if there isn't any.
+        """
+        with self._lock:
+            if os.getpid() != self._pid:
+                # We've been forked: the workers' pipes belong to the parent process.
+                self._idle = []
+                self._pid = os.getpid()
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.alive:
+                    return worker
+        return SandboxWorker(self.argv)
+
+    def _checkin(self, worker):
+        """
+        Return `worker` to the pool, unless it's done its share of executions.
+        """
+        if worker.alive and worker.executions < self.max_executions:
+            with self._lock:
+                if len(self._idle) < self.size:
+                    self._idle.append(worker)
+                    return
+        worker.stop()
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Execute `code` in a worker, updating `globals_dict` with the JSON-safe
+        globals it leaves, like codejail's safe_exec.
+
+        Raises SafeExecException if the code raised an exception or couldn't
+        be executed.
+        """
+        directory = tempfile.mkdtemp()
+        try:
+            # The sandbox user needs to read the files.
+            os.chmod(directory, 0775)
+            paths = []
+            extra_names = set(name for name, __ in extra_files or ())
+            for pydir in python_path or ():
+                name = os.path.basename(pydir)
+                paths.append(name)
+                if name in extra_names:
+                    continue
+                if os.path.isdir(pydir):
+                    shutil.copytree(pydir, os.path.join(directory, name))
+                elif os.path.exists(pydir):
+                    shutil.copy(pydir, os.path.join(directory, name))
+            for name, content in extra_files or ():
+                with open(os.path.join(directory, name), 'wb') as extra_file:
+                    extra_file.write(content)
+
+            request = {
+                'code': code,
+                'globals': json_safe(globals_dict),
+                'python_path': paths,
+                'directory': directory,
+                'limits': self.limits,
+                'timeout': self.timeout,
+            }
+            worker = self._checkout()
+            try:
+                # Leave the worker time to kill a child that runs out of time.
+                response = worker.run(request, self.timeout + 5)
+            except WorkerError as exc:
+                log.warning(u"Sandbox worker failed executing %s: %s", slug, exc)
+                raise SafeExecException(
+                    "Couldn't execute jailed code: stdout: '', stderr: '' with status code: -9"
+                )
+            self._checkin(worker)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        try:
+            result = json.loads(response['output'])
+        except ValueError:
+            result = None
+        if response['status'] != 0 or result is None:
+            raise SafeExecException(
+                "Couldn't execute jailed code: stdout: {!r}, stderr: '' with status code: {}".format(
+                    response['output'], response['status']
+                )
+            )
+        if 'error' in result:
+            raise SafeExecException("Couldn't execute jailed code: {}".format(result['error']))
+        globals_dict.update(result['globals'])
+
+    def close(self):
+        """
+        Stop the idle workers.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
+
+
+_POOL = None
+
+
+def configure_pool(python_bin, user=None, size=4, max_executions=100, limits=None, preload=()):
+    """
+    Make safe_exec execute sandboxed code in a SandboxPool with these arguments.
+    A `size` of 0 goes back to starting a codejail process for each execution.
+    """
+    global _POOL  # pylint: disable=global-statement
+    if _POOL is not None:
+        _POOL.close()
+    _POOL = SandboxPool(python_bin, user, size, max_executions, limits, preload) if size else None
+
+
+def get_pool():
+    """
+    Return the configured SandboxPool, or None.
+    """
+    return _POOL
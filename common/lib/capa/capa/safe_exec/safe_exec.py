@@ -4,9 +4,13 @@ from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
 from . import lazymod
+from .pool import get_pool
 from dogapi import dog_stats_api
 
 import hashlib
+import json
+import re
+import time
 
 # Establish the Python environment for Capa.
 # Capa assumes float-friendly division always.
@@ -70,6 +74,44 @@ def update_hash(hasher, obj):
         hasher.update(repr(obj))
 
 
+def canonical_digest(code, safe_globals):
+    """
+    Return a hex digest identifying `code` run with the JSON-safe globals
+    `safe_globals`.
+
+    Serializing the globals with sorted keys canonicalizes them just like
+    `update_hash` does, but in C rather than in a recursive Python function.
+    """
+    md5er = hashlib.md5()
+    md5er.update(repr(code))
+    md5er.update(json.dumps(safe_globals, sort_keys=True, separators=(',', ':')))
+    return md5er.hexdigest()
+
+
+# Failures to run jailed code may come with the status of the jailed process. A
+# negative status means that it was killed by a signal, as happens when it runs
+# out of time.
+JAIL_FAILURE_PREFIX = "Couldn't execute jailed code:"
+JAIL_STATUS_RE = re.compile(r"with status code: (-?\d+)")
+
+
+def is_deterministic_failure(emsg):
+    """
+    Whether the failure to execute code with the error message `emsg` would
+    happen again with the same code and globals, and so can be cached.
+
+    Code which raised an exception would raise it again, but code killed for
+    exceeding its resource limits might succeed on a less loaded machine.
+    A killed process leaves no traceback.
+    """
+    match = JAIL_STATUS_RE.search(emsg)
+    if match is not None:
+        return int(match.group(1)) >= 0
+    if emsg.startswith(JAIL_FAILURE_PREFIX):
+        return "Traceback" in emsg
+    return True
+
+
 @dog_stats_api.timed('capa.safe_exec.time')
 def safe_exec(
     code,
@@ -99,7 +141,8 @@ def safe_exec(
 
     `cache` is an object with .get(key) and .set(key, value) methods.  It will be used
     to cache the execution, taking into account the code, the values of the globals,
-    and the random seed.
+    and the random seed.  Failures which would happen again are cached too.
+    See `capa.safe_exec.cache.TwoTierCache` for a cache to use.
 
     `slug` is an arbitrary string, a description that's meaningful to the
     caller, that will be used in log messages.
@@ -110,12 +153,10 @@ def safe_exec(
     # Check the cache for a previous result.
     if cache:
         safe_globals = json_safe(globals_dict)
-        md5er = hashlib.md5()
-        md5er.update(repr(code))
-        update_hash(md5er, safe_globals)
-        key = "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
+        key = "safe_exec.%r.%s" % (random_seed, canonical_digest(code, safe_globals))
         cached = cache.get(key)
         if cached is not None:
+            dog_stats_api.increment('capa.safe_exec.cache', tags=['result:hit'])
             # We have a cached result.  The result is a pair: the exception
             # message, if any, else None; and the resulting globals dictionary.
             emsg, cleaned_results = cached
@@ -123,6 +164,7 @@ def safe_exec(
             if emsg:
                 raise SafeExecException(emsg)
             return
+        dog_stats_api.increment('capa.safe_exec.cache', tags=['result:miss'])
 
     # Create the complete code we'll run.
     code_prolog = CODE_PROLOG % random_seed
@@ -130,10 +172,13 @@ def safe_exec(
     # Decide which code executor to use.
     if unsafely:
         exec_fn = codejail_not_safe_exec
+    elif get_pool() is not None:
+        exec_fn = get_pool().safe_exec
     else:
         exec_fn = codejail_safe_exec
 
     # Run the code!  Results are side effects in globals_dict.
+    start = time.time()
     try:
         exec_fn(
             code_prolog + LAZY_IMPORTS + code, globals_dict,
@@ -143,10 +188,13 @@ def safe_exec(
         emsg = e.message
     else:
         emsg = None
+    dog_stats_api.histogram(
+        'capa.safe_exec.execution_time', time.time() - start, tags=['unsafely:{}'.format(bool(unsafely))]
+    )
 
     # Put the result back in the cache.  This is complicated by the fact that
     # the globals dict might not be entirely serializable.
-    if cache:
+    if cache and (emsg is None or is_deterministic_failure(emsg)):
         cleaned_results = json_safe(globals_dict)
         cache.set(key, (emsg, cleaned_results))
 
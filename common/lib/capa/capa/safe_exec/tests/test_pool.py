@@ -0,0 +1,106 @@
+"""Test pool.py"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from codejail.safe_exec import SafeExecException
+
+from capa.safe_exec.pool import SandboxPool, configure_pool, get_pool
+from capa.safe_exec.safe_exec import is_deterministic_failure
+
+
+class TestSandboxPool(unittest.TestCase):
+    """
+    Test the pool with this Python, unsandboxed.
+    """
+    def setUp(self):
+        super(TestSandboxPool, self).setUp()
+        self.pool = SandboxPool(sys.executable, size=1, max_executions=3, limits={'CPU': 1}, preload=['json'])
+        self.addCleanup(self.pool.close)
+
+    def test_set_values(self):
+        g = {'x': 2}
+        self.pool.safe_exec("y = x * 21\nprint 'ignored'\nf = lambda: 1", g)
+        self.assertEqual(g, {'x': 2, 'y': 42})
+
+    def test_executions_isolated(self):
+        self.pool.safe_exec("import sys\nsys.leaked = 1", {})
+        g = {}
+        self.pool.safe_exec("import sys\nleaked = hasattr(sys, 'leaked')", g)
+        self.assertFalse(g['leaked'])
+
+    def test_earlier_output_not_visible(self):
+        self.pool.safe_exec("secret = 'the answer is %d' % 42", {})
+        g = {}
+        # The secret is built in a local, so that it's only found if it's left over
+        self.pool.safe_exec(
+            "import gc\n"
+            "leaked = (lambda secret: any(\n"
+            "    secret in repr(o) for o in gc.get_objects() if isinstance(o, (list, dict))\n"
+            "))('the answer is %d' % 42)",
+            g
+        )
+        self.assertFalse(g['leaked'])
+
+    def test_environment_not_inherited(self):
+        os.environ['SANDBOX_POOL_TEST'] = 'secret'
+        self.addCleanup(os.environ.pop, 'SANDBOX_POOL_TEST')
+        pool = SandboxPool(sys.executable, size=1)
+        self.addCleanup(pool.close)
+        g = {}
+        pool.safe_exec("import os\nleaked = 'SANDBOX_POOL_TEST' in os.environ", g)
+        self.assertFalse(g['leaked'])
+
+    def test_worker_reused_then_replaced(self):
+        self.pool.safe_exec("a = 1", {})
+        worker = self.pool._idle[0]  # pylint: disable=protected-access
+        self.pool.safe_exec("a = 1", {})
+        self.assertIs(self.pool._idle[0], worker)  # pylint: disable=protected-access
+        self.pool.safe_exec("a = 1", {})
+        self.assertEqual(self.pool._idle, [])  # pylint: disable=protected-access
+        self.assertFalse(worker.alive)
+
+    def test_raising_exceptions(self):
+        with self.assertRaises(SafeExecException) as context:
+            self.pool.safe_exec("1/0", {})
+        self.assertIn("ZeroDivisionError", context.exception.message)
+        self.assertTrue(is_deterministic_failure(context.exception.message))
+
+    def test_runaway_code_killed(self):
+        with self.assertRaises(SafeExecException) as context:
+            self.pool.safe_exec("while True: pass", {})
+        self.assertFalse(is_deterministic_failure(context.exception.message))
+        # The worker survives its child
+        g = {}
+        self.pool.safe_exec("a = 17", g)
+        self.assertEqual(g['a'], 17)
+
+    def test_python_path(self):
+        lib_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, lib_dir)
+        with open(os.path.join(lib_dir, 'course_lib.py'), 'w') as course_lib:
+            course_lib.write("VALUE = 5\n")
+
+        g = {}
+        self.pool.safe_exec(
+            "import course_lib\nimport extra\nvalues = [course_lib.VALUE, extra.VALUE]",
+            g,
+            python_path=[lib_dir, "python_lib.zip"],
+            extra_files=[("extra.py", "VALUE = 6\n")],
+        )
+        self.assertEqual(g['values'], [5, 6])
+
+
+class TestConfigurePool(unittest.TestCase):
+    """
+    Test configuring the pool used by safe_exec.
+    """
+    def test_configure_pool(self):
+        self.addCleanup(configure_pool, None, size=0)
+        configure_pool(sys.executable, size=2)
+        self.assertEqual(get_pool().size, 2)
+        configure_pool(sys.executable, size=0)
+        self.assertIsNone(get_pool())
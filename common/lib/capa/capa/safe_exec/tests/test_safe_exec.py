@@ -9,7 +9,8 @@ import unittest
 
 from nose.plugins.skip import SkipTest
 
-from capa.safe_exec import safe_exec, update_hash
+from capa.safe_exec import safe_exec, update_hash, TwoTierCache
+from capa.safe_exec.safe_exec import canonical_digest, is_deterministic_failure
 from codejail.safe_exec import SafeExecException
 from codejail.jail_code import is_configured
 
@@ -177,6 +178,93 @@ class TestSafeExecCaching(unittest.TestCase):
                 self.fail("Tried executing code with non-ASCII unicode: {0}".format(code))
 
 
+class TestTwoTierCache(unittest.TestCase):
+    """Test the cache in this process in front of a shared cache."""
+
+    def test_shared_hit_kept_locally(self):
+        shared = {'key': (None, {'a': 17})}
+        cache = TwoTierCache(DictCache(shared))
+        self.assertEqual(cache.get('key'), (None, {'a': 17}))
+
+        # The second lookup doesn't need the shared cache.
+        del shared['key']
+        self.assertEqual(cache.get('key'), (None, {'a': 17}))
+
+    def test_set_stores_in_both(self):
+        shared = {}
+        cache = TwoTierCache(DictCache(shared))
+        cache.set('key', (None, {'a': 17}))
+        self.assertEqual(shared, {'key': (None, {'a': 17})})
+        shared.clear()
+        self.assertEqual(cache.get('key'), (None, {'a': 17}))
+
+    def test_results_are_copies(self):
+        cache = TwoTierCache(None)
+        results = {'a': [1, 2]}
+        cache.set('key', (None, results))
+        results['a'].append(3)
+        cache.get('key')[1]['a'].append(4)
+        self.assertEqual(cache.get('key'), (None, {'a': [1, 2]}))
+
+    def test_least_recently_used_forgotten(self):
+        cache = TwoTierCache(None, max_size=2)
+        cache.set('one', (None, {}))
+        cache.set('two', (None, {}))
+        cache.get('one')
+        cache.set('three', (None, {}))
+        self.assertIsNotNone(cache.get('one'))
+        self.assertIsNone(cache.get('two'))
+        self.assertIsNotNone(cache.get('three'))
+
+    def test_with_safe_exec(self):
+        shared = {}
+        cache = TwoTierCache(DictCache(shared))
+        g = {}
+        safe_exec("a = int(math.pi)", g, cache=cache)
+        self.assertEqual(len(shared), 1)
+
+        # Served from this process, even if the shared cache lost it.
+        shared.clear()
+        g = {}
+        safe_exec("a = int(math.pi)", g, cache=cache)
+        self.assertEqual(g['a'], 3)
+        self.assertEqual(shared, {})
+
+
+class TestNegativeCaching(unittest.TestCase):
+    """Test which failures are cached."""
+
+    def test_exceptions_are_deterministic(self):
+        self.assertTrue(is_deterministic_failure(
+            "Couldn't execute jailed code: stdout: '', stderr: 'Traceback...ZeroDivisionError' with status code: 1"
+        ))
+        self.assertTrue(is_deterministic_failure("ZeroDivisionError: integer division or modulo by zero"))
+
+    def test_killed_code_is_not_deterministic(self):
+        self.assertFalse(is_deterministic_failure(
+            "Couldn't execute jailed code: stdout: '', stderr: '' with status code: -9"
+        ))
+
+
+class TestCanonicalDigest(unittest.TestCase):
+    """Test that canonical_digest canonicalizes like update_hash does."""
+
+    def test_simple_cases(self):
+        self.assertNotEqual(canonical_digest("a = 1", {'x': 1}), canonical_digest("a = 1", {'x': 10}))
+        self.assertNotEqual(canonical_digest("a = 1", {'x': 1}), canonical_digest("a = 1", {'x': "1"}))
+        self.assertNotEqual(canonical_digest("a = 1", {'x': 1}), canonical_digest("a = 2", {'x': 1}))
+
+    def test_list_ordering(self):
+        self.assertNotEqual(canonical_digest("", {'a': [1, 2, 3]}), canonical_digest("", {'a': [3, 2, 1]}))
+
+    def test_deep_ordering(self):
+        d1, d2 = TestUpdateHash('test_dict_ordering').equal_but_different_dicts()
+        self.assertEqual(
+            canonical_digest("", {'a': [1, 2, [d1], 3, 4]}),
+            canonical_digest("", {'a': [1, 2, [d2], 3, 4]}),
+        )
+
+
 class TestUpdateHash(unittest.TestCase):
     """Test the safe_exec.update_hash function to be sure it canonicalizes properly."""
 
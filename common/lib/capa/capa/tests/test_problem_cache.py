@@ -0,0 +1,74 @@
+"""
+Tests of the caches of parsed problems and executed scripts.
+"""
+import textwrap
+import unittest
+
+from mock import patch
+
+from capa import problem_cache
+from capa.safe_exec import safe_exec
+
+from . import new_loncapa_problem, test_capa_system
+
+
+class ProblemCacheTest(unittest.TestCase):
+    """
+    Tests that building a problem again reuses the earlier work.
+    """
+    xml = textwrap.dedent("""
+        <problem>
+        <script type="loncapa/python">
+        value = random.randint(0, 1000)
+        answers = ['a', 'b']
+        </script>
+        <customresponse cfn="check" answer="$value">
+            <textline />
+        </customresponse>
+        </problem>
+    """)
+
+    def setUp(self):
+        super(ProblemCacheTest, self).setUp()
+        problem_cache.clear_caches()
+        self.addCleanup(problem_cache.clear_caches)
+
+        patcher = patch('capa.capa_problem.safe_exec', side_effect=safe_exec)
+        self.safe_exec = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_script_executed_once_per_seed(self):
+        first = new_loncapa_problem(self.xml, seed=1)
+        second = new_loncapa_problem(self.xml, seed=1)
+        self.assertEqual(self.safe_exec.call_count, 1)
+        self.assertEqual(first.context['value'], second.context['value'])
+
+        new_loncapa_problem(self.xml, seed=2)
+        self.assertEqual(self.safe_exec.call_count, 2)
+
+    def test_script_executed_per_student(self):
+        capa_system = test_capa_system()
+        new_loncapa_problem(self.xml, capa_system=capa_system, seed=1)
+        capa_system.anonymous_student_id = 'another student'
+        new_loncapa_problem(self.xml, capa_system=capa_system, seed=1)
+        self.assertEqual(self.safe_exec.call_count, 2)
+
+    def test_context_not_shared(self):
+        first = new_loncapa_problem(self.xml, seed=1)
+        first.context['answers'].append('c')
+        second = new_loncapa_problem(self.xml, seed=1)
+        self.assertEqual(second.context['answers'], ['a', 'b'])
+
+    def test_parsed_tree_not_shared(self):
+        first = new_loncapa_problem(self.xml, seed=1)
+        second = new_loncapa_problem(self.xml, seed=1)
+        self.assertIsNot(first.tree, second.tree)
+        self.assertEqual(len(problem_cache.PARSED_PROBLEMS), 1)
+        # Preprocessing the problem doesn't change the cached tree
+        cached = problem_cache.PARSED_PROBLEMS.get(problem_cache.digest(first.problem_text))
+        self.assertIsNone(cached.find('.//customresponse').get('id'))
+
+    def test_problems_with_includes_not_cached(self):
+        xml = '<problem><include file="nonexistent.xml"/></problem>'
+        new_loncapa_problem(xml)
+        self.assertEqual(len(problem_cache.PARSED_PROBLEMS), 0)
@@ -1 +1 @@
-from .wrapper import increment, histogram, timer
+from .wrapper import increment, histogram, timer, gauge
@@ -45,3 +45,12 @@ def timer(metric_name, *args, **kwargs):
     if "tags" in kwargs:
         kwargs["tags"] = _clean_tags(kwargs["tags"])
     return dog_stats_api.timer(metric_name, *args, **kwargs)
+
+
+def gauge(metric_name, *args, **kwargs):
+    """
+    Wrapper around dog_stats_api.gauge that cleans any tags used.
+    """
+    if "tags" in kwargs:
+        kwargs["tags"] = _clean_tags(kwargs["tags"])
+    dog_stats_api.gauge(metric_name, *args, **kwargs)
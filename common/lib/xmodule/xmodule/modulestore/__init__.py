@@ -283,6 +283,12 @@ class EditInfo(object):
     """
     Encapsulates the editing info of a block.
     """
+    # There's one of these per block in every loaded structure, so don't give each a __dict__
+    __slots__ = (
+        'previous_version', 'update_version', 'source_version', 'edited_on', 'edited_by',
+        'original_usage', 'original_usage_version', '_subtree_edited_on', '_subtree_edited_by',
+    )
+
     def __init__(self, **kwargs):
         self.from_storable(kwargs)
 
@@ -345,6 +351,9 @@ class BlockData(object):
     Allows the storing of meta-information about a structure that doesn't persist along with
     the structure itself.
     """
+    # There's one of these per block in every loaded structure, so don't give each a __dict__
+    __slots__ = ('fields', 'block_type', 'definition', 'defaults', 'edit_info', 'definition_loaded')
+
     def __init__(self, **kwargs):
         # Has the definition been loaded?
         self.definition_loaded = False
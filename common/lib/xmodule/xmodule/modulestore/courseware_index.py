@@ -1,10 +1,11 @@
 """ Code to allow module store to interface with courseware index """
 from __future__ import absolute_import
 
+import hashlib
+import json
 import logging
 
 from django.utils.translation import ugettext as _
-from opaque_keys.edx.locator import CourseLocator
 from search.search_engine_base import SearchEngine
 
 from . import ModuleStoreEnum
@@ -31,44 +32,18 @@ class CoursewareSearchIndexer(object):
     """
 
     @staticmethod
-    def add_to_search_index(modulestore, location, delete=False, raise_on_error=False):
+    def _course_documents(course, error_list):
         """
-        Add to courseware search index from given location and its children
+        Return the search documents of the course and its descendants, keyed by their usage id.
+        The items which could not be turned into documents map to None.
         """
-        error_list = []
-        # TODO - inline for now, need to move this out to a celery task
-        searcher = SearchEngine.get_search_engine(INDEX_NAME)
-        if not searcher:
-            return
-
-        if isinstance(location, CourseLocator):
-            course_key = location
-        else:
-            course_key = location.course_key
-
+        documents = {}
         location_info = {
-            "course": unicode(course_key),
+            "course": unicode(course.id),
         }
 
-        def _fetch_item(item_location):
-            """ Fetch the item from the modulestore location, log if not found, but continue """
-            try:
-                if isinstance(item_location, CourseLocator):
-                    item = modulestore.get_course(item_location)
-                else:
-                    item = modulestore.get_item(item_location, revision=ModuleStoreEnum.RevisionOption.published_only)
-            except ItemNotFoundError:
-                log.warning('Cannot find: %s', item_location)
-                return None
-
-            return item
-
-        def index_item_location(item_location, current_start_date):
-            """ add this item to the search index """
-            item = _fetch_item(item_location)
-            if not item:
-                return
-
+        def add_item_documents(item, current_start_date):
+            """ add the documents of this item and its children """
             is_indexable = hasattr(item, "index_dictionary")
             # if it's not indexable and it does not have children, then ignore
             if not is_indexable and not item.has_children:
@@ -79,8 +54,8 @@ class CoursewareSearchIndexer(object):
                 current_start_date = item.start
 
             if item.has_children:
-                for child_loc in item.children:
-                    index_item_location(child_loc, current_start_date)
+                for child in item.get_children():
+                    add_item_documents(child, current_start_date)
 
             item_index = {}
             item_index_dictionary = item.index_dictionary() if is_indexable else None
@@ -94,27 +69,50 @@ class CoursewareSearchIndexer(object):
                     if current_start_date:
                         item_index['start_date'] = current_start_date
 
-                    searcher.index(DOCUMENT_TYPE, item_index)
+                    documents[item_index['id']] = item_index
                 except Exception as err:  # pylint: disable=broad-except
                     # broad exception so that index operation does not fail on one item of many
-                    log.warning('Could not index item: %s - %s', item_location, unicode(err))
-                    error_list.append(_('Could not index item: {}').format(item_location))
+                    documents[unicode(item.scope_ids.usage_id)] = None
+                    log.warning('Could not index item: %s - %s', item.location, unicode(err))
+                    error_list.append(_('Could not index item: {}').format(item.location))
+
+        add_item_documents(course, None)
+        return documents
+
+    @staticmethod
+    def _document_version(document):
+        """
+        Return a digest of the document, which changes whenever what it adds to the index does
+        """
+        return hashlib.sha1(json.dumps(document, sort_keys=True, default=unicode)).hexdigest()
+
+    @classmethod
+    def index_course(cls, modulestore, course_key, indexed_versions=None, incremental=True):
+        """
+        Bring the courseware search index of the published course up to date.
 
-        def remove_index_item_location(item_location):
-            """ remove this item from the search index """
-            item = _fetch_item(item_location)
-            if item:
-                if item.has_children:
-                    for child_loc in item.children:
-                        remove_index_item_location(child_loc)
+        `indexed_versions` maps the usage id of each block indexed last time to the
+        version of its document, as returned then; only the blocks whose documents
+        changed since are indexed again, and those which are gone are removed. Without
+        it, or if `incremental` is False, every block is indexed.
 
-                searcher.remove(DOCUMENT_TYPE, unicode(item.scope_ids.usage_id))
+        Returns the versions of the blocks now in the index, to pass in next time, and
+        the list of errors which occurred.
+        """
+        error_list = []
+        indexed_versions = dict(indexed_versions or {})
+        searcher = SearchEngine.get_search_engine(INDEX_NAME)
+        if not searcher:
+            return indexed_versions, error_list
 
         try:
-            if delete:
-                remove_index_item_location(location)
-            else:
-                index_item_location(location, None)
+            # Load the whole published course at once, rather than one block at a time
+            with modulestore.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
+                with modulestore.bulk_operations(course_key):
+                    course = modulestore.get_course(course_key, depth=None)
+                    if course is None:
+                        raise ItemNotFoundError(course_key)
+                    documents = cls._course_documents(course, error_list)
         except Exception as err:  # pylint: disable=broad-except
             # broad exception so that index operation does not prevent the rest of the application from working
             log.exception(
@@ -123,13 +121,46 @@ class CoursewareSearchIndexer(object):
                 unicode(err)
             )
             error_list.append(_('General indexing error occurred'))
+            return indexed_versions, error_list
+
+        versions = {}
+        changed_documents = []
+        for usage_id, document in documents.iteritems():
+            if document is None:
+                # keep whatever was indexed for it before
+                continue
+            versions[usage_id] = cls._document_version(document)
+            if not incremental or indexed_versions.get(usage_id) != versions[usage_id]:
+                changed_documents.append(document)
+        removed_ids = [usage_id for usage_id in indexed_versions if usage_id not in documents]
+
+        for document in changed_documents:
+            try:
+                searcher.index(DOCUMENT_TYPE, document)
+                indexed_versions[document['id']] = versions[document['id']]
+            except Exception as err:  # pylint: disable=broad-except
+                log.warning('Could not index item: %s - %s', document['id'], unicode(err))
+                error_list.append(_('Could not index item: {}').format(document['id']))
 
-        if raise_on_error and error_list:
-            raise SearchIndexingError(_('Error(s) present during indexing'), error_list)
+        for usage_id in removed_ids:
+            try:
+                searcher.remove(DOCUMENT_TYPE, usage_id)
+                del indexed_versions[usage_id]
+            except Exception as err:  # pylint: disable=broad-except
+                log.warning('Could not remove item from index: %s - %s', usage_id, unicode(err))
+                error_list.append(_('Could not remove item from index: {}').format(usage_id))
+
+        log.info(
+            "Updated courseware index of %s: %d of %d items indexed, %d removed",
+            course_key, len(changed_documents), len(versions), len(removed_ids)
+        )
+        return indexed_versions, error_list
 
     @classmethod
     def do_course_reindex(cls, modulestore, course_key):
         """
         (Re)index all content within the given course
         """
-        return cls.add_to_search_index(modulestore, course_key, delete=False, raise_on_error=True)
+        __, error_list = cls.index_course(modulestore, course_key)
+        if error_list:
+            raise SearchIndexingError(_('Error(s) present during indexing'), error_list)
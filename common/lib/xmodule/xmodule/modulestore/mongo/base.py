@@ -17,6 +17,9 @@ import sys
 import logging
 import copy
 import re
+import threading
+import time
+from collections import Mapping
 from uuid import uuid4
 
 from bson.son import SON
@@ -64,6 +67,14 @@ SORT_REVISION_FAVOR_DRAFT = ('_id.revision', pymongo.DESCENDING)
 # sort order that returns PUBLISHED items first
 SORT_REVISION_FAVOR_PUBLISHED = ('_id.revision', pymongo.ASCENDING)
 
+# seconds to wait after an edit before recomputing the metadata inheritance tree in the background,
+# so that a burst of edits is covered by one recompute
+METADATA_INHERITANCE_RECOMPUTE_DELAY = 2
+
+# seconds after which the lock on recomputing a metadata inheritance tree is released,
+# in case the process holding it died
+METADATA_INHERITANCE_LOCK_TIMEOUT = 5 * 60
+
 BLOCK_TYPES_WITH_CHILDREN = list(set(
     name for name, class_ in XBlock.load_classes() if getattr(class_, 'has_children', False)
 ))
@@ -491,6 +502,33 @@ class ParentLocationCache(dict):
             del self[key]
 
 
+class LazyMetadataInheritanceTree(Mapping):
+    """
+    A metadata inheritance tree which isn't computed until it's first read, for internal use.
+    """
+    def __init__(self, compute):
+        self._compute = compute
+        self._tree = None
+
+    def _get_tree(self):
+        """
+        Returns the tree, computing it on the first call.
+        """
+        if self._tree is None:
+            self._tree = self._compute()
+            self._compute = None
+        return self._tree
+
+    def __getitem__(self, key):
+        return self._get_tree()[key]
+
+    def __iter__(self):
+        return iter(self._get_tree())
+
+    def __len__(self):
+        return len(self._get_tree())
+
+
 class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, MongoBulkOpsMixin):
     """
     A Mongodb backed ModuleStore
@@ -510,9 +548,12 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                  user_service=None,
                  signal_handler=None,
                  retry_wait_time=0.1,
+                 recompute_inheritance_async=False,
                  **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param recompute_inheritance_async: if True, edits mark the cached metadata inheritance tree as stale,
+            and it's recomputed in the background while the last good tree continues to be served.
         """
 
         super(MongoModuleStore, self).__init__(contentstore=contentstore, **kwargs)
@@ -566,6 +607,10 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
         self._course_run_cache = {}
         self.signal_handler = signal_handler
+        self.recompute_inheritance_async = recompute_inheritance_async
+        # maps the tree key of each course this process has edited to the id of its last edit
+        # and the tree which includes it
+        self._edited_metadata_inheritance_trees = {}
 
     def close_connections(self):
         """
@@ -735,7 +780,21 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 return self.request_cache.data['metadata_inheritance'][unicode(course_id)]
 
             # then look in any caching subsystem (e.g. memcached)
-            if self.metadata_inheritance_cache_subsystem is not None:
+            if self.metadata_inheritance_cache_subsystem is not None and self.recompute_inheritance_async:
+                tree_key, stale_key, __ = self._metadata_inheritance_cache_keys(course_id)
+                cached = self.metadata_inheritance_cache_subsystem.get_many([tree_key, stale_key])
+                tree = cached.get(tree_key, {})
+                if stale_key in cached:
+                    edit_id, edited_tree = self._edited_metadata_inheritance_trees.get(tree_key, (None, None))
+                    if edit_id == cached[stale_key]:
+                        # this process made the last edit, so it sees that edit while the tree is recomputed
+                        tree = edited_tree
+                    if tree:
+                        # serve this tree while the shared one is recomputed
+                        self._start_metadata_inheritance_recompute(course_id)
+                else:
+                    self._edited_metadata_inheritance_trees.pop(tree_key, None)
+            elif self.metadata_inheritance_cache_subsystem is not None:
                 tree = self.metadata_inheritance_cache_subsystem.get(unicode(course_id), {})
             else:
                 logging.warning(
@@ -770,14 +829,99 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
         If given a runtime, it replaces the cached_metadata in that runtime. NOTE: failure to provide
         a runtime may mean that some objects report old values for inherited data.
+
+        With recompute_inheritance_async, other processes keep reading the last good tree until a
+        background recompute replaces it. This process gets a tree which is computed when it's
+        first read, and keeps reading it until the recompute or another process's edit, so it
+        sees its own edits.
         """
         course_id = course_id.for_branch(None)
         if not self._is_in_bulk_operation(course_id):
+            if self.recompute_inheritance_async and self.metadata_inheritance_cache_subsystem is not None:
+                tree_key, stale_key, __ = self._metadata_inheritance_cache_keys(course_id)
+                edit_id = uuid4().hex
+                self.metadata_inheritance_cache_subsystem.set(stale_key, edit_id)
+                self._start_metadata_inheritance_recompute(course_id)
+
+                branch_setting = self.get_branch_setting()
+
+                def compute_tree():
+                    """
+                    Compute the tree with the branch setting of the edit.
+                    """
+                    with self.branch_setting(branch_setting):
+                        return self._compute_metadata_inheritance_tree(course_id)
+
+                cached_metadata = LazyMetadataInheritanceTree(compute_tree)
+                self._edited_metadata_inheritance_trees[tree_key] = (edit_id, cached_metadata)
+                if self.request_cache is not None:
+                    self.request_cache.data.setdefault('metadata_inheritance', {})[
+                        unicode(self.fill_in_run(course_id))
+                    ] = cached_metadata
+                if runtime:
+                    runtime.cached_metadata = cached_metadata
+                return
+
             # below is done for side effects when runtime is None
             cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
             if runtime:
                 runtime.cached_metadata = cached_metadata
 
+    def _metadata_inheritance_cache_keys(self, course_id):
+        """
+        Returns the keys in the metadata inheritance cache subsystem of the course's tree, of the flag
+        marking that tree as stale, and of the lock held while the tree is recomputed.
+        """
+        course_id = self.fill_in_run(course_id)
+        tree_key = unicode(course_id)
+        return tree_key, tree_key + u'.stale', tree_key + u'.recompute_lock'
+
+    def _start_metadata_inheritance_recompute(self, course_id):
+        """
+        Recompute the course's metadata inheritance tree on a background thread, unless some
+        process is already doing so (in which case it'll pick up the latest changes when it's done).
+        """
+        __, __, lock_key = self._metadata_inheritance_cache_keys(course_id)
+        if not self.metadata_inheritance_cache_subsystem.add(lock_key, True, METADATA_INHERITANCE_LOCK_TIMEOUT):
+            return
+
+        recompute = threading.Thread(
+            target=self._recompute_metadata_inheritance_tree,
+            args=(course_id, self.get_branch_setting()),
+            name=u'recompute-metadata-inheritance-{}'.format(course_id),
+        )
+        recompute.daemon = True
+        recompute.start()
+
+    def _recompute_metadata_inheritance_tree(self, course_id, branch_setting):
+        """
+        Recompute and cache the course's metadata inheritance tree until no more edits have
+        marked it stale, then release the lock taken by _start_metadata_inheritance_recompute.
+        """
+        cache = self.metadata_inheritance_cache_subsystem
+        tree_key, stale_key, lock_key = self._metadata_inheritance_cache_keys(course_id)
+        succeeded = False
+        try:
+            with self.branch_setting(branch_setting):
+                stale = True
+                while stale:
+                    # wait for the rest of a burst of edits, so they're all covered by one recompute
+                    time.sleep(METADATA_INHERITANCE_RECOMPUTE_DELAY)
+                    cache.delete(stale_key)
+                    cache.set(tree_key, self._compute_metadata_inheritance_tree(course_id))
+                    stale = cache.get(stale_key) is not None
+            succeeded = True
+        except Exception:  # pylint: disable=broad-except
+            log.exception(u'Failed to recompute the metadata inheritance tree for %s', course_id)
+            # the next read will try again
+            cache.set(stale_key, True)
+        finally:
+            cache.delete(lock_key)
+
+        # an edit may have marked the tree stale after the last check, but before the lock was released
+        if succeeded and cache.get(stale_key) is not None:
+            self._start_metadata_inheritance_recompute(course_id)
+
     def _clean_item_data(self, item):
         """
         Renames the '_id' field in item to 'location'
@@ -12,7 +12,6 @@ import logging
 from opaque_keys.edx.locations import Location
 from xmodule.exceptions import InvalidVersionError
 from xmodule.modulestore import ModuleStoreEnum
-from xmodule.modulestore.courseware_index import CoursewareSearchIndexer
 from xmodule.modulestore.exceptions import (
     ItemNotFoundError, DuplicateItemError, DuplicateCourseError, InvalidBranchSetting
 )
@@ -550,9 +549,13 @@ class DraftModuleStore(MongoModuleStore):
             )
         self._delete_subtree(location, as_functions)
 
-        # Remove this location from the courseware search index so that searches
-        # will refrain from showing it as a result
-        CoursewareSearchIndexer.add_to_search_index(self, location, delete=True)
+        # Deleting the published version changes the published course, which also takes it out of the
+        # courseware search index
+        if as_published in as_functions:
+            bulk_record = self._get_bulk_ops_record(location.course_key)
+            bulk_record.dirty = True
+            if self.signal_handler and not bulk_record.active:
+                self.signal_handler.send("course_published", course_key=location.course_key)
 
     def _delete_subtree(self, location, as_functions, draft_only=False):
         """
@@ -731,9 +734,6 @@ class DraftModuleStore(MongoModuleStore):
         if self.signal_handler and not bulk_record.active:
             self.signal_handler.send("course_published", course_key=course_key)
 
-        # Now it's been published, add the object to the courseware search index so that it appears in search results
-        CoursewareSearchIndexer.add_to_search_index(self, location)
-
         return self.get_item(as_published(location))
 
     def unpublish(self, location, user_id, **kwargs):
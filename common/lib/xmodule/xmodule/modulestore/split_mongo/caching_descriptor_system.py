@@ -1,5 +1,6 @@
 import sys
 import logging
+from collections import deque
 from contracts import contract, new_contract
 from fs.osfs import OSFS
 from lazy import lazy
@@ -19,9 +20,13 @@ from xmodule.modulestore.split_mongo import BlockKey, CourseEnvelope
 from xmodule.modulestore.split_mongo.id_manager import SplitMongoIdManager
 from xmodule.modulestore.split_mongo.definition_lazy_loader import DefinitionLazyLoader
 from xmodule.modulestore.split_mongo.split_mongo_kvs import SplitMongoKVS
+import dogstats_wrapper as dog_stats_api
 
 log = logging.getLogger(__name__)
 
+# The most definitions to fetch at once when a block's content is first needed
+DEFINITION_PREFETCH_LIMIT = 200
+
 new_contract('BlockUsageLocator', BlockUsageLocator)
 new_contract('CourseLocator', CourseLocator)
 new_contract('LibraryLocator', LibraryLocator)
@@ -77,6 +82,10 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
         self.default_class = default_class
         self.local_modules = {}
         self._services['library_tools'] = LibraryToolsService(modulestore)
+        # definition id -> definition, for the definitions fetched by prefetch_definition
+        self._definitions = {}
+        # The number of times definitions were fetched from the modulestore for this runtime
+        self.num_definition_fetches = 0
 
     @lazy
     @contract(returns="dict(BlockKey: BlockKey)")
@@ -87,6 +96,14 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
                 parent_map[child] = block_key
         return parent_map
 
+    @lazy
+    def _inherited_settings(self):
+        """
+        The precomputed map of BlockKey -> inherited settings for this structure, or
+        None if the structure may still change.
+        """
+        return self.modulestore.get_inherited_settings(self.course_entry.course_key, self.course_entry.structure)
+
     @contract(usage_key="BlockUsageLocator | BlockKey", course_entry_override="CourseEnvelope | None")
     def _load_item(self, usage_key, course_entry_override=None, **kwargs):
         """
@@ -185,6 +202,7 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
                 block_key.type,
                 definition_id,
                 convert_fields,
+                prefetcher=lambda definition_id: self.prefetch_definition(course_key, block_key, definition_id),
             )
         else:
             definition_loader = None
@@ -206,15 +224,21 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
             parent = course_key.make_usage_key(parent_key.type, parent_key.id)
         else:
             parent = None
+        inherited_settings = None
+        if InheritanceMixin in self.modulestore.xblock_mixins and self._inherited_settings is not None:
+            inherited_settings = self._inherited_settings.get(block_key)
+
         kvs = SplitMongoKVS(
             definition_loader,
             converted_fields,
             converted_defaults,
             parent=parent,
-            field_decorator=kwargs.get('field_decorator')
+            field_decorator=kwargs.get('field_decorator'),
+            inherited_settings=inherited_settings,
         )
 
-        if InheritanceMixin in self.modulestore.xblock_mixins:
+        if InheritanceMixin in self.modulestore.xblock_mixins and inherited_settings is None:
+            # Not precomputed, so find inherited values by walking up the parents
             field_data = inheriting_field_data(kvs)
         else:
             field_data = KvsFieldData(kvs)
@@ -253,6 +277,54 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
 
         return module
 
+    def prefetch_definition(self, course_key, block_key, definition_id):
+        """
+        Return the definition `definition_id` of the block `block_key`.
+
+        When a block's content is needed, the content of its siblings and their
+        descendants is likely to be needed next (e.g., all the problems in a
+        vertical being rendered). So, the definitions of the blocks in the
+        subtree of its parent are fetched along with it, in a single call.
+        """
+        if definition_id not in self._definitions:
+            definition_ids = [definition_id] + [
+                subtree_definition_id
+                for subtree_definition_id in self._subtree_definition_ids(self._parent_map.get(block_key, block_key))
+                if subtree_definition_id != definition_id
+            ][:DEFINITION_PREFETCH_LIMIT - 1]
+
+            self.num_definition_fetches += 1
+            dog_stats_api.histogram('split_mongo.definition_prefetch.size', len(definition_ids))
+            for definition in self.modulestore.get_definitions(course_key, definition_ids):
+                self._definitions[definition['_id']] = definition
+            # Don't look for definitions that don't exist again
+            for missing_id in definition_ids:
+                self._definitions.setdefault(missing_id, None)
+
+        return self._definitions[definition_id]
+
+    def _subtree_definition_ids(self, root_key):
+        """
+        Returns the ids of the definitions not yet loaded in the subtree of `root_key`,
+        nearest blocks first, up to DEFINITION_PREFETCH_LIMIT of them.
+        """
+        blocks = self.course_entry.structure['blocks']
+        definition_ids = []
+        queue = deque([root_key])
+        while queue and len(definition_ids) < DEFINITION_PREFETCH_LIMIT:
+            block_data = blocks.get(queue.popleft())
+            if block_data is None:
+                continue
+            if (
+                    block_data.definition is not None and
+                    not block_data.definition_loaded and
+                    block_data.definition not in self._definitions and
+                    block_data.definition not in definition_ids
+            ):
+                definition_ids.append(block_data.definition)
+            queue.extend(block_data.fields.get('children', []))
+        return definition_ids
+
     def get_edited_by(self, xblock):
         """
         See :meth: cms.lib.xblock.runtime.EditInfoRuntimeMixin.get_edited_by
@@ -0,0 +1,173 @@
+"""
+Caches for the immutable documents of the split modulestore.
+
+Structures and definitions are never changed once they've been written: an
+edit always creates a new document with a new id. That makes them safe to keep
+around between requests, so reading them from Mongo and deserializing them
+once per process (or once per cluster, with the shared tier) is enough.
+"""
+import copy
+import threading
+from collections import OrderedDict
+
+import dogstats_wrapper as dog_stats_api
+
+
+class DocumentCache(object):
+    """
+    A size-bounded, least-recently-used cache of documents keyed by their id,
+    optionally backed by a shared cache (a django cache, such as memcached)
+    for documents which aren't in this process yet.
+
+    Documents are stored in the shared cache in the form that they're stored
+    in Mongo, so `from_mongo` is given to convert them when they're read back.
+    """
+    def __init__(self, doc_type, max_size, shared_cache=None, shared_prefix='', from_mongo=None):
+        """
+        Arguments:
+            doc_type (str): The kind of document being cached. Used in the stats and the shared cache key.
+            max_size (int): The number of documents to keep in this process. 0 disables the process cache.
+            shared_cache: A django cache to share documents between processes, or None.
+            shared_prefix (str): Distinguishes the documents of different collections in the shared cache.
+            from_mongo: A function converting a document read from Mongo (or the shared cache) to the form
+                returned to callers. It may modify the document it's given.
+        """
+        self.doc_type = doc_type
+        self.max_size = max_size
+        self.shared_cache = shared_cache
+        self.shared_prefix = shared_prefix
+        self.from_mongo = from_mongo or (lambda document: document)
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        """
+        Whether this cache stores anything at all.
+        """
+        return self.max_size > 0 or self.shared_cache is not None
+
+    def stats(self):
+        """
+        Returns a dict of the number of hits in this process, hits in the shared
+        cache, misses, and the number of documents held in this process.
+        """
+        return {
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'size': len(self._documents),
+        }
+
+    def _shared_key(self, doc_id):
+        """
+        The key of the document with id `doc_id` in the shared cache.
+        """
+        return u'split.{}.{}.{}'.format(self.shared_prefix, self.doc_type, doc_id)
+
+    def _record(self, result, count=1):
+        """
+        Count `count` lookups with the given result ('hits', 'shared_hits' or 'misses').
+        """
+        if not count:
+            return
+        setattr(self, result, getattr(self, result) + count)
+        dog_stats_api.increment(
+            'split_mongo.document_cache',
+            count,
+            tags=[u'doc_type:{}'.format(self.doc_type), u'result:{}'.format(result)]
+        )
+
+    def _get_local(self, doc_id):
+        """
+        Return the document from this process, marking it as recently used, or None.
+        """
+        with self._lock:
+            document = self._documents.pop(doc_id, None)
+            if document is not None:
+                self._documents[doc_id] = document
+            return document
+
+    def _set_local(self, doc_id, document):
+        """
+        Store the document in this process, evicting the least recently used
+        documents beyond `max_size`.
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._documents.pop(doc_id, None)
+            self._documents[doc_id] = document
+            while len(self._documents) > self.max_size:
+                self._documents.popitem(last=False)
+
+    def get_many(self, doc_ids, load_from_mongo):
+        """
+        Return a dict of doc_id -> document for each of `doc_ids` that exists.
+
+        Documents not in any cache are read with `load_from_mongo(missing_ids)`,
+        which should return an iterable of Mongo documents, each with an '_id'.
+        """
+        found = {}
+        missing = []
+        for doc_id in doc_ids:
+            document = self._get_local(doc_id)
+            if document is None:
+                missing.append(doc_id)
+            else:
+                found[doc_id] = document
+        self._record('hits', len(found))
+
+        if missing and self.shared_cache is not None:
+            shared_keys = {self._shared_key(doc_id): doc_id for doc_id in missing}
+            shared_documents = self.shared_cache.get_many(shared_keys.keys())
+            for shared_key, document in shared_documents.iteritems():
+                doc_id = shared_keys[shared_key]
+                document = self.from_mongo(document)
+                self._set_local(doc_id, document)
+                found[doc_id] = document
+            self._record('shared_hits', len(shared_documents))
+            missing = [doc_id for doc_id in missing if doc_id not in found]
+
+        if missing:
+            self._record('misses', len(missing))
+            mongo_documents = {}
+            for document in load_from_mongo(missing):
+                if self.shared_cache is not None:
+                    # Store a copy, as from_mongo modifies the document
+                    mongo_documents[self._shared_key(document['_id'])] = copy.deepcopy(document)
+                document = self.from_mongo(document)
+                self._set_local(document['_id'], document)
+                found[document['_id']] = document
+            if mongo_documents:
+                self.shared_cache.set_many(mongo_documents)
+
+        return found
+
+    def get(self, doc_id, load_from_mongo):
+        """
+        Return the document with id `doc_id`, or None if there isn't one.
+
+        `load_from_mongo(doc_id)` is called to read the document if it isn't
+        in any cache. It should return the Mongo document or None.
+        """
+        def load_one(missing_ids):
+            """
+            Adapt `load_from_mongo` to the interface of get_many.
+            """
+            document = load_from_mongo(missing_ids[0])
+            return [] if document is None else [document]
+
+        # Only one document was asked for, so there's at most one in the result,
+        # even if its '_id' is an ObjectId and doc_id is the equivalent string.
+        return next(self.get_many([doc_id], load_one).itervalues(), None)
+
+    def clear(self):
+        """
+        Empty the process cache. The shared cache isn't touched.
+        """
+        with self._lock:
+            self._documents.clear()
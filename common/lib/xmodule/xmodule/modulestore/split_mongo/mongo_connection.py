@@ -8,10 +8,12 @@ import pymongo
 # Import this just to export it
 from pymongo.errors import DuplicateKeyError  # pylint: disable=unused-import
 
-from contracts import check, new_contract
+from contracts import check, new_contract, all_disabled
 from xmodule.exceptions import HeartbeatFailure
 from xmodule.modulestore import BlockData
 from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.document_cache import DocumentCache
+import copy
 import datetime
 import pytz
 
@@ -19,6 +21,19 @@ import pytz
 new_contract('BlockData', BlockData)
 
 
+# Block types and field names come from a small set, but Mongo returns a new
+# string for each occurrence. Sharing one copy of each saves a lot of memory
+# in structures with thousands of blocks.
+_INTERNED_NAMES = {}
+
+
+def _intern_name(name):
+    """
+    Returns the shared copy of the block type or field name `name`.
+    """
+    return _INTERNED_NAMES.setdefault(name, name)
+
+
 def structure_from_mongo(structure):
     """
     Converts the 'blocks' key from a list [block_data] to a map
@@ -26,19 +41,36 @@ def structure_from_mongo(structure):
     Converts 'root' from [block_type, block_id] to BlockKey.
     Converts 'blocks.*.fields.children' from [[block_type, block_id]] to [BlockKey].
     N.B. Does not convert any other ReferenceFields (because we don't know which fields they are at this level).
+
+    Each block's BlockKey is created once, and shared by the 'blocks' map, 'root'
+    and the children lists that refer to it. Block types and field names are interned.
     """
-    check('seq[2]', structure['root'])
-    check('list(dict)', structure['blocks'])
-    for block in structure['blocks']:
-        if 'children' in block['fields']:
-            check('list(list[2])', block['fields']['children'])
+    if not all_disabled():
+        check('seq[2]', structure['root'])
+        check('list(dict)', structure['blocks'])
+        for block in structure['blocks']:
+            if 'children' in block['fields']:
+                check('list(list[2])', block['fields']['children'])
+
+    block_keys = {}
 
-    structure['root'] = BlockKey(*structure['root'])
+    def block_key(block_type, block_id):
+        """
+        Returns the one BlockKey for this block in the structure.
+        """
+        key = block_keys.get((block_type, block_id))
+        if key is None:
+            key = block_keys[(block_type, block_id)] = BlockKey(_intern_name(block_type), block_id)
+        return key
+
+    structure['root'] = block_key(*structure['root'])
     new_blocks = {}
     for block in structure['blocks']:
+        block['fields'] = {_intern_name(name): value for name, value in block['fields'].iteritems()}
         if 'children' in block['fields']:
-            block['fields']['children'] = [BlockKey(*child) for child in block['fields']['children']]
-        new_blocks[BlockKey(block['block_type'], block.pop('block_id'))] = BlockData(**block)
+            block['fields']['children'] = [block_key(*child) for child in block['fields']['children']]
+        block['block_type'] = _intern_name(block['block_type'])
+        new_blocks[block_key(block['block_type'], block.pop('block_id'))] = BlockData(**block)
     structure['blocks'] = new_blocks
 
     return structure
@@ -52,11 +84,12 @@ def structure_to_mongo(structure):
     Doesn't convert 'root', since namedtuple's can be inserted
         directly into mongo.
     """
-    check('BlockKey', structure['root'])
-    check('dict(BlockKey: BlockData)', structure['blocks'])
-    for block in structure['blocks'].itervalues():
-        if 'children' in block.fields:
-            check('list(BlockKey)', block.fields['children'])
+    if not all_disabled():
+        check('BlockKey', structure['root'])
+        check('dict(BlockKey: BlockData)', structure['blocks'])
+        for block in structure['blocks'].itervalues():
+            if 'children' in block.fields:
+                check('list(BlockKey)', block.fields['children'])
 
     new_structure = dict(structure)
     new_structure['blocks'] = []
@@ -70,16 +103,48 @@ def structure_to_mongo(structure):
     return new_structure
 
 
+def copy_cached_structure(structure):
+    """
+    Copies a structure from the DocumentCache deeply enough that the caller may
+    do what callers do to structures read from Mongo, which is to load definition
+    fields into the blocks' `fields`. Any other change is made to a structure
+    copied by SplitMongoModuleStore.version_structure.
+    """
+    new_structure = dict(structure)
+    new_blocks = {}
+    for block_key, block in structure['blocks'].iteritems():
+        new_block = copy.copy(block)
+        new_block.fields = dict(block.fields)
+        new_blocks[block_key] = new_block
+    new_structure['blocks'] = new_blocks
+    return new_structure
+
+
+def copy_cached_definition(definition):
+    """
+    Copies a definition from the DocumentCache so that changes to the caller's
+    `fields` don't leak into the cache.
+    """
+    new_definition = dict(definition)
+    if 'fields' in definition:
+        new_definition['fields'] = dict(definition['fields'])
+    return new_definition
+
+
 class MongoConnection(object):
     """
     Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
     """
     def __init__(
         self, db, collection, host, port=27017, tz_aware=True, user=None, password=None,
-        asset_collection=None, retry_wait_time=0.1, **kwargs
+        asset_collection=None, retry_wait_time=0.1, structure_cache_size=0, definition_cache_size=0,
+        shared_document_cache=None, **kwargs
     ):
         """
         Create & open the connection, authenticate, and provide pointers to the collections
+
+        Structures and definitions are cached in this process (up to `structure_cache_size` and
+        `definition_cache_size` documents), and in `shared_document_cache` (a django cache) if given.
         """
         self.database = MongoProxy(
             pymongo.database.Database(
@@ -109,6 +174,23 @@ class MongoConnection(object):
         self.structures.write_concern = {'w': 1}
         self.definitions.write_concern = {'w': 1}
 
+        shared_prefix = u'{}.{}'.format(db, collection)
+        self.structure_cache = DocumentCache(
+            'structure', structure_cache_size, shared_document_cache, shared_prefix, structure_from_mongo
+        )
+        self.definition_cache = DocumentCache(
+            'definition', definition_cache_size, shared_document_cache, shared_prefix
+        )
+
+    def cache_stats(self):
+        """
+        Returns the hit and miss stats of the structure and definition caches.
+        """
+        return {
+            'structures': self.structure_cache.stats(),
+            'definitions': self.definition_cache.stats(),
+        }
+
     def heartbeat(self):
         """
         Check that the db is reachable.
@@ -122,7 +204,14 @@ class MongoConnection(object):
         """
         Get the structure from the persistence mechanism whose id is the given key
         """
-        return structure_from_mongo(self.structures.find_one({'_id': key}))
+        if not self.structure_cache.enabled:
+            return structure_from_mongo(self.structures.find_one({'_id': key}))
+
+        structure = self.structure_cache.get(key, lambda key: self.structures.find_one({'_id': key}))
+        if structure is None:
+            # Match structure_from_mongo, which fails on a missing structure
+            raise TypeError("Structure {} not found".format(key))
+        return copy_cached_structure(structure)
 
     @autoretry_read()
     def find_structures_by_id(self, ids):
@@ -253,13 +342,23 @@ class MongoConnection(object):
         """
         Get the definition from the persistence mechanism whose id is the given key
         """
-        return self.definitions.find_one({'_id': key})
+        if not self.definition_cache.enabled:
+            return self.definitions.find_one({'_id': key})
+
+        definition = self.definition_cache.get(key, lambda key: self.definitions.find_one({'_id': key}))
+        return None if definition is None else copy_cached_definition(definition)
 
     def get_definitions(self, definitions):
         """
         Retrieve all definitions listed in `definitions`.
         """
-        return self.definitions.find({'_id': {'$in': definitions}})
+        if not self.definition_cache.enabled:
+            return self.definitions.find({'_id': {'$in': definitions}})
+
+        found = self.definition_cache.get_many(
+            definitions, lambda keys: self.definitions.find({'_id': {'$in': keys}})
+        )
+        return [copy_cached_definition(definition) for definition in found.itervalues()]
 
     def insert_definition(self, definition):
         """
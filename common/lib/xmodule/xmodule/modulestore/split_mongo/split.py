@@ -80,6 +80,7 @@ from xmodule.modulestore import (
 from ..exceptions import ItemNotFoundError
 from .caching_descriptor_system import CachingDescriptorSystem
 from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, DuplicateKeyError
+from xmodule.modulestore.split_mongo.document_cache import DocumentCache
 from xmodule.modulestore.split_mongo import BlockKey, CourseEnvelope
 from xmodule.error_module import ErrorDescriptor
 from collections import defaultdict
@@ -425,7 +426,7 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
 
         if len(ids):
             # Query the db for the definitions.
-            defs_from_db = self.db_connection.get_definitions(list(ids))
+            defs_from_db = list(self.db_connection.get_definitions(list(ids)))
             # Add the retrieved definitions to the cache.
             bulk_write_record.definitions.update({d.get('_id'): d for d in defs_from_db})
             definitions.extend(defs_from_db)
@@ -628,14 +629,29 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                  default_class=None,
                  error_tracker=null_error_tracker,
                  i18n_service=None, fs_service=None, user_service=None,
-                 services=None, signal_handler=None, **kwargs):
+                 services=None, signal_handler=None, structure_cache_size=0, definition_cache_size=0,
+                 shared_document_cache=None, **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param structure_cache_size: the number of structures to keep in this process between requests.
+        :param definition_cache_size: the number of definitions to keep in this process between requests.
+        :param shared_document_cache: a django cache in which to share structures and definitions between
+            processes, or None.
         """
 
         super(SplitMongoModuleStore, self).__init__(contentstore, **kwargs)
 
-        self.db_connection = MongoConnection(**doc_store_config)
+        self.db_connection = MongoConnection(
+            structure_cache_size=structure_cache_size,
+            definition_cache_size=definition_cache_size,
+            shared_document_cache=shared_document_cache,
+            **doc_store_config
+        )
+        # Inherited settings are computed from a structure, so they're as immutable as it is
+        self.inherited_settings_cache = DocumentCache(
+            'inherited_settings', structure_cache_size, shared_document_cache,
+            u'{}.{}'.format(doc_store_config['db'], doc_store_config['collection']),
+        )
         self.db = self.db_connection.database
 
         if default_class is not None:
@@ -2390,7 +2406,30 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         # in case the course is later restored.
         # super(SplitMongoModuleStore, self).delete_course(course_key, user_id)
 
-    @contract(block_map="dict(BlockKey: dict)", block_key=BlockKey)
+    def get_inherited_settings(self, course_key, structure):
+        """
+        Return a map of BlockKey -> the inheritable settings which each block in
+        `structure` gets from its ancestors, or None if the structure is still
+        being changed by a bulk operation on `course_key`.
+
+        The map is computed once per structure version, and cached like the
+        structures themselves.
+        """
+        bulk_write_record = self._get_bulk_ops_record(course_key)
+        if bulk_write_record.active and structure['_id'] not in bulk_write_record.structures_in_db:
+            return None
+
+        def compute_inherited_settings(version_guid):
+            """
+            Compute the inherited settings of every block reachable from the root.
+            """
+            inherited_settings_map = {}
+            self.inherit_settings(structure['blocks'], structure['root'], inherited_settings_map)
+            return {'_id': version_guid, 'settings': inherited_settings_map}
+
+        return self.inherited_settings_cache.get(structure['_id'], compute_inherited_settings)['settings']
+
+    @contract(block_map="dict(BlockKey: BlockData)", block_key=BlockKey)
     def inherit_settings(
         self, block_map, block_key, inherited_settings_map, inheriting_settings=None, inherited_from=None
     ):
@@ -19,16 +19,19 @@ class SplitMongoKVS(InheritanceKeyValueStore):
     """
 
     @contract(parent="BlockUsageLocator | None")
-    def __init__(self, definition, initial_values, default_values, parent, field_decorator=None):
+    def __init__(self, definition, initial_values, default_values, parent, field_decorator=None,
+                 inherited_settings=None):
         """
 
         :param definition: either a lazyloader or definition id for the definition
         :param initial_values: a dictionary of the locally set values
         :param default_values: any Scope.settings field defaults that are set locally
             (copied from a template block with copy_from_template)
+        :param inherited_settings: the inheritable settings set by the block's ancestors, if
+            they've been precomputed (see SplitMongoModuleStore.get_inherited_settings)
         """
         # deepcopy so that manipulations of fields does not pollute the source
-        super(SplitMongoKVS, self).__init__(copy.deepcopy(initial_values))
+        super(SplitMongoKVS, self).__init__(copy.deepcopy(initial_values), inherited_settings)
         self._definition = definition  # either a DefinitionLazyLoader or the db id of the definition.
         # if the db id, then the definition is presumed to be loaded into _fields
 
@@ -118,6 +121,10 @@ class SplitMongoKVS(InheritanceKeyValueStore):
         Check to see if the default should be from the template's defaults (if any)
         rather than the global default or inheritance.
         """
+        # Values set on an ancestor take precedence over the template's defaults, as
+        # they do when InheritingFieldData finds them by walking up the parents
+        if key.field_name in self.inherited_settings:
+            return self.inherited_settings[key.field_name]
         if self._defaults and key.field_name in self._defaults:
             return self._defaults[key.field_name]
         # If not, try inheriting from a parent, then use the XBlock type's normal default value:
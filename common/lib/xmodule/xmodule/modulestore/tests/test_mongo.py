@@ -11,11 +11,13 @@ from path import path
 import pymongo
 import logging
 import shutil
-from tempfile import mkdtemp
+import tarfile
+from tempfile import mkdtemp, TemporaryFile
 from uuid import uuid4
 from datetime import datetime
 from pytz import UTC
 import unittest
+from mock import patch, Mock
 from xblock.core import XBlock
 
 from xblock.fields import Scope, Reference, ReferenceList, ReferenceValueDict
@@ -31,7 +33,7 @@ from xmodule.modulestore.draft import DraftModuleStore
 from opaque_keys.edx.locations import SlashSeparatedCourseKey, AssetLocation
 from opaque_keys.edx.locator import LibraryLocator, CourseLocator
 from opaque_keys.edx.keys import UsageKey
-from xmodule.modulestore.xml_exporter import export_to_xml
+from xmodule.modulestore.xml_exporter import export_to_tar, export_to_xml
 from xmodule.modulestore.xml_importer import import_from_xml, perform_xlint
 from xmodule.contentstore.mongo import MongoContentStore
 
@@ -520,6 +522,30 @@ class TestMongoModuleStore(TestMongoModuleStoreBase):
         finally:
             shutil.rmtree(root_dir)
 
+    def test_export_to_tar(self):
+        """
+        Test that exporting the course to a tar archive writes the same files as exporting it to a directory
+        """
+        course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        root_dir = path(mkdtemp())
+        try:
+            export_to_xml(self.draft_store, self.content_store, course_key, root_dir, 'test_export')
+            exported_files = {
+                (root_dir.relpathto(filename), filename.bytes()) for filename in root_dir.walkfiles()
+            }
+        finally:
+            shutil.rmtree(root_dir)
+
+        with TemporaryFile() as output:
+            export_to_tar(self.draft_store, self.content_store, course_key, output, 'test_export')
+            output.seek(0)
+            with tarfile.open(fileobj=output) as tar_file:
+                archived_files = {
+                    (member.name, tar_file.extractfile(member).read())
+                    for member in tar_file.getmembers() if member.isfile()
+                }
+        assert_equals(archived_files, exported_files)
+
     def test_export_course_image_nondefault(self):
         """
         Make sure that if a non-default image path is specified that we
@@ -738,6 +764,131 @@ class TestMongoModuleStoreWithNoAssetCollection(TestMongoModuleStore):
         self.assertRaises(ItemNotFoundError, lambda: self.draft_store.get_all_asset_metadata(course_key, 'asset')[:1])
 
 
+class DictCache(object):
+    """
+    The parts of the django cache API used for the metadata inheritance cache.
+    """
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def get_many(self, keys):
+        return {key: self.data[key] for key in keys if key in self.data}
+
+    def set(self, key, value):
+        self.data[key] = value
+
+    def add(self, key, value, timeout=None):  # pylint: disable=unused-argument
+        if key in self.data:
+            return False
+        self.data[key] = value
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+class TestAsyncInheritanceRecompute(TestMongoModuleStoreBase):
+    """
+    Tests of recomputing the metadata inheritance tree in the background.
+    """
+    def setUp(self):
+        super(TestAsyncInheritanceRecompute, self).setUp()
+        self.cache = DictCache()
+        self.store = self._create_store()
+        self.course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        self.tree_key, self.stale_key, self.lock_key = self.store._metadata_inheritance_cache_keys(self.course_key)
+        self.tree = self.store._get_cached_metadata_inheritance_tree(self.course_key)
+
+    def _create_store(self):
+        """
+        Create a store, as run by another process, which shares the metadata inheritance cache.
+        """
+        return DraftModuleStore(
+            self.content_store,
+            {'host': HOST, 'db': DB, 'port': PORT, 'collection': COLLECTION},
+            FS_ROOT, RENDER_TEMPLATE,
+            default_class=DEFAULT_CLASS,
+            branch_setting_func=lambda: ModuleStoreEnum.Branch.draft_preferred,
+            metadata_inheritance_cache_subsystem=self.cache,
+            recompute_inheritance_async=True,
+        )
+
+    def test_stale_tree_served(self):
+        other_store = self._create_store()
+        with patch.object(self.store, '_start_metadata_inheritance_recompute'):
+            self.store.refresh_cached_metadata_inheritance_tree(self.course_key)
+        self.assertIn(self.stale_key, self.cache.data)
+
+        with patch.object(other_store, '_start_metadata_inheritance_recompute') as mock_start:
+            with patch.object(other_store, '_compute_metadata_inheritance_tree') as mock_compute:
+                self.assertEqual(other_store._get_cached_metadata_inheritance_tree(self.course_key), self.tree)
+        self.assertFalse(mock_compute.called)
+        self.assertEqual(mock_start.call_count, 1)
+
+    @patch('xmodule.modulestore.mongo.base.threading.Thread')
+    def test_calling_process_sees_edit(self, _mock_thread):
+        self.store.request_cache = Mock(data={})
+        runtime = Mock(cached_metadata={'stale': 'tree'})
+        self.cache.set(self.tree_key, {'stale': 'tree'})
+
+        with patch.object(
+            self.store, '_compute_metadata_inheritance_tree', wraps=self.store._compute_metadata_inheritance_tree
+        ) as mock_compute:
+            self.store.refresh_cached_metadata_inheritance_tree(self.course_key, runtime)
+            self.store.refresh_cached_metadata_inheritance_tree(self.course_key, runtime)
+            # computed once, when first read
+            self.assertFalse(mock_compute.called)
+            self.assertEqual(dict(self.store._get_cached_metadata_inheritance_tree(self.course_key)), self.tree)
+            self.assertEqual(dict(runtime.cached_metadata), self.tree)
+            self.assertEqual(mock_compute.call_count, 1)
+
+            # and later requests see the edit too
+            self.store.request_cache.data = {}
+            self.assertEqual(dict(self.store._get_cached_metadata_inheritance_tree(self.course_key)), self.tree)
+            self.assertEqual(mock_compute.call_count, 1)
+
+        # other processes keep the last good tree until the recompute
+        self.assertEqual(self.cache.get(self.tree_key), {'stale': 'tree'})
+        self.assertEqual(self._create_store()._get_cached_metadata_inheritance_tree(self.course_key), {'stale': 'tree'})
+
+    @patch('xmodule.modulestore.mongo.base.threading.Thread')
+    def test_later_edit_by_other_process(self, _mock_thread):
+        self.store.refresh_cached_metadata_inheritance_tree(self.course_key)
+        self.cache.set(self.tree_key, {'stale': 'tree'})
+        self._create_store().refresh_cached_metadata_inheritance_tree(self.course_key)
+
+        # the tree with this process's edit lacks the other one, so the last good tree is served
+        self.assertEqual(self.store._get_cached_metadata_inheritance_tree(self.course_key), {'stale': 'tree'})
+
+    @patch('xmodule.modulestore.mongo.base.threading.Thread')
+    def test_one_recompute_at_a_time(self, mock_thread):
+        self.store.refresh_cached_metadata_inheritance_tree(self.course_key)
+        self.store.refresh_cached_metadata_inheritance_tree(self.course_key)
+        self.assertEqual(mock_thread.call_count, 1)
+        self.assertIn(self.lock_key, self.cache.data)
+
+    @patch('xmodule.modulestore.mongo.base.time.sleep')
+    @patch('xmodule.modulestore.mongo.base.threading.Thread')
+    def test_recompute(self, mock_thread, _mock_sleep):
+        mock_thread.return_value.start.side_effect = lambda: self.store._recompute_metadata_inheritance_tree(
+            *mock_thread.call_args[1]['args']
+        )
+        self.cache.set(self.tree_key, {'stale': 'tree'})
+
+        with patch.object(
+            self.store, '_compute_metadata_inheritance_tree', wraps=self.store._compute_metadata_inheritance_tree
+        ) as mock_compute:
+            self.store.refresh_cached_metadata_inheritance_tree(self.course_key)
+
+        self.assertEqual(mock_compute.call_count, 1)
+        self.assertEqual(self.cache.get(self.tree_key), self.tree)
+        self.assertNotIn(self.stale_key, self.cache.data)
+        self.assertNotIn(self.lock_key, self.cache.data)
+
+
 class TestMongoKeyValueStore(unittest.TestCase):
     """
     Tests for MongoKeyValueStore.
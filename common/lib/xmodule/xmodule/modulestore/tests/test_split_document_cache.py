@@ -0,0 +1,173 @@
+"""
+Tests for the caches of split modulestore structures and definitions.
+"""
+import unittest
+
+from mock import Mock
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.document_cache import DocumentCache
+from xmodule.modulestore.split_mongo.mongo_connection import (
+    copy_cached_structure, structure_from_mongo, structure_to_mongo
+)
+
+
+class DictCache(object):
+    """
+    The parts of the django cache API used by DocumentCache, pickling aside.
+    """
+    def __init__(self):
+        self.data = {}
+
+    def get_many(self, keys):
+        return {key: dict(self.data[key]) for key in keys if key in self.data}
+
+    def set_many(self, data):
+        self.data.update(data)
+
+
+class TestDocumentCache(unittest.TestCase):
+    """
+    Tests of DocumentCache.
+    """
+    def setUp(self):
+        super(TestDocumentCache, self).setUp()
+        self.documents = {doc_id: {'_id': doc_id, 'value': doc_id * 10} for doc_id in range(5)}
+        self.load_many = Mock(
+            side_effect=lambda ids: [dict(self.documents[doc_id]) for doc_id in ids if doc_id in self.documents]
+        )
+        self.load_one = Mock(side_effect=lambda doc_id: dict(self.documents[doc_id]) if doc_id in self.documents else None)
+
+    def test_hit_after_miss(self):
+        cache = DocumentCache('test', 10)
+        self.assertEqual(cache.get(1, self.load_one), self.documents[1])
+        self.assertEqual(cache.get(1, self.load_one), self.documents[1])
+        self.assertEqual(self.load_one.call_count, 1)
+        self.assertEqual(cache.stats(), {'hits': 1, 'shared_hits': 0, 'misses': 1, 'size': 1})
+
+    def test_missing_document(self):
+        cache = DocumentCache('test', 10)
+        self.assertIsNone(cache.get(42, self.load_one))
+        self.assertIsNone(cache.get(42, self.load_one))
+        self.assertEqual(self.load_one.call_count, 2)
+
+    def test_least_recently_used_evicted(self):
+        cache = DocumentCache('test', 2)
+        cache.get(0, self.load_one)
+        cache.get(1, self.load_one)
+        cache.get(0, self.load_one)
+        cache.get(2, self.load_one)
+        self.assertEqual(cache.stats()['size'], 2)
+
+        self.load_one.reset_mock()
+        cache.get(0, self.load_one)
+        self.assertFalse(self.load_one.called)
+        cache.get(1, self.load_one)
+        self.assertTrue(self.load_one.called)
+
+    def test_get_many_only_loads_missing(self):
+        cache = DocumentCache('test', 10)
+        cache.get_many([0, 1], self.load_many)
+        found = cache.get_many([0, 1, 2, 3, 42], self.load_many)
+        self.assertEqual(found, {doc_id: self.documents[doc_id] for doc_id in range(4)})
+        self.load_many.assert_called_with([2, 3, 42])
+
+    def test_shared_cache(self):
+        shared_cache = DictCache()
+        from_mongo = lambda document: dict(document, converted=True)
+        first = DocumentCache('test', 10, shared_cache, 'db.collection', from_mongo)
+        second = DocumentCache('test', 10, shared_cache, 'db.collection', from_mongo)
+
+        first.get_many([0, 1], self.load_many)
+        self.load_many.reset_mock()
+        found = second.get_many([0, 1], self.load_many)
+        self.assertFalse(self.load_many.called)
+        self.assertTrue(found[0]['converted'])
+        # The shared cache holds documents as they were read from Mongo
+        self.assertNotIn('converted', shared_cache.data.values()[0])
+        self.assertEqual(second.stats(), {'hits': 0, 'shared_hits': 2, 'misses': 0, 'size': 2})
+
+    def test_disabled(self):
+        cache = DocumentCache('test', 0)
+        self.assertFalse(cache.enabled)
+        cache.get(1, self.load_one)
+        cache.get(1, self.load_one)
+        self.assertEqual(self.load_one.call_count, 2)
+
+
+class TestCopyCachedStructure(unittest.TestCase):
+    """
+    Tests of copy_cached_structure.
+    """
+    def test_fields_copied(self):
+        block_key = BlockKey('html', 'intro')
+        structure = {
+            '_id': 'version',
+            'root': block_key,
+            'blocks': {block_key: BlockData(block_type='html', fields={'display_name': 'Intro'})},
+        }
+        copied = copy_cached_structure(structure)
+        copied['blocks'][block_key].fields.update({'data': '<p>Loaded definition</p>'})
+        copied['blocks'][block_key].definition_loaded = True
+
+        self.assertEqual(structure['blocks'][block_key].fields, {'display_name': 'Intro'})
+        self.assertFalse(structure['blocks'][block_key].definition_loaded)
+
+
+class TestStructureFromMongo(unittest.TestCase):
+    """
+    Tests of the compact structure representation made by structure_from_mongo.
+    """
+    def _mongo_structure(self):
+        """
+        A structure as it's stored in Mongo.
+        """
+        return {
+            '_id': 'version',
+            'root': [u'course', u'course'],
+            'blocks': [
+                {
+                    'block_type': u'course', 'block_id': u'course', 'definition': 'course_def',
+                    'fields': {u'display_name': u'Course', u'children': [[u'chapter', u'one'], [u'chapter', u'two']]},
+                    'edit_info': {},
+                },
+                {
+                    'block_type': u'chapter', 'block_id': u'one', 'definition': 'one_def',
+                    'fields': {u'display_name': u'One'}, 'edit_info': {},
+                },
+                {
+                    'block_type': u'chapter', 'block_id': u'two', 'definition': 'two_def',
+                    'fields': {u'display_name': u'Two'}, 'edit_info': {},
+                },
+            ],
+        }
+
+    def test_block_keys_shared(self):
+        structure = structure_from_mongo(self._mongo_structure())
+        block_keys = {block_key: block_key for block_key in structure['blocks']}
+        root_key = BlockKey(u'course', u'course')
+
+        self.assertIs(structure['root'], block_keys[root_key])
+        for child in structure['blocks'][root_key].fields['children']:
+            self.assertIs(child, block_keys[child])
+
+    def test_names_interned(self):
+        first = structure_from_mongo(self._mongo_structure())
+        second = structure_from_mongo(self._mongo_structure())
+        first_block = first['blocks'][BlockKey(u'chapter', u'one')]
+        second_block = second['blocks'][BlockKey(u'chapter', u'two')]
+
+        self.assertIs(first_block.block_type, second_block.block_type)
+        self.assertIs(first_block.fields.keys()[0], second_block.fields.keys()[0])
+
+    def test_round_trip(self):
+        structure = structure_to_mongo(structure_from_mongo(self._mongo_structure()))
+        expected = self._mongo_structure()
+        # BlockKeys are stored as [block_type, block_id] pairs
+        for block in expected['blocks']:
+            if 'children' in block['fields']:
+                block['fields']['children'] = [tuple(child) for child in block['fields']['children']]
+        self.assertEqual(
+            sorted((block['block_type'], block['block_id'], block['fields']) for block in structure['blocks']),
+            sorted((block['block_type'], block['block_id'], block['fields']) for block in expected['blocks']),
+        )
@@ -989,6 +989,26 @@ class SplitModuleItemTests(SplitModuleTest):
             expected_ids.remove(child.location.block_id)
         self.assertEqual(len(expected_ids), 0)
 
+    def test_definitions_prefetched_for_siblings(self):
+        """
+        Reading the content of one block fetches the definitions of its siblings in the same call
+        """
+        course = modulestore().create_course('testx', 'prefetch', 'run', self.user_id, BRANCH_NAME_DRAFT)
+        vertical = modulestore().create_child(self.user_id, course.location, 'vertical', block_id='vertical')
+        for index in range(3):
+            modulestore().create_child(
+                self.user_id, vertical.location, 'html', block_id='html{}'.format(index),
+                fields={'data': '<p>Content {}</p>'.format(index)}
+            )
+
+        vertical = modulestore().get_item(vertical.location.version_agnostic(), depth=1)
+        children = vertical.get_children()
+        self.assertEqual(
+            [child.data for child in children],
+            ['<p>Content {}</p>'.format(index) for index in range(3)]
+        )
+        self.assertEqual(vertical.runtime.num_definition_fetches, 1)
+
 
 def version_agnostic(children):
     """
@@ -1677,6 +1697,24 @@ class TestInheritance(SplitModuleTest):
         # overridden
         self.assertEqual(node.graceperiod, datetime.timedelta(hours=4))
 
+    def test_inheritance_precomputed(self):
+        """
+        Inherited settings come from the map computed for the structure version, unless
+        the structure is being changed in a bulk operation
+        """
+        course_key = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        problem = modulestore().get_item(BlockUsageLocator(course_key, 'problem', 'problem3_2'))
+        self.assertIn('graceperiod', problem.xblock_kvs.inherited_settings)
+        self.assertEqual(problem.graceperiod, datetime.timedelta(hours=2))
+
+        with modulestore().bulk_operations(course_key):
+            chapter = modulestore().get_item(BlockUsageLocator(course_key, 'chapter', 'chapter3'))
+            chapter.visible_to_staff_only = True
+            modulestore().update_item(chapter, self.user_id)
+            problem = modulestore().get_item(problem.location.version_agnostic())
+            self.assertEqual(problem.xblock_kvs.inherited_settings, {})
+            self.assertTrue(problem.visible_to_staff_only)
+
     def test_inheritance_not_saved(self):
         """
         Was saving inherited settings with updated blocks causing inheritance to be sticky
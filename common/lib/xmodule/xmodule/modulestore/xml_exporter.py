@@ -2,6 +2,7 @@
 Methods for exporting course data to XML
 """
 
+from io import BytesIO
 import logging
 import lxml.etree
 from xblock.fields import Scope, Reference, ReferenceList, ReferenceValueDict
@@ -16,7 +17,10 @@ from json import dumps
 import json
 import os
 from path import path
+import posixpath
 import shutil
+import tarfile
+import time
 from xmodule.modulestore.draft_and_published import DIRECT_ONLY_CATEGORIES
 from opaque_keys.edx.locator import CourseLocator
 
@@ -27,6 +31,149 @@ EXPORT_VERSION_KEY = "export_format"
 
 DEFAULT_CONTENT_FIELDS = ['metadata', 'data']
 
+# The size of the chunks assets are read from the contentstore in
+ASSET_CHUNK_SIZE = 256 * 1024
+
+
+class _TarExportFile(BytesIO):
+    """
+    A file written to a TarExportFS, which is added to the archive when it's closed.
+    """
+    def __init__(self, export_fs, path):
+        BytesIO.__init__(self)
+        self._export_fs = export_fs
+        self._path = path
+
+    def write(self, data):
+        if isinstance(data, unicode):
+            data = data.encode('utf-8')
+        BytesIO.write(self, data)
+
+    def close(self):
+        if not self.closed:
+            self._export_fs.add_stream(self._path, [self.getvalue()], len(self.getvalue()))
+        BytesIO.close(self)
+
+
+class _ChunkReader(object):
+    """
+    A file-like object reading from an iterable of chunks of bytes, for tarfile to copy from.
+    """
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = ''
+
+    def read(self, size):
+        while len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+class TarExportFS(object):
+    """
+    A write-only stand-in for the OSFS directory a course is exported to, which adds
+    every directory and file written to it to a tar archive instead of the disk.
+
+    It supports what exporting a course uses: makedir, makeopendir, and open for writing.
+    """
+    def __init__(self, tar_file, root_path, _directories=None):
+        self.tar_file = tar_file
+        self.root_path = root_path
+        self._directories = _directories if _directories is not None else set()
+        self.makedir('', allow_recreate=True)
+
+    def _tar_path(self, path):
+        """Return the path of the path in the archive"""
+        return posixpath.normpath(posixpath.join(self.root_path, path.lstrip('/')))
+
+    def _add_directory(self, tar_path):
+        """Add the directory and its parents to the archive, if they aren't already"""
+        if tar_path in ('', '.') or tar_path in self._directories:
+            return
+        self._add_directory(posixpath.dirname(tar_path))
+        info = tarfile.TarInfo(tar_path)
+        info.type = tarfile.DIRTYPE
+        info.mode = 0755
+        info.mtime = time.time()
+        self.tar_file.addfile(info)
+        self._directories.add(tar_path)
+
+    def makedir(self, path, recursive=False, allow_recreate=False):  # pylint: disable=unused-argument
+        """Add the directory, and its parents, to the archive"""
+        self._add_directory(self._tar_path(path))
+
+    def makeopendir(self, path, recursive=False):
+        """Add the directory to the archive, and return a TarExportFS writing in it"""
+        self.makedir(path, recursive=recursive, allow_recreate=True)
+        return self.opendir(path)
+
+    def opendir(self, path):
+        """Return a TarExportFS writing in the directory"""
+        return TarExportFS(self.tar_file, self._tar_path(path), self._directories)
+
+    def open(self, path, mode='r', **kwargs):  # pylint: disable=unused-argument
+        """Open a file for writing: it's added to the archive once it's closed"""
+        if 'w' not in mode:
+            raise ValueError('Can only write to a TarExportFS, not open files in mode {}'.format(mode))
+        return _TarExportFile(self, path)
+
+    def add_stream(self, path, chunks, size):
+        """
+        Add the file of the given size, made of the chunks of bytes, to the archive
+        without holding all of it in memory.
+        """
+        tar_path = self._tar_path(path)
+        self._add_directory(posixpath.dirname(tar_path))
+        info = tarfile.TarInfo(tar_path)
+        info.size = size
+        info.mode = 0644
+        info.mtime = time.time()
+        self.tar_file.addfile(info, _ChunkReader(chunks))
+
+
+def _write_stream(export_fs, path, chunks, size):
+    """
+    Write the file made of the chunks of bytes to export_fs, streaming it into the archive of a TarExportFS.
+    """
+    if isinstance(export_fs, TarExportFS):
+        export_fs.add_stream(path, chunks, size)
+    else:
+        with export_fs.open(path, 'wb') as output:
+            for chunk in chunks:
+                output.write(chunk)
+
+
+def _export_static_assets(contentstore, course_key, export_fs, policies_dir):
+    """
+    Export all the course's assets in the static directory of export_fs, reading them in chunks,
+    and their attributes to policies/assets.json.
+    """
+    static_fs = export_fs.makeopendir('static')
+    policy = {}
+    assets, __ = contentstore.get_all_content_for_course(course_key)
+    for asset in assets:
+        content = contentstore.find(asset['asset_key'], as_stream=True)
+        asset_path = content.name
+        if content.import_path is not None:
+            asset_dir = os.path.dirname(content.import_path)
+            if asset_dir:
+                static_fs.makedir(asset_dir, recursive=True, allow_recreate=True)
+                asset_path = asset_dir + '/' + content.name
+        try:
+            _write_stream(static_fs, asset_path, content.stream_data(chunk_size=ASSET_CHUNK_SIZE), content.length)
+        finally:
+            content.close()
+        for attr, value in asset.iteritems():
+            if attr not in ['_id', 'md5', 'uploadDate', 'length', 'chunkSize', 'asset_key']:
+                policy.setdefault(asset['asset_key'].name, {})[attr] = value
+
+    with policies_dir.open('assets.json', 'w') as assets_policy:
+        json.dump(policy, assets_policy, sort_keys=True, indent=4)
+
 
 def export_to_xml(modulestore, contentstore, course_key, root_dir, course_dir):
     """
@@ -38,6 +185,31 @@ def export_to_xml(modulestore, contentstore, course_key, root_dir, course_dir):
     `root_dir`: The directory to write the exported xml to
     `course_dir`: The name of the directory inside `root_dir` to write the course content to
     """
+    export_to_fs(modulestore, contentstore, course_key, OSFS(root_dir).makeopendir(course_dir))
+
+
+def export_to_tar(modulestore, contentstore, course_key, output, course_dir):
+    """
+    Export all modules from `modulestore` and content from `contentstore` as a .tar.gz archive
+    written to `output`, without writing the course to the disk first.
+
+    `output`: A file-like object to write the archive to. It's written sequentially, so it
+        doesn't need to be seekable.
+    `course_dir`: The name of the directory in the archive to put the course content in
+
+    See export_to_xml for the other arguments.
+    """
+    with tarfile.open(fileobj=output, mode='w|gz') as tar_file:
+        export_to_fs(modulestore, contentstore, course_key, TarExportFS(tar_file, course_dir))
+
+
+def export_to_fs(modulestore, contentstore, course_key, export_fs):
+    """
+    Export all modules from `modulestore` and content from `contentstore` as xml to the
+    directory `export_fs`, an OSFS directory or a TarExportFS.
+
+    See export_to_xml for the other arguments.
+    """
 
     with modulestore.bulk_operations(course_key):
 
@@ -47,9 +219,7 @@ def export_to_xml(modulestore, contentstore, course_key, root_dir, course_dir):
         # Why these parameters? Because a course export needs to access all the course block information
         # eventually. Accessing it all now at the beginning increases performance of the export.
         course = modulestore.get_course(course_key, depth=None, lazy=False)
-        fsm = OSFS(root_dir)
-        export_fs = course.runtime.export_fs = fsm.makeopendir(course_dir)
-        root_course_dir = root_dir + '/' + course_dir
+        course.runtime.export_fs = export_fs
 
         root = lxml.etree.Element('unknown')
 
@@ -65,26 +235,20 @@ def export_to_xml(modulestore, contentstore, course_key, root_dir, course_dir):
             lxml.etree.ElementTree(root).write(course_xml)
 
         # Export the modulestore's asset metadata.
-        asset_dir = root_course_dir + '/' + AssetMetadata.EXPORTED_ASSET_DIR + '/'
-        if not os.path.isdir(asset_dir):
-            os.makedirs(asset_dir)
         asset_root = lxml.etree.Element(AssetMetadata.ALL_ASSETS_XML_TAG)
         course_assets = modulestore.get_all_asset_metadata(course_key, None)
         for asset_md in course_assets:
             # All asset types are exported using the "asset" tag - but their asset type is specified in each asset key.
             asset = lxml.etree.SubElement(asset_root, AssetMetadata.ASSET_XML_TAG)
             asset_md.to_xml(asset)
-        with OSFS(asset_dir).open(AssetMetadata.EXPORTED_ASSET_FILENAME, 'w') as asset_xml_file:
+        asset_fs = export_fs.makeopendir(AssetMetadata.EXPORTED_ASSET_DIR)
+        with asset_fs.open(AssetMetadata.EXPORTED_ASSET_FILENAME, 'w') as asset_xml_file:
             lxml.etree.ElementTree(asset_root).write(asset_xml_file)
 
         # export the static assets
         policies_dir = export_fs.makeopendir('policies')
         if contentstore:
-            contentstore.export_all_for_course(
-                course_key,
-                root_course_dir + '/static/',
-                root_course_dir + '/policies/assets.json',
-            )
+            _export_static_assets(contentstore, course_key, export_fs, policies_dir)
 
             # If we are using the default course image, export it to the
             # legacy location to support backwards compatibility.
@@ -99,10 +263,8 @@ def export_to_xml(modulestore, contentstore, course_key, root_dir, course_dir):
                 except NotFoundError:
                     pass
                 else:
-                    output_dir = root_course_dir + '/static/images/'
-                    if not os.path.isdir(output_dir):
-                        os.makedirs(output_dir)
-                    with OSFS(output_dir).open('course_image.jpg', 'wb') as course_image_file:
+                    export_fs.makedir('static/images', recursive=True, allow_recreate=True)
+                    with export_fs.open('static/images/course_image.jpg', 'wb') as course_image_file:
                         course_image_file.write(course_image.data)
 
         # export the static tabs
@@ -20,9 +20,12 @@ Modulestore virtual   |          XML physical (draft, published)
              (a, a)   |  (a, a) | (x, a) | (x, x) | (x, y) | (a, x)
              (a, b)   |  (a, b) | (x, b) | (x, x) | (x, y) | (a, x)
 """
+from contextlib import contextmanager
 import logging
+from multiprocessing.pool import ThreadPool
 import os
 import mimetypes
+import time
 from path import path
 import json
 import re
@@ -49,10 +52,17 @@ from xmodule.modulestore.store_utilities import draft_node_constructor, get_draf
 
 log = logging.getLogger(__name__)
 
+# The number of threads importing the static assets of a course
+STATIC_IMPORT_WORKERS = 8
+
 
 def import_static_content(
         course_data_path, static_content_store,
-        target_course_id, subpath='static', verbose=False):
+        target_course_id, subpath='static', verbose=False, workers=STATIC_IMPORT_WORKERS):
+    """
+    Import the static assets in course_data_path/subpath into static_content_store,
+    reading them and saving them and their thumbnails from `workers` threads.
+    """
 
     remap_dict = {}
 
@@ -72,6 +82,7 @@ def import_static_content(
     mimetypes.add_type('application/octet-stream', '.srt')
     mimetypes_list = mimetypes.types_map.values()
 
+    content_paths = []
     for dirname, _, filenames in os.walk(static_dir):
         for filename in filenames:
 
@@ -82,67 +93,100 @@ def import_static_content(
                     log.debug('skipping static content %s...', content_path)
                 continue
 
-            if verbose:
-                log.debug('importing static content %s...', content_path)
+            content_paths.append(content_path)
 
-            try:
-                with open(content_path, 'rb') as f:
-                    data = f.read()
-            except IOError:
-                if filename.startswith('._'):
-                    # OS X "companion files". See
-                    # http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
-                    continue
-                # Not a 'hidden file', then re-raise exception
-                raise
-
-            # strip away leading path from the name
-            fullname_with_subpath = content_path.replace(static_dir, '')
-            if fullname_with_subpath.startswith('/'):
-                fullname_with_subpath = fullname_with_subpath[1:]
-            asset_key = StaticContent.compute_location(target_course_id, fullname_with_subpath)
-
-            policy_ele = policy.get(asset_key.path, {})
-            displayname = policy_ele.get('displayname', filename)
-            locked = policy_ele.get('locked', False)
-            mime_type = policy_ele.get('contentType')
-
-            # Check extracted contentType in list of all valid mimetypes
-            if not mime_type or mime_type not in mimetypes_list:
-                mime_type = mimetypes.guess_type(filename)[0]   # Assign guessed mimetype
-            content = StaticContent(
-                asset_key, displayname, mime_type, data,
-                import_path=fullname_with_subpath, locked=locked
-            )
+    def import_static_file(content_path):
+        """
+        Save the asset at content_path, and return its name and key, or None if it was skipped.
+        """
+        filename = os.path.basename(content_path)
+        if verbose:
+            log.debug('importing static content %s...', content_path)
 
-            # first let's save a thumbnail so we can get back a thumbnail location
-            thumbnail_content, thumbnail_location = static_content_store.generate_thumbnail(content)
+        try:
+            with open(content_path, 'rb') as f:
+                data = f.read()
+        except IOError:
+            if filename.startswith('._'):
+                # OS X "companion files". See
+                # http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
+                return None
+            # Not a 'hidden file', then re-raise exception
+            raise
 
-            if thumbnail_content is not None:
-                content.thumbnail_location = thumbnail_location
+        # strip away leading path from the name
+        fullname_with_subpath = content_path.replace(static_dir, '')
+        if fullname_with_subpath.startswith('/'):
+            fullname_with_subpath = fullname_with_subpath[1:]
+        asset_key = StaticContent.compute_location(target_course_id, fullname_with_subpath)
+
+        policy_ele = policy.get(asset_key.path, {})
+        displayname = policy_ele.get('displayname', filename)
+        locked = policy_ele.get('locked', False)
+        mime_type = policy_ele.get('contentType')
+
+        # Check extracted contentType in list of all valid mimetypes
+        if not mime_type or mime_type not in mimetypes_list:
+            mime_type = mimetypes.guess_type(filename)[0]   # Assign guessed mimetype
+        content = StaticContent(
+            asset_key, displayname, mime_type, data,
+            import_path=fullname_with_subpath, locked=locked
+        )
 
-            # then commit the content
-            try:
-                static_content_store.save(content)
-            except Exception as err:
-                log.exception(u'Error importing {0}, error={1}'.format(
-                    fullname_with_subpath, err
-                ))
-
-            # store the remapping information which will be needed
-            # to subsitute in the module data
+        # first let's save a thumbnail so we can get back a thumbnail location
+        thumbnail_content, thumbnail_location = static_content_store.generate_thumbnail(content)
+
+        if thumbnail_content is not None:
+            content.thumbnail_location = thumbnail_location
+
+        # then commit the content
+        try:
+            static_content_store.save(content)
+        except Exception as err:
+            log.exception(u'Error importing {0}, error={1}'.format(
+                fullname_with_subpath, err
+            ))
+
+        return fullname_with_subpath, asset_key
+
+    # Reading and saving assets mostly waits on the disk and the content store, so threads overlap well
+    if workers > 1 and len(content_paths) > 1:
+        pool = ThreadPool(min(workers, len(content_paths)))
+        try:
+            imported = pool.map(import_static_file, content_paths)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        imported = [import_static_file(content_path) for content_path in content_paths]
+
+    # store the remapping information which will be needed
+    # to subsitute in the module data
+    for entry in imported:
+        if entry is not None:
+            fullname_with_subpath, asset_key = entry
             remap_dict[fullname_with_subpath] = asset_key
 
     return remap_dict
 
 
+@contextmanager
+def _log_duration(stage, course_key):
+    """
+    Log how long the stage of the import of the course took.
+    """
+    start = time.time()
+    yield
+    log.info(u'Importing %s: %s took %.2fs', course_key, stage, time.time() - start)
+
+
 def import_from_xml(
         store, user_id, data_dir, course_dirs=None,
         default_class='xmodule.raw_module.RawDescriptor',
         load_error_modules=True, static_content_store=None,
         target_course_id=None, verbose=False,
         do_import_static=True, create_course_if_not_present=False,
-        raise_on_failure=False):
+        raise_on_failure=False, static_import_workers=STATIC_IMPORT_WORKERS):
     """
     Import xml-based courses from data_dir into modulestore.
 
@@ -174,16 +218,20 @@ def import_from_xml(
             Otherwise, it throws an InvalidLocationError if the course does not exist.
 
         default_class, load_error_modules: are arguments for constructing the XMLModuleStore (see its doc)
+
+        static_import_workers: the number of threads importing the static files. The static files are
+            imported in the background while the modules are written to the store.
     """
 
-    xml_module_store = XMLModuleStore(
-        data_dir,
-        default_class=default_class,
-        course_dirs=course_dirs,
-        load_error_modules=load_error_modules,
-        xblock_mixins=store.xblock_mixins,
-        xblock_select=store.xblock_select,
-    )
+    with _log_duration('parsing XML', data_dir):
+        xml_module_store = XMLModuleStore(
+            data_dir,
+            default_class=default_class,
+            course_dirs=course_dirs,
+            load_error_modules=load_error_modules,
+            xblock_mixins=store.xblock_mixins,
+            xblock_select=store.xblock_select,
+        )
 
     # If we're going to remap the course_id, then we can only do that with
     # a single course
@@ -218,7 +266,8 @@ def import_from_xml(
                 )
                 continue
 
-        with store.bulk_operations(dest_course_id):
+        # Every module is written in this one bulk operation, so split saves a single new structure at its end
+        with store.bulk_operations(dest_course_id), _log_duration('importing course', dest_course_id):
             source_course = xml_module_store.get_course(course_key)
             # STEP 1: find and import course module
             course, course_data_path = _import_course_module(
@@ -228,74 +277,97 @@ def import_from_xml(
             )
             new_courses.append(course)
 
-            # STEP 2: import static content
-            _import_static_content_wrapper(
-                static_content_store, do_import_static, course_data_path, dest_course_id, verbose
+            # STEP 2: import static content, in the background, as it doesn't depend on the modules
+            static_import_pool = ThreadPool(1)
+            static_import = static_import_pool.apply_async(
+                _import_static_content_wrapper,
+                (static_content_store, do_import_static, course_data_path, dest_course_id, verbose),
+                {'workers': static_import_workers}
             )
+            static_import_pool.close()
+            try:
+                _import_course_modules(
+                    xml_module_store, store, user_id, course, course_key, dest_course_id, course_data_path,
+                    source_course, do_import_static, raise_on_failure, verbose
+                )
+            finally:
+                static_import_pool.join()
+            static_import.get()
 
-            # Import asset metadata stored in XML.
-            _import_course_asset_metadata(store, course_data_path, dest_course_id, raise_on_failure)
-
-            # STEP 3: import PUBLISHED items
-            # now loop through all the modules depth first and then orphans
-            with store.branch_setting(ModuleStoreEnum.Branch.published_only, dest_course_id):
-                all_locs = set(xml_module_store.modules[course_key].keys())
-                all_locs.remove(source_course.location)
-
-                def depth_first(subtree):
-                    """
-                    Import top down just so import code can make assumptions about parents always being available
-                    """
-                    if subtree.has_children:
-                        for child in subtree.get_children():
-                            try:
-                                all_locs.remove(child.location)
-                            except KeyError:
-                                # tolerate same child occurring under 2 parents such as in
-                                # ContentStoreTest.test_image_import
-                                pass
-                            if verbose:
-                                log.debug('importing module location {loc}'.format(loc=child.location))
-
-                            _import_module_and_update_references(
-                                child,
-                                store,
-                                user_id,
-                                course_key,
-                                dest_course_id,
-                                do_import_static=do_import_static,
-                                runtime=course.runtime
-                            )
-                            depth_first(child)
-
-                depth_first(source_course)
-
-                for leftover in all_locs:
+    return new_courses
+
+
+def _import_course_modules(
+        xml_module_store, store, user_id, course, course_key, dest_course_id, course_data_path,
+        source_course, do_import_static, raise_on_failure, verbose
+):
+    """
+    Import the asset metadata, then the published and the draft modules of the course.
+    """
+    with _log_duration('importing asset metadata', dest_course_id):
+        # Import asset metadata stored in XML.
+        _import_course_asset_metadata(store, course_data_path, dest_course_id, raise_on_failure)
+
+    # STEP 3: import PUBLISHED items
+    # now loop through all the modules depth first and then orphans
+    with store.branch_setting(ModuleStoreEnum.Branch.published_only, dest_course_id), \
+            _log_duration('importing published modules', dest_course_id):
+        all_locs = set(xml_module_store.modules[course_key].keys())
+        all_locs.remove(source_course.location)
+
+        def depth_first(subtree):
+            """
+            Import top down just so import code can make assumptions about parents always being available
+            """
+            if subtree.has_children:
+                for child in subtree.get_children():
+                    try:
+                        all_locs.remove(child.location)
+                    except KeyError:
+                        # tolerate same child occurring under 2 parents such as in
+                        # ContentStoreTest.test_image_import
+                        pass
                     if verbose:
-                        log.debug('importing module location {loc}'.format(loc=leftover))
+                        log.debug('importing module location {loc}'.format(loc=child.location))
 
                     _import_module_and_update_references(
-                        xml_module_store.get_item(leftover), store,
+                        child,
+                        store,
                         user_id,
                         course_key,
                         dest_course_id,
                         do_import_static=do_import_static,
                         runtime=course.runtime
                     )
+                    depth_first(child)
 
-            # STEP 4: import any DRAFT items
-            with store.branch_setting(ModuleStoreEnum.Branch.draft_preferred, dest_course_id):
-                _import_course_draft(
-                    xml_module_store,
-                    store,
-                    user_id,
-                    course_data_path,
-                    course_key,
-                    dest_course_id,
-                    course.runtime
-                )
+        depth_first(source_course)
 
-    return new_courses
+        for leftover in all_locs:
+            if verbose:
+                log.debug('importing module location {loc}'.format(loc=leftover))
+
+            _import_module_and_update_references(
+                xml_module_store.get_item(leftover), store,
+                user_id,
+                course_key,
+                dest_course_id,
+                do_import_static=do_import_static,
+                runtime=course.runtime
+            )
+
+    # STEP 4: import any DRAFT items
+    with store.branch_setting(ModuleStoreEnum.Branch.draft_preferred, dest_course_id), \
+            _log_duration('importing draft modules', dest_course_id):
+        _import_course_draft(
+            xml_module_store,
+            store,
+            user_id,
+            course_data_path,
+            course_key,
+            dest_course_id,
+            course.runtime
+        )
 
 
 def _import_course_asset_metadata(store, data_dir, course_id, raise_on_failure):
@@ -421,13 +493,22 @@ def _import_course_module(
     return course, course_data_path
 
 
-def _import_static_content_wrapper(static_content_store, do_import_static, course_data_path, dest_course_id, verbose):
+def _import_static_content_wrapper(
+        static_content_store, do_import_static, course_data_path, dest_course_id, verbose,
+        workers=STATIC_IMPORT_WORKERS):
+    with _log_duration('importing static content', dest_course_id):
+        _import_static_content(
+            static_content_store, do_import_static, course_data_path, dest_course_id, verbose, workers
+        )
+
+
+def _import_static_content(static_content_store, do_import_static, course_data_path, dest_course_id, verbose, workers):
     # then import all the static content
     if static_content_store is not None and do_import_static:
         # first pass to find everything in /static/
         import_static_content(
             course_data_path, static_content_store,
-            dest_course_id, subpath='static', verbose=verbose
+            dest_course_id, subpath='static', verbose=verbose, workers=workers
         )
 
     elif verbose and not do_import_static:
@@ -450,7 +531,7 @@ def _import_static_content_wrapper(static_content_store, do_import_static, cours
     if os.path.exists(course_data_path / simport):
         import_static_content(
             course_data_path, static_content_store,
-            dest_course_id, subpath=simport, verbose=verbose
+            dest_course_id, subpath=simport, verbose=verbose, workers=workers
         )
 
 
@@ -39,3 +39,20 @@ class IgnoredFilesTestCase(unittest.TestCase):
         self.assertNotIn(".DS_Store", name_val)
         self.assertIn("GREEN", name_val["example.txt"])
         self.assertIn("BLUE", name_val[".example.txt"])
+
+    def test_import_static_files_in_threads(self):
+        """
+        Test that importing the static files from several threads saves the same files as from one
+        """
+        course_dir = DATA_DIR / "toy"
+        course_id = SlashSeparatedCourseKey("edX", "toy", "2012_Fall")
+        saved_names = []
+        remap_dicts = []
+        for workers in (1, 4):
+            content_store = Mock()
+            content_store.generate_thumbnail.return_value = ("content", "location")
+            remap_dicts.append(import_static_content(course_dir, content_store, course_id, workers=workers))
+            saved_names.append(sorted(call[0][0].name for call in content_store.save.call_args_list))
+        self.assertEqual(saved_names[0], saved_names[1])
+        self.assertEqual(remap_dicts[0], remap_dicts[1])
+        self.assertEqual(len(remap_dicts[1]), 5)
@@ -1,22 +1,219 @@
 """
 Computes the data to display on the Instructor Dashboard
+
+The grade and open distributions are read from aggregates of the course's
+StudentModules, which are refreshed incrementally at most every
+CLASS_DASHBOARD_METRICS_MAX_AGE seconds, rather than aggregated from the
+StudentModule table each time the dashboard is loaded.
 """
 from util.json_request import JsonResponse
 import json
+from datetime import datetime, timedelta
 
 from courseware import models
-from django.db.models import Count
+from courseware.model_data import chunks
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
 from django.utils.translation import ugettext as _
+from pytz import UTC
 
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.inheritance import own_metadata
 from instructor_analytics.csvs import create_csv_response
 
+from opaque_keys.edx.keys import UsageKey
 from opaque_keys.edx.locations import Location
 
 # Used to limit the length of list displayed to the screen.
 MAX_SCREEN_LIST_LENGTH = 250
 
+# Number of modules counted again by each query of refresh_course_metrics
+REFRESH_CHUNK_SIZE = 500
+
+
+def _usage_key(course_id, location):
+    """
+    Returns the UsageKey of the `location` string in the course.
+    """
+    return UsageKey.from_string(location).map_into_course(course_id)
+
+
+def _student_modules_read_only(course_id):
+    """
+    Returns the course's StudentModules, from a read replica if one exists.
+    """
+    queryset = models.StudentModule.objects.filter(course_id__exact=course_id)
+    if "read_replica" in settings.DATABASES:
+        return queryset.using("read_replica")
+    return queryset
+
+
+def _replace_counts(course_id, student_modules, module_state_keys=None):
+    """
+    Replaces the aggregates of the course, or only those of the `module_state_keys`,
+    with counts of `student_modules`.
+    """
+    problem_counts = [
+        models.ProblemGradeCount(
+            course_id=course_id,
+            module_state_key=_usage_key(course_id, row['module_state_key']),
+            grade=row['grade'],
+            max_grade=row['max_grade'],
+            count=row['count_grade'],
+        )
+        for row in student_modules.filter(
+            grade__isnull=False,
+            module_type__exact="problem",
+        ).values('module_state_key', 'grade', 'max_grade').annotate(count_grade=Count('grade'))
+    ]
+    sequential_counts = [
+        models.SequentialOpenCount(
+            course_id=course_id,
+            module_state_key=_usage_key(course_id, row['module_state_key']),
+            count=row['count_sequential'],
+        )
+        for row in student_modules.filter(
+            module_type__exact="sequential",
+        ).values('module_state_key').annotate(count_sequential=Count('module_state_key'))
+    ]
+
+    old_problem_counts = models.ProblemGradeCount.objects.filter(course_id=course_id)
+    old_sequential_counts = models.SequentialOpenCount.objects.filter(course_id=course_id)
+    if module_state_keys is not None:
+        old_problem_counts = old_problem_counts.filter(module_state_key__in=module_state_keys)
+        old_sequential_counts = old_sequential_counts.filter(module_state_key__in=module_state_keys)
+
+    with transaction.commit_on_success():
+        old_problem_counts.delete()
+        old_sequential_counts.delete()
+        models.ProblemGradeCount.objects.bulk_create(problem_counts)
+        models.SequentialOpenCount.objects.bulk_create(sequential_counts)
+
+
+def refresh_course_metrics(course_id):
+    """
+    Brings the aggregates of the course's StudentModules up to date.
+
+    `course_id` the course ID for the course interested in
+
+    Only the modules with a StudentModule modified since the last refresh are
+    counted again, so that refreshing an active course doesn't aggregate the
+    whole StudentModule table of the course every time.
+    """
+    refresh, __ = models.CourseMetricsRefresh.objects.get_or_create(course_id=course_id)
+    student_modules = _student_modules_read_only(course_id)
+    # Anything modified from now on will be counted again by the next refresh
+    last_modified = student_modules.aggregate(Max('modified'))['modified__max']
+
+    if refresh.last_modified is None:
+        _replace_counts(course_id, student_modules)
+    else:
+        changed_keys = student_modules.filter(
+            modified__gte=refresh.last_modified,
+        ).values_list('module_state_key', flat=True).distinct()
+        changed_keys = [_usage_key(course_id, module_state_key) for module_state_key in changed_keys]
+        for module_state_keys in chunks(changed_keys, REFRESH_CHUNK_SIZE):
+            _replace_counts(
+                course_id,
+                student_modules.filter(module_state_key__in=module_state_keys),
+                module_state_keys,
+            )
+
+    refresh.last_modified = last_modified
+    refresh.save()
+
+
+def _ensure_course_metrics(course_id):
+    """
+    Refreshes the aggregates of the course if they're older than CLASS_DASHBOARD_METRICS_MAX_AGE seconds.
+
+    However often the dashboard is loaded, a course is refreshed by one request
+    at a time: the others read the aggregates as they are.
+    """
+    max_age = settings.CLASS_DASHBOARD_METRICS_MAX_AGE
+    oldest = datetime.now(UTC) - timedelta(seconds=max_age)
+    if models.CourseMetricsRefresh.objects.filter(course_id=course_id, refreshed__gte=oldest).exists():
+        return
+
+    lock_key = u'class_dashboard.refresh.{}'.format(course_id)
+    if not cache.add(lock_key, True, max_age):
+        return
+    try:
+        refresh_course_metrics(course_id)
+    finally:
+        cache.delete(lock_key)
+
+
+def _outline_cache_key(course):
+    """
+    Returns the cache key of the outline of `course`. It includes the time the
+    course was last edited, so that edits make the cached outline unreachable.
+    """
+    try:
+        subtree_edited_on = course.subtree_edited_on
+    except (AttributeError, NotImplementedError):
+        subtree_edited_on = None
+    edited = subtree_edited_on.isoformat() if subtree_edited_on is not None else ''
+    return u'class_dashboard.outline.{}.{}'.format(course.id, edited)
+
+
+def get_course_outline(course_id):
+    """
+    Returns the sections, subsections and problems of the course as the dashboard displays them.
+
+    `course_id` the course ID for the course interested in
+
+    The outline of each version of the course is cached for
+    CLASS_DASHBOARD_METRICS_MAX_AGE seconds, so that each chart doesn't walk
+    the course in the modulestore again.
+
+    Returns an array of dicts in the order of the sections. Each dict has:
+      'display_name' - display name for the section
+      'subsections' - array of dicts in the order of the subsections, with:
+        'location' - location of the subsection
+        'display_name' - display name for the subsection
+        'units' - array with, for each unit of the subsection, an array of its problems'
+          (location, display name) tuples
+    """
+    outline_cache_key = _outline_cache_key(modulestore().get_course(course_id, depth=0))
+    outline = cache.get(outline_cache_key)
+    if outline is None:
+        course = modulestore().get_course(course_id, depth=4)
+        outline = [
+            {
+                'display_name': own_metadata(section).get('display_name', ''),
+                'subsections': [
+                    {
+                        'location': unicode(subsection.location),
+                        'display_name': own_metadata(subsection).get('display_name', ''),
+                        'units': [
+                            [
+                                (unicode(child.location), own_metadata(child).get('display_name', ''))
+                                for child in unit.get_children()
+                                if child.location.category == 'problem'
+                            ]
+                            for unit in subsection.get_children()
+                        ],
+                    }
+                    for subsection in section.get_children()
+                ],
+            }
+            for section in course.get_children()
+        ]
+        cache.set(outline_cache_key, outline, settings.CLASS_DASHBOARD_METRICS_MAX_AGE)
+
+    # Locations are cached as strings
+    for section in outline:
+        for subsection in section['subsections']:
+            subsection['location'] = _usage_key(course_id, subsection['location'])
+            subsection['units'] = [
+                [(_usage_key(course_id, location), display_name) for location, display_name in unit]
+                for unit in subsection['units']
+            ]
+    return outline
+
 
 def get_problem_grade_distribution(course_id):
     """
@@ -31,13 +228,12 @@ def get_problem_grade_distribution(course_id):
       'total_student_count' where the key is problem 'module_id' and the value is number of students
         attempting the problem
     """
+    _ensure_course_metrics(course_id)
 
-    # Aggregate query on studentmodule table for grade data for all problems in course
-    db_query = models.StudentModule.objects.filter(
+    # Grade counts of all problems in course
+    db_query = models.ProblemGradeCount.objects.filter(
         course_id__exact=course_id,
-        grade__isnull=False,
-        module_type__exact="problem",
-    ).values('module_state_key', 'grade', 'max_grade').annotate(count_grade=Count('grade'))
+    ).values('module_state_key', 'grade', 'max_grade', 'count')
 
     prob_grade_distrib = {}
     total_student_count = {}
@@ -48,7 +244,7 @@ def get_problem_grade_distribution(course_id):
 
         # Build set of grade distributions for each problem that has student responses
         if curr_problem in prob_grade_distrib:
-            prob_grade_distrib[curr_problem]['grade_distrib'].append((row['grade'], row['count_grade']))
+            prob_grade_distrib[curr_problem]['grade_distrib'].append((row['grade'], row['count']))
 
             if (prob_grade_distrib[curr_problem]['max_grade'] != row['max_grade']) and \
                     (prob_grade_distrib[curr_problem]['max_grade'] < row['max_grade']):
@@ -57,11 +253,11 @@ def get_problem_grade_distribution(course_id):
         else:
             prob_grade_distrib[curr_problem] = {
                 'max_grade': row['max_grade'],
-                'grade_distrib': [(row['grade'], row['count_grade'])]
+                'grade_distrib': [(row['grade'], row['count'])]
             }
 
         # Build set of total students attempting each problem
-        total_student_count[curr_problem] = total_student_count.get(curr_problem, 0) + row['count_grade']
+        total_student_count[curr_problem] = total_student_count.get(curr_problem, 0) + row['count']
 
     return prob_grade_distrib, total_student_count
 
@@ -74,18 +270,18 @@ def get_sequential_open_distrib(course_id):
 
     Outputs a dict mapping the 'module_id' to the number of students that have opened that subsection/sequential.
     """
+    _ensure_course_metrics(course_id)
 
-    # Aggregate query on studentmodule table for "opening a subsection" data
-    db_query = models.StudentModule.objects.filter(
+    # Open counts of all subsections in course
+    db_query = models.SequentialOpenCount.objects.filter(
         course_id__exact=course_id,
-        module_type__exact="sequential",
-    ).values('module_state_key').annotate(count_sequential=Count('module_state_key'))
+    ).values('module_state_key', 'count')
 
     # Build set of "opened" data for each subsection that has "opened" data
     sequential_open_distrib = {}
     for row in db_query:
         row_loc = course_id.make_usage_key_from_deprecated_string(row['module_state_key'])
-        sequential_open_distrib[row_loc] = row['count_sequential']
+        sequential_open_distrib[row_loc] = row['count']
 
     return sequential_open_distrib
 
@@ -104,18 +300,18 @@ def get_problem_set_grade_distrib(course_id, problem_set):
       'max_grade' - the maximum grade possible for the course
       'grade_distrib' - array of tuples (`grade`,`count`) ordered by `grade`
     """
+    _ensure_course_metrics(course_id)
 
-    # Aggregate query on studentmodule table for grade data for set of problems in course
-    db_query = models.StudentModule.objects.filter(
+    # Grade counts of the set of problems in course
+    db_query = models.ProblemGradeCount.objects.filter(
         course_id__exact=course_id,
-        grade__isnull=False,
-        module_type__exact="problem",
         module_state_key__in=problem_set,
     ).values(
         'module_state_key',
         'grade',
         'max_grade',
-    ).annotate(count_grade=Count('grade')).order_by('module_state_key', 'grade')
+        'count',
+    ).order_by('module_state_key', 'grade')
 
     prob_grade_distrib = {}
 
@@ -129,7 +325,7 @@ def get_problem_set_grade_distrib(course_id, problem_set):
             }
 
         curr_grade_distrib = prob_grade_distrib[row_loc]
-        curr_grade_distrib['grade_distrib'].append((row['grade'], row['count_grade']))
+        curr_grade_distrib['grade_distrib'].append((row['grade'], row['count']))
 
         if curr_grade_distrib['max_grade'] < row['max_grade']:
             curr_grade_distrib['max_grade'] = row['max_grade']
@@ -151,77 +347,70 @@ def get_d3_problem_grade_distrib(course_id):
     prob_grade_distrib, total_student_count = get_problem_grade_distribution(course_id)
     d3_data = []
 
-    # Retrieve course object down to problems
-    course = modulestore().get_course(course_id, depth=4)
-
     # Iterate through sections, subsections, units, problems
-    for section in course.get_children():
+    for section in get_course_outline(course_id):
         curr_section = {}
-        curr_section['display_name'] = own_metadata(section).get('display_name', '')
+        curr_section['display_name'] = section['display_name']
         data = []
         c_subsection = 0
-        for subsection in section.get_children():
+        for subsection in section['subsections']:
             c_subsection += 1
             c_unit = 0
-            for unit in subsection.get_children():
+            for unit in subsection['units']:
                 c_unit += 1
                 c_problem = 0
-                for child in unit.get_children():
-
-                    # Student data is at the problem level
-                    if child.location.category == 'problem':
-                        c_problem += 1
-                        stack_data = []
-
-                        # Construct label to display for this problem
-                        label = "P{0}.{1}.{2}".format(c_subsection, c_unit, c_problem)
-
-                        # Only problems in prob_grade_distrib have had a student submission.
-                        if child.location in prob_grade_distrib:
-
-                            # Get max_grade, grade_distribution for this problem
-                            problem_info = prob_grade_distrib[child.location]
-
-                            # Get problem_name for tooltip
-                            problem_name = own_metadata(child).get('display_name', '')
-
-                            # Compute percent of this grade over max_grade
-                            max_grade = float(problem_info['max_grade'])
-                            for (grade, count_grade) in problem_info['grade_distrib']:
-                                percent = 0.0
-                                if max_grade > 0:
-                                    percent = round((grade * 100.0) / max_grade, 1)
-
-                                # Compute percent of students with this grade
-                                student_count_percent = 0
-                                if total_student_count.get(child.location, 0) > 0:
-                                    student_count_percent = count_grade * 100 / total_student_count[child.location]
-
-                                # Tooltip parameters for problem in grade distribution view
-                                tooltip = {
-                                    'type': 'problem',
-                                    'label': label,
-                                    'problem_name': problem_name,
-                                    'count_grade': count_grade,
-                                    'percent': percent,
-                                    'grade': grade,
-                                    'max_grade': max_grade,
-                                    'student_count_percent': student_count_percent,
-                                }
-
-                                # Construct data to be sent to d3
-                                stack_data.append({
-                                    'color': percent,
-                                    'value': count_grade,
-                                    'tooltip': tooltip,
-                                    'module_url': child.location.to_deprecated_string(),
-                                })
-
-                        problem = {
-                            'xValue': label,
-                            'stackData': stack_data,
-                        }
-                        data.append(problem)
+
+                # Student data is at the problem level
+                for location, problem_name in unit:
+                    c_problem += 1
+                    stack_data = []
+
+                    # Construct label to display for this problem
+                    label = "P{0}.{1}.{2}".format(c_subsection, c_unit, c_problem)
+
+                    # Only problems in prob_grade_distrib have had a student submission.
+                    if location in prob_grade_distrib:
+
+                        # Get max_grade, grade_distribution for this problem
+                        problem_info = prob_grade_distrib[location]
+
+                        # Compute percent of this grade over max_grade
+                        max_grade = float(problem_info['max_grade'])
+                        for (grade, count_grade) in problem_info['grade_distrib']:
+                            percent = 0.0
+                            if max_grade > 0:
+                                percent = round((grade * 100.0) / max_grade, 1)
+
+                            # Compute percent of students with this grade
+                            student_count_percent = 0
+                            if total_student_count.get(location, 0) > 0:
+                                student_count_percent = count_grade * 100 / total_student_count[location]
+
+                            # Tooltip parameters for problem in grade distribution view
+                            tooltip = {
+                                'type': 'problem',
+                                'label': label,
+                                'problem_name': problem_name,
+                                'count_grade': count_grade,
+                                'percent': percent,
+                                'grade': grade,
+                                'max_grade': max_grade,
+                                'student_count_percent': student_count_percent,
+                            }
+
+                            # Construct data to be sent to d3
+                            stack_data.append({
+                                'color': percent,
+                                'value': count_grade,
+                                'tooltip': tooltip,
+                                'module_url': location.to_deprecated_string(),
+                            })
+
+                    problem = {
+                        'xValue': label,
+                        'stackData': stack_data,
+                    }
+                    data.append(problem)
         curr_section['data'] = data
 
         d3_data.append(curr_section)
@@ -243,24 +432,21 @@ def get_d3_sequential_open_distrib(course_id):
 
     d3_data = []
 
-    # Retrieve course object down to subsection
-    course = modulestore().get_course(course_id, depth=2)
-
     # Iterate through sections, subsections
-    for section in course.get_children():
+    for section in get_course_outline(course_id):
         curr_section = {}
-        curr_section['display_name'] = own_metadata(section).get('display_name', '')
+        curr_section['display_name'] = section['display_name']
         data = []
         c_subsection = 0
 
         # Construct data for each subsection to be sent to d3
-        for subsection in section.get_children():
+        for subsection in section['subsections']:
             c_subsection += 1
-            subsection_name = own_metadata(subsection).get('display_name', '')
+            subsection_name = subsection['display_name']
 
             num_students = 0
-            if subsection.location in sequential_open_distrib:
-                num_students = sequential_open_distrib[subsection.location]
+            if subsection['location'] in sequential_open_distrib:
+                num_students = sequential_open_distrib[subsection['location']]
 
             stack_data = []
 
@@ -276,7 +462,7 @@ def get_d3_sequential_open_distrib(course_id):
                 'color': 0,
                 'value': num_students,
                 'tooltip': tooltip,
-                'module_url': subsection.location.to_deprecated_string(),
+                'module_url': subsection['location'].to_deprecated_string(),
             })
             subsection = {
                 'xValue': "SS {0}".format(c_subsection),
@@ -313,27 +499,23 @@ def get_d3_section_grade_distrib(course_id, section):
         'tooltip' - (Optional) Text to display on mouse hover
     """
 
-    # Retrieve course object down to problems
-    course = modulestore().get_course(course_id, depth=4)
-
     problem_set = []
     problem_info = {}
     c_subsection = 0
-    for subsection in course.get_children()[section].get_children():
+    for subsection in get_course_outline(course_id)[section]['subsections']:
         c_subsection += 1
         c_unit = 0
-        for unit in subsection.get_children():
+        for unit in subsection['units']:
             c_unit += 1
             c_problem = 0
-            for child in unit.get_children():
-                if (child.location.category == 'problem'):
-                    c_problem += 1
-                    problem_set.append(child.location)
-                    problem_info[child.location] = {
-                        'id': child.location.to_deprecated_string(),
-                        'x_value': "P{0}.{1}.{2}".format(c_subsection, c_unit, c_problem),
-                        'display_name': own_metadata(child).get('display_name', ''),
-                    }
+            for location, display_name in unit:
+                c_problem += 1
+                problem_set.append(location)
+                problem_info[location] = {
+                    'id': location.to_deprecated_string(),
+                    'x_value': "P{0}.{1}.{2}".format(c_subsection, c_unit, c_problem),
+                    'display_name': display_name,
+                }
 
     # Retrieve grade distribution for these problems
     grade_distrib = get_problem_set_grade_distrib(course_id, problem_set)
@@ -385,15 +567,7 @@ def get_section_display_name(course_id):
     The ith string in the array is the display name of the ith section in the course.
     """
 
-    course = modulestore().get_course(course_id, depth=4)
-
-    section_display_name = [""] * len(course.get_children())
-    i = 0
-    for section in course.get_children():
-        section_display_name[i] = own_metadata(section).get('display_name', '')
-        i += 1
-
-    return section_display_name
+    return [section['display_name'] for section in get_course_outline(course_id)]
 
 
 def get_array_section_has_problem(course_id):
@@ -405,25 +579,10 @@ def get_array_section_has_problem(course_id):
     The ith value in the array is true if the ith section in the course contains problems and false otherwise.
     """
 
-    course = modulestore().get_course(course_id, depth=4)
-
-    b_section_has_problem = [False] * len(course.get_children())
-    i = 0
-    for section in course.get_children():
-        for subsection in section.get_children():
-            for unit in subsection.get_children():
-                for child in unit.get_children():
-                    if child.location.category == 'problem':
-                        b_section_has_problem[i] = True
-                        break  # out of child loop
-                if b_section_has_problem[i]:
-                    break  # out of unit loop
-            if b_section_has_problem[i]:
-                break  # out of subsection loop
-
-        i += 1
-
-    return b_section_has_problem
+    return [
+        any(unit for subsection in section['subsections'] for unit in subsection['units'])
+        for section in get_course_outline(course_id)
+    ]
 
 
 def get_students_opened_subsection(request, csv=False):
@@ -11,6 +11,7 @@ from mock import patch
 
 from capa.tests.response_xml_factory import StringResponseXMLFactory
 from xmodule.modulestore.tests.django_utils import TEST_DATA_MOCK_MODULESTORE
+from courseware.models import StudentModule
 from courseware.tests.factories import StudentModuleFactory
 from student.tests.factories import UserFactory, CourseEnrollmentFactory, AdminFactory
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
@@ -21,6 +22,7 @@ from class_dashboard.dashboard_data import (get_problem_grade_distribution, get_
                                             get_d3_sequential_open_distrib, get_d3_section_grade_distrib,
                                             get_section_display_name, get_array_section_has_problem,
                                             get_students_opened_subsection, get_students_problem_grades,
+                                            _replace_counts,
                                             )
 from class_dashboard.views import has_instructor_access_for_class
 
@@ -301,6 +303,52 @@ class TestGetProblemGradeDistribution(ModuleStoreTestCase):
         # Check response contains 1 line for header, 1 line for Sections and 2 lines for problems
         self.assertEquals(4, len(response.content.splitlines()))
 
+    def test_metrics_refreshed_at_most_every_max_age(self):
+
+        get_problem_grade_distribution(self.course.id)
+        with patch('class_dashboard.dashboard_data.refresh_course_metrics') as refresh_course_metrics:
+            get_problem_grade_distribution(self.course.id)
+            get_sequential_open_distrib(self.course.id)
+            get_d3_section_grade_distrib(self.course.id, 0)
+        self.assertFalse(refresh_course_metrics.called)
+
+    @override_settings(CLASS_DASHBOARD_METRICS_MAX_AGE=0)
+    def test_metrics_refreshed_incrementally(self):
+
+        get_problem_grade_distribution(self.course.id)
+
+        student_module = StudentModule.objects.get(
+            student=self.users[0],
+            module_state_key=self.item.location,
+            module_type='problem',
+        )
+        student_module.grade = 1
+        student_module.max_grade = 1
+        student_module.save()
+
+        # Only the modified problem is counted again
+        with patch('class_dashboard.dashboard_data._replace_counts', wraps=_replace_counts) as replace_counts:
+            prob_grade_distrib, total_student_count = get_problem_grade_distribution(self.course.id)
+        self.assertEquals(1, replace_counts.call_count)
+        self.assertEquals([self.item.location], replace_counts.call_args[0][2])
+        self.assertEquals([(0, USER_COUNT - 2), (1, 2)], sorted(prob_grade_distrib[self.item.location]['grade_distrib']))
+        self.assertEquals(USER_COUNT, total_student_count[self.item.location])
+
+    @override_settings(CLASS_DASHBOARD_METRICS_MAX_AGE=0)
+    def test_deleted_modules_not_counted(self):
+
+        get_sequential_open_distrib(self.course.id)
+        StudentModule.objects.filter(module_state_key=self.item.location, module_type='sequential')[0].delete()
+
+        sequential_open_distrib = get_sequential_open_distrib(self.course.id)
+        self.assertEquals(USER_COUNT - 1, sequential_open_distrib[self.item.location])
+
+    def test_outline_follows_course_edits(self):
+
+        get_section_display_name(self.course.id)
+        ItemFactory.create(parent_location=self.course.location, category="chapter", display_name="new section")
+        self.assertEquals(2, len(get_section_display_name(self.course.id)))
+
     def test_get_section_display_name(self):
 
         section_display_name = get_section_display_name(self.course.id)
@@ -1,36 +1,152 @@
 # Compute grades using real division, with no integer truncation
 from __future__ import division
-from collections import defaultdict
+from collections import Counter
+import hashlib
 import json
+import multiprocessing
 import random
 import logging
 
 from contextlib import contextmanager
+from datetime import datetime
 from django.conf import settings
-from django.db import transaction
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Max
 from django.test.client import RequestFactory
 
 import dogstats_wrapper as dog_stats_api
+import numpy
+from pytz import UTC
 
 from courseware import courses
-from courseware.model_data import FieldDataCache
+from courseware.access import has_access
+from courseware.model_data import FieldDataCache, chunks
 from student.models import anonymous_id_for_user
+from student.roles import (
+    CourseBetaTesterRole, CourseInstructorRole, CourseStaffRole, OrgInstructorRole, OrgStaffRole
+)
 from util.module_utils import yield_dynamic_descriptor_descendents
 from xmodule import graders
 from xmodule.graders import Score
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.util.duedate import get_extended_due_date
-from .models import StudentModule
+from .models import StudentModule, PersistentCourseGrade
 from .module_render import get_module_for_descriptor
 from submissions import api as sub_api  # installed from the edx-submissions repository
 from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey, UsageKey
+
+try:
+    # simplejson's C decoder is faster than the json module's
+    import simplejson as fast_json
+except ImportError:
+    import json as fast_json
 
 
 log = logging.getLogger("edx.courseware")
 
+# Number of students graded from each StudentModule query by iterate_grades_for(bulk=True)
+BULK_GRADING_CHUNK_SIZE = 500
+
+# Number of StudentModule rows fetched by each query of answer_distributions
+ANSWER_DISTRIBUTION_CHUNK_SIZE = 1000
+
+# Marks a problem whose max score couldn't be determined during bulk grading
+_NO_MAX_SCORE = object()
+
+
+def _submitted_problem_states(course_key, module_state_key=None):
+    """
+    Yield (id, module_state_key, state) for every submitted problem in the
+    course, or only for the problem with the `module_state_key` string.
+
+    Rows are fetched ANSWER_DISTRIBUTION_CHUNK_SIZE at a time, and only the
+    columns we need, so that big courses don't have to fit in memory.
+    """
+    queryset = StudentModule.all_submitted_problems_read_only(course_key)
+    if module_state_key is not None:
+        queryset = queryset.filter(module_state_key=UsageKey.from_string(module_state_key))
+    last_id = 0
+    while True:
+        rows = list(
+            queryset.filter(id__gt=last_id).order_by('id').values_list(
+                'id', 'module_state_key', 'state'
+            )[:ANSWER_DISTRIBUTION_CHUNK_SIZE]
+        )
+        if not rows:
+            return
+        for row in rows:
+            yield row
+        last_id = rows[-1][0]
+
+
+def _count_answers(course_key, module_state_key=None):
+    """
+    Count the answers submitted to the problems of the course, or only to the
+    problem with the `module_state_key` string.
+
+    Returns a dict mapping:
+
+      module_state_key string -> {problem_id: Counter(answer -> count)}
+    """
+    counts = {}
+    for module_id, state_key, state in _submitted_problem_states(course_key, module_state_key):
+        if not state:
+            continue
+        try:
+            raw_answers = fast_json.loads(state).get("student_answers", {})
+        except ValueError:
+            log.error(
+                u"Answer Distribution: Could not parse module state for StudentModule id=%s, course=%s",
+                module_id,
+                course_key,
+            )
+            continue
+
+        # Each problem part has an ID that is derived from the
+        # module_state_key (with some suffix appended)
+        for problem_part_id, raw_answer in raw_answers.iteritems():
+            # Convert whatever raw answers we have (numbers, unicode, None, etc.)
+            # to be unicode values.
+            problem_counts = counts.setdefault(state_key, {})
+            problem_counts.setdefault(problem_part_id, Counter())[unicode(raw_answer)] += 1
+    return counts
+
+
+def _count_problem_answers(args):
+    """
+    Count the answers to one problem in a worker process of answer_distributions.
 
-def answer_distributions(course_key):
+    `args` is a tuple of the course id and module_state_key strings, and the
+    result is a tuple of the module_state_key and its answer counts.
+    """
+    course_id, module_state_key = args
+    counts = _count_answers(CourseKey.from_string(course_id), module_state_key)
+    return module_state_key, counts.get(module_state_key, {})
+
+
+def _count_answers_per_problem(course_key, module_state_keys, processes):
+    """
+    Count the answers to each problem in `module_state_keys`, with a separate
+    query per problem, in a pool of `processes` processes if it's more than 1.
+    """
+    args = [(unicode(course_key), module_state_key) for module_state_key in module_state_keys]
+    if not (processes and processes > 1):
+        return dict(_count_problem_answers(arg) for arg in args)
+
+    # The workers are forked, and mustn't share our database connections.
+    for connection in connections.all():
+        connection.close()
+    pool = multiprocessing.Pool(processes)
+    try:
+        return dict(pool.imap_unordered(_count_problem_answers, args))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def answer_distributions(course_key, checkpoint=None, processes=None):
     """
     Given a course_key, return answer distributions in the form of a dictionary
     mapping:
@@ -58,80 +174,72 @@ def answer_distributions(course_key):
     generate the report.
 
     This method will try to use a read-replica database if one is available.
+
+    `checkpoint` is a dict, empty the first time, which is updated with the
+    answer counts of this call so that it can be stored and given to the next
+    call. That call then only counts again the answers to the problems which
+    have been submitted since. Answers to deleted StudentModules are only
+    forgotten when counting from an empty checkpoint.
+
+    With `processes` greater than 1, the problems are counted in a pool of
+    that many processes, with one query per problem. The database mustn't be
+    an in-memory database then.
     """
-    # dict: { module.module_state_key : (url_name, display_name) }
-    state_keys_to_problem_info = {}  # For caching, used by url_and_display_name
-
-    def url_and_display_name(usage_key):
-        """
-        For a given usage_key, return the problem's url and display_name.
-        Handle modulestore access and caching. This method ignores permissions.
-
-        Raises:
-            InvalidKeyError: if the usage_key does not parse
-            ItemNotFoundError: if there is no content that corresponds
-                to this usage_key.
-        """
-        problem_store = modulestore()
-        if usage_key not in state_keys_to_problem_info:
-            problem = problem_store.get_item(usage_key)
-            problem_info = (problem.url_name, problem.display_name_with_default)
-            state_keys_to_problem_info[usage_key] = problem_info
+    queryset = StudentModule.all_submitted_problems_read_only(course_key)
+    # Anything submitted from now on will be counted again by the next call
+    last_modified = queryset.aggregate(Max('modified'))['modified__max']
+
+    counts = dict(checkpoint.get('counts', {})) if checkpoint else {}
+    if checkpoint and checkpoint.get('last_modified'):
+        module_state_keys = queryset.filter(
+            modified__gte=checkpoint['last_modified']
+        ).values_list('module_state_key', flat=True).distinct()
+        counts.update(_count_answers_per_problem(course_key, set(module_state_keys), processes))
+    elif processes and processes > 1:
+        module_state_keys = queryset.values_list('module_state_key', flat=True).distinct()
+        counts = _count_answers_per_problem(course_key, set(module_state_keys), processes)
+    else:
+        counts = _count_answers(course_key)
 
-        return state_keys_to_problem_info[usage_key]
+    if checkpoint is not None:
+        checkpoint['counts'] = counts
+        checkpoint['last_modified'] = last_modified
 
-    # Iterate through all problems submitted for this course in no particular
-    # order, and build up our answer_counts dict that we will eventually return
-    answer_counts = defaultdict(lambda: defaultdict(int))
-    for module in StudentModule.all_submitted_problems_read_only(course_key):
-        try:
-            state_dict = json.loads(module.state) if module.state else {}
-            raw_answers = state_dict.get("student_answers", {})
-        except ValueError:
-            log.error(
-                u"Answer Distribution: Could not parse module state for StudentModule id=%s, course=%s",
-                module.id,
-                course_key,
-            )
+    problem_store = modulestore()
+    answer_counts = {}
+    for module_state_key, problem_counts in counts.iteritems():
+        if not problem_counts:
             continue
-
         try:
-            url, display_name = url_and_display_name(module.module_state_key.map_into_course(course_key))
-            # Each problem part has an ID that is derived from the
-            # module.module_state_key (with some suffix appended)
-            for problem_part_id, raw_answer in raw_answers.items():
-                # Convert whatever raw answers we have (numbers, unicode, None, etc.)
-                # to be unicode values. Note that if we get a string, it's always
-                # unicode and not str -- state comes from the json decoder, and that
-                # always returns unicode for strings.
-                answer = unicode(raw_answer)
-                answer_counts[(url, display_name, problem_part_id)][answer] += 1
-
+            usage_key = UsageKey.from_string(module_state_key).map_into_course(course_key)
+            problem = problem_store.get_item(usage_key)
         except (ItemNotFoundError, InvalidKeyError):
-            msg = "Answer Distribution: Item {} referenced in StudentModule {} " + \
-                  "for user {} in course {} not found; " + \
+            msg = "Answer Distribution: Item {} referenced in StudentModules " + \
+                  "in course {} not found; " + \
                   "This can happen if a student answered a question that " + \
-                  "was later deleted from the course. This answer will be " + \
+                  "was later deleted from the course. These answers will be " + \
                   "omitted from the answer distribution CSV."
-            log.warning(
-                msg.format(module.module_state_key, module.id, module.student_id, course_key)
-            )
+            log.warning(msg.format(module_state_key, course_key))
             continue
 
+        for problem_part_id, answers in problem_counts.iteritems():
+            key = (problem.url_name, problem.display_name_with_default, problem_part_id)
+            answer_counts.setdefault(key, Counter()).update(answers)
+
     return answer_counts
 
 
 @transaction.commit_manually
-def grade(student, request, course, keep_raw_scores=False):
+def grade(student, request, course, keep_raw_scores=False, force_recompute=False):
     """
     Wraps "_grade" with the manual_transaction context manager just in case
     there are unanticipated errors.
     """
     with manual_transaction():
-        return _grade(student, request, course, keep_raw_scores)
+        return _grade(student, request, course, keep_raw_scores, force_recompute)
 
 
-def _grade(student, request, course, keep_raw_scores):
+def _grade(student, request, course, keep_raw_scores, force_recompute=False):
     """
     Unwrapped version of "grade"
 
@@ -149,12 +257,14 @@ def _grade(student, request, course, keep_raw_scores):
       make up the final grade. (For display)
     - keep_raw_scores : if True, then value for key 'raw_scores' contains scores
       for every graded module
+    - force_recompute : if True, ignore any stored grade and compute the grade
+      from the course tree (the result is still stored for later reads)
 
     More information on the format is in the docstring for CourseGrader.
-    """
-    grading_context = course.grading_context
-    raw_scores = []
 
+    If persistent grades are enabled, the grade is read from the
+    PersistentCourseGrade table when an up to date row exists.
+    """
     # Dict of item_ids -> (earned, possible) point tuples. This *only* grabs
     # scores that were registered with the submissions API, which for the moment
     # means only openassessment (edx-ora2)
@@ -162,6 +272,139 @@ def _grade(student, request, course, keep_raw_scores):
         course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id)
     )
 
+    use_persistent_grade = _persistent_grades_enabled(student, course)
+    grade_summary = None
+    if use_persistent_grade:
+        # Read before computing the grade, so that a score changing meanwhile
+        # makes the stored grade out of date
+        context_hash = _grade_context_hash(student, course)
+        if not force_recompute:
+            grade_summary = _read_persistent_grade(student, course, submissions_scores, context_hash)
+
+    if grade_summary is None:
+        grade_summary = _compute_grade(student, request, course, submissions_scores)
+        if use_persistent_grade:
+            _write_persistent_grade(student, course, submissions_scores, context_hash, grade_summary)
+
+    if not keep_raw_scores:
+        del grade_summary['raw_scores']
+    return grade_summary
+
+
+def _persistent_grades_enabled(student, course):
+    """
+    Returns whether grades for this student and course may be read from and
+    written to the PersistentCourseGrade table.
+
+    Courses containing problems whose state is updated independently of
+    interaction with the LMS (E.g. foldit, combinedopenended) are always
+    recomputed, since there is no StudentModule change to invalidate on.
+    """
+    if not settings.FEATURES.get('ENABLE_PERSISTENT_GRADES', False) or settings.GENERATE_PROFILE_SCORES:
+        return False
+
+    if not student.is_authenticated():
+        return False
+
+    return not any(
+        descriptor.always_recalculate_grades for descriptor in course.grading_context['all_descriptors']
+    )
+
+
+def _submissions_hash(submissions_scores):
+    """
+    Returns a hash of the submissions API scores, so that a stored grade can be
+    discarded when any of them change.
+    """
+    return hashlib.sha1(json.dumps(submissions_scores, sort_keys=True)).hexdigest()
+
+
+def _grade_context_hash(student, course):
+    """
+    Returns a hash of what the student's grade depends on besides their scores:
+    the version of the course, which is stamped on it whenever it's published,
+    the student's access to its content, and the student's grade token.
+    """
+    now = datetime.now(UTC)
+    context = {
+        'course_version': unicode(course.subtree_edited_on),
+        'staff': bool(has_access(student, 'staff', course)),
+        'beta_tester': CourseBetaTesterRole(course.id).has_user(student),
+        'groups': sorted(
+            (partition.id, getattr(partition.scheme.get_group_for_user(course.id, student, partition), 'id', None))
+            for partition in course.user_partitions
+        ),
+        # Content becomes available as its start date passes
+        'not_started': sorted(
+            unicode(descriptor.location) for descriptor in course.grading_context['all_descriptors']
+            if descriptor.start is not None and descriptor.start > now
+        ),
+        'token': PersistentCourseGrade.token(student.id, course.id),
+    }
+    return hashlib.sha1(json.dumps(context, sort_keys=True)).hexdigest()
+
+
+def _read_persistent_grade(student, course, submissions_scores, context_hash):
+    """
+    Returns the stored gradeset for the student, or None if there is no up to
+    date stored grade.
+    """
+    try:
+        persistent_grade = PersistentCourseGrade.objects.get(user=student, course_id=course.id)
+    except PersistentCourseGrade.DoesNotExist:
+        return None
+
+    if persistent_grade.submissions_hash != _submissions_hash(submissions_scores):
+        return None
+
+    if persistent_grade.context_hash != context_hash:
+        return None
+
+    return _deserialize_persistent_grade(persistent_grade)
+
+
+def _deserialize_persistent_grade(persistent_grade):
+    """
+    Returns the gradeset stored in a PersistentCourseGrade.
+    """
+    grade_summary = json.loads(persistent_grade.gradeset)
+    # Score namedtuples come back from JSON as lists
+    grade_summary['totaled_scores'] = {
+        section_format: [Score(*score) for score in scores]
+        for section_format, scores in grade_summary['totaled_scores'].iteritems()
+    }
+    grade_summary['raw_scores'] = [Score(*score) for score in grade_summary['raw_scores']]
+    return grade_summary
+
+
+def _write_persistent_grade(student, course, submissions_scores, context_hash, grade_summary):
+    """
+    Stores a freshly computed gradeset for the student.
+    """
+    try:
+        persistent_grade = PersistentCourseGrade.objects.get(user=student, course_id=course.id)
+    except PersistentCourseGrade.DoesNotExist:
+        persistent_grade = PersistentCourseGrade(user=student, course_id=course.id)
+
+    persistent_grade.gradeset = json.dumps(grade_summary)
+    persistent_grade.submissions_hash = _submissions_hash(submissions_scores)
+    persistent_grade.context_hash = context_hash
+    try:
+        persistent_grade.save()
+    except IntegrityError:
+        # Another process stored this student's grade at the same time; both
+        # were computed from the same state, so there's nothing to do.
+        log.info(u"Persistent grade for %s in %s was stored concurrently", student.id, course.id)
+
+
+def _compute_grade(student, request, course, submissions_scores):
+    """
+    Computes the student's gradeset by walking the course tree. Unlike "_grade",
+    the result always includes 'raw_scores'.
+    """
+    grading_context = course.grading_context
+    raw_scores = []
+
     totaled_scores = {}
     # This next complicated loop is just to collect the totaled_scores, which is
     # passed to the grader
@@ -231,8 +474,7 @@ def _grade(student, request, course, keep_raw_scores):
                     scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
 
                 _, graded_total = graders.aggregate_scores(scores, section_name)
-                if keep_raw_scores:
-                    raw_scores += scores
+                raw_scores += scores
             else:
                 graded_total = Score(0.0, 1.0, True, section_name)
 
@@ -247,6 +489,18 @@ def _grade(student, request, course, keep_raw_scores):
 
         totaled_scores[section_format] = format_scores
 
+    grade_summary = _summarize_grade(course, totaled_scores)
+    # way to get all RAW scores out to instructor
+    # so grader can be double-checked
+    grade_summary['raw_scores'] = raw_scores
+    return grade_summary
+
+
+def _summarize_grade(course, totaled_scores):
+    """
+    Runs the course grader over the totaled scores of each graded section and
+    adds the rounded percent and the letter grade.
+    """
     grade_summary = course.grader.grade(totaled_scores, generate_random_scores=settings.GENERATE_PROFILE_SCORES)
 
     # We round the grade here, to make sure that the grade is an whole percentage and
@@ -256,10 +510,6 @@ def _grade(student, request, course, keep_raw_scores):
     letter_grade = grade_for_percentage(course.grade_cutoffs, grade_summary['percent'])
     grade_summary['grade'] = letter_grade
     grade_summary['totaled_scores'] = totaled_scores  	# make this available, eg for instructor download & debugging
-    if keep_raw_scores:
-        # way to get all RAW scores out to instructor
-        # so grader can be double-checked
-        grade_summary['raw_scores'] = raw_scores
     return grade_summary
 
 
@@ -480,7 +730,7 @@ def manual_transaction():
         transaction.commit()
 
 
-def iterate_grades_for(course_id, students):
+def iterate_grades_for(course_id, students, force_recompute=False, bulk=False):
     """Given a course_id and an iterable of students (User), yield a tuple of:
 
     (student, gradeset, err_msg) for every student enrolled in the course.
@@ -497,6 +747,12 @@ def iterate_grades_for(course_id, students):
     - grade_breakdown : A breakdown of the major components that
         make up the final grade. (For display)
     - raw_scores: contains scores for every graded module
+
+    Stored grades are used where available unless force_recompute is True.
+
+    If bulk is True, students are graded in chunks from a students x problems
+    score matrix instead of one at a time (see _iterate_bulk_grades). The
+    gradesets are the same either way.
     """
     course = courses.get_course_by_id(course_id)
 
@@ -505,25 +761,334 @@ def iterate_grades_for(course_id, students):
     # grading that student.
     request = RequestFactory().get('/')
 
+    if bulk:
+        for result in _iterate_bulk_grades(course, students, request, force_recompute):
+            yield result
+        return
+
     for student in students:
         with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course_id)]):
+            yield _grade_for_iteration(student, request, course, force_recompute)
+
+
+def _grade_for_iteration(student, request, course, force_recompute):
+    """
+    Grade a single student for iterate_grades_for, returning a
+    (student, gradeset, err_msg) tuple.
+    """
+    try:
+        _attach_student_to_request(request, student)
+        gradeset = grade(student, request, course, force_recompute=force_recompute)
+        return student, gradeset, ""
+    except Exception as exc:  # pylint: disable=broad-except
+        # Keep marching on even if this student couldn't be graded for
+        # some reason, but log it for future reference.
+        log.exception(
+            'Cannot grade student %s (%s) in course %s because of exception: %s',
+            student.username,
+            student.id,
+            course.id,
+            exc.message
+        )
+        return student, {}, exc.message
+
+
+def _attach_student_to_request(request, student):
+    """
+    Point the fake grading request at `student`.
+    """
+    request.user = student
+    # Grading calls problem rendering, which calls masquerading,
+    # which checks session vars -- thus the empty session dict below.
+    # It's not pretty, but untangling that is currently beyond the
+    # scope of this feature.
+    request.session = {}
+
+
+def _bulk_grading_supported(course):
+    """
+    Returns whether every student's grade in this course can be computed from
+    StudentModule rows alone. Problems that are always recalculated and blocks
+    with dynamic (per-student) children need the per-student path.
+    """
+    if settings.GENERATE_PROFILE_SCORES:
+        return False
+
+    return not any(
+        descriptor.always_recalculate_grades or descriptor.has_dynamic_children()
+        for descriptor in course.grading_context['all_descriptors']
+    )
+
+
+def _is_uniformly_accessible(descriptor):
+    """
+    Returns whether every student gets the same answer when the per-student
+    path instantiates `descriptor`, so its max score only has to be looked up
+    once for the whole course.
+
+    Restrictions on any ancestor apply to the descriptor too, so they're all
+    checked. Staff and beta testers, whose access differs anyway, are graded
+    through the per-student path (see _privileged_user_ids).
+    """
+    now = datetime.now(UTC)
+    block = descriptor
+    while block is not None:
+        if block.visible_to_staff_only or block.group_access:
+            return False
+        if block.start is not None and block.start >= now:
+            return False
+        block = block.get_parent()
+    return True
+
+
+def _privileged_user_ids(course):
+    """
+    Returns the ids of the users who see the course's content differently from
+    students, other than global staff: its staff, instructors and beta testers.
+    """
+    roles = [
+        CourseStaffRole(course.id),
+        CourseInstructorRole(course.id),
+        CourseBetaTesterRole(course.id),
+        OrgStaffRole(course.id.org),
+        OrgInstructorRole(course.id.org),
+    ]
+    user_ids = set()
+    for role in roles:
+        user_ids.update(role.users_with_role().values_list('id', flat=True))
+    return user_ids
+
+
+def _bulk_score_matrix(course_id, student_ids, column_index):
+    """
+    Load every StudentModule row for `student_ids` in `course_id` and return a
+    tuple of students x problems arrays (touched, grades, max_grades), with rows
+    in `student_ids` order and columns given by `column_index`, a dict of
+    usage key -> column.
+
+    touched is True wherever a StudentModule exists; grades and max_grades are
+    NaN wherever the corresponding value is missing.
+    """
+    student_index = dict((student_id, row) for row, student_id in enumerate(student_ids))
+    shape = (len(student_ids), len(column_index))
+    touched = numpy.zeros(shape, dtype=bool)
+    grades = numpy.empty(shape)
+    grades.fill(numpy.nan)
+    max_grades = grades.copy()
+
+    student_modules = StudentModule.objects.filter(
+        course_id=course_id,
+        student__in=student_ids,
+    ).only('student', 'module_state_key', 'grade', 'max_grade')
+
+    for student_module in student_modules:
+        column = column_index.get(student_module.module_state_key.map_into_course(course_id))
+        if column is None:
+            continue
+        row = student_index[student_module.student_id]
+        touched[row, column] = True
+        if student_module.grade is not None:
+            grades[row, column] = student_module.grade
+        if student_module.max_grade is not None:
+            max_grades[row, column] = student_module.max_grade
+
+    return touched, grades, max_grades
+
+
+def _iterate_bulk_grades(course, students, request, force_recompute):
+    """
+    Bulk version of the iterate_grades_for loop.
+
+    Students are graded BULK_GRADING_CHUNK_SIZE at a time. For each chunk all
+    StudentModule rows are loaded in one query into a students x problems
+    matrix, and the per-problem scoring, weighting and section totals of
+    "_compute_grade" are applied to whole columns at once, in the same order,
+    so the totaled scores are identical to the per-student path. The course
+    grader and grade cutoffs are then applied to each student's totaled
+    scores exactly as "_grade" does.
+
+    Students with submissions API scores, staff and beta testers, and
+    students who would need a problem with per-student access rules
+    instantiated, are graded through the per-student path. So is every
+    student in courses that don't pass _bulk_grading_supported.
+    """
+    if not _bulk_grading_supported(course):
+        for student in students:
+            yield _grade_for_iteration(student, request, course, force_recompute)
+        return
+
+    # The list of (section_name, problem descriptors in grading order, columns
+    # of the section's xmoduledescriptors) for each section format
+    sections_by_format = {}
+    column_index = {}
+    for section_format, sections in course.grading_context['graded_sections'].iteritems():
+        format_sections = sections_by_format[section_format] = []
+        for section in sections:
+            section_descriptor = section['section_descriptor']
+            # Nothing in a bulk-gradeable course has dynamic children, so the
+            # module_creator is never called.
+            problems = [
+                descriptor for descriptor in yield_dynamic_descriptor_descendents(section_descriptor, None)
+                if descriptor.has_score
+            ]
+            for descriptor in problems + section['xmoduledescriptors']:
+                column_index.setdefault(descriptor.location, len(column_index))
+            format_sections.append((
+                section_descriptor.display_name_with_default,
+                problems,
+                [column_index[descriptor.location] for descriptor in section['xmoduledescriptors']],
+            ))
+
+    # usage key -> max score (or None) for problems that some student hasn't
+    # been graded on yet, shared across chunks
+    max_scores = {}
+    empty_submissions_hash = _submissions_hash({})
+    use_persistent_grades = settings.FEATURES.get('ENABLE_PERSISTENT_GRADES', False) and not force_recompute
+    privileged_user_ids = _privileged_user_ids(course)
+
+    for student_chunk in chunks(students, BULK_GRADING_CHUNK_SIZE):
+        with dog_stats_api.timer('lms.grades.iterate_bulk_grades', tags=[u'action:{}'.format(course.id)]):
+            student_ids = [student.id for student in student_chunk]
+            touched, grades, max_grades = _bulk_score_matrix(course.id, student_ids, column_index)
+            needs_per_student_grading = numpy.array([
+                student.is_staff or student.id in privileged_user_ids for student in student_chunk
+            ], dtype=bool)
+
+            persistent_grades = {}
+            if use_persistent_grades:
+                persistent_grades = dict(
+                    (persistent_grade.user_id, persistent_grade)
+                    for persistent_grade in PersistentCourseGrade.objects.filter(
+                        course_id=course.id, user__in=student_ids
+                    )
+                )
+
+            # section_format -> list of (section_name, started, earned, possible)
+            section_totals = {}
+            for section_format, format_sections in sections_by_format.iteritems():
+                section_totals[section_format] = []
+                for section_name, problems, section_columns in format_sections:
+                    started = touched[:, section_columns].any(axis=1)
+                    earned = numpy.zeros(len(student_ids))
+                    possible = numpy.zeros(len(student_ids))
+                    for descriptor in problems:
+                        column = column_index[descriptor.location]
+                        correct, total = _bulk_problem_scores(
+                            course, descriptor, student_chunk, request, started,
+                            grades[:, column], max_grades[:, column], max_scores, needs_per_student_grading,
+                        )
+                        if descriptor.graded:
+                            counted = total > 0
+                            earned += numpy.where(counted, correct, 0.0)
+                            possible += numpy.where(counted, total, 0.0)
+                    section_totals[section_format].append((section_name, started, earned, possible))
+
+        for row, student in enumerate(student_chunk):
+            if needs_per_student_grading[row]:
+                yield _grade_for_iteration(student, request, course, force_recompute)
+                continue
+
             try:
-                request.user = student
-                # Grading calls problem rendering, which calls masquerading,
-                # which checks session vars -- thus the empty session dict below.
-                # It's not pretty, but untangling that is currently beyond the
-                # scope of this feature.
-                request.session = {}
-                gradeset = grade(student, request, course)
-                yield student, gradeset, ""
+                submissions_scores = sub_api.get_scores(
+                    course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id)
+                )
+                if submissions_scores:
+                    yield _grade_for_iteration(student, request, course, force_recompute)
+                    continue
+
+                persistent_grade = persistent_grades.get(student.id)
+                if (
+                        persistent_grade is not None and
+                        persistent_grade.submissions_hash == empty_submissions_hash and
+                        persistent_grade.context_hash == _grade_context_hash(student, course)
+                ):
+                    gradeset = _deserialize_persistent_grade(persistent_grade)
+                    del gradeset['raw_scores']
+                    yield student, gradeset, ""
+                    continue
+
+                totaled_scores = {}
+                for section_format, totals in section_totals.iteritems():
+                    format_scores = []
+                    for section_name, started, earned, possible in totals:
+                        if started[row]:
+                            graded_total = Score(float(earned[row]), float(possible[row]), True, section_name)
+                        else:
+                            graded_total = Score(0.0, 1.0, True, section_name)
+                        if graded_total.possible > 0:
+                            format_scores.append(graded_total)
+                    totaled_scores[section_format] = format_scores
+
+                yield student, _summarize_grade(course, totaled_scores), ""
             except Exception as exc:  # pylint: disable=broad-except
-                # Keep marching on even if this student couldn't be graded for
-                # some reason, but log it for future reference.
                 log.exception(
                     'Cannot grade student %s (%s) in course %s because of exception: %s',
                     student.username,
                     student.id,
-                    course_id,
+                    course.id,
                     exc.message
                 )
                 yield student, {}, exc.message
+
+
+def _bulk_problem_scores(course, descriptor, students, request, started, grades, max_grades, max_scores,
+                         needs_per_student_grading):
+    """
+    Vectorized "get_score" for one problem across a chunk of students.
+
+    Returns (correct, total) arrays, with NaN totals for students the problem
+    doesn't count for. Only students in a started section are scored, as in
+    "_compute_grade". Students who would need the problem instantiated to find
+    its max score, when that may differ between students, are flagged in
+    needs_per_student_grading.
+    """
+    graded = ~numpy.isnan(max_grades)
+    correct = numpy.where(graded, numpy.nan_to_num(grades), 0.0)
+    total = max_grades.copy()
+
+    # If the problem hasn't been graded yet, we need the max score from an
+    # instance of the problem.
+    ungraded = started & ~graded
+    if ungraded.any():
+        if not _is_uniformly_accessible(descriptor):
+            needs_per_student_grading |= ungraded
+        else:
+            # Look the max score up as a student graded in bulk, not as staff or a beta tester
+            candidates = numpy.flatnonzero(ungraded & ~needs_per_student_grading)
+            if descriptor.location not in max_scores and len(candidates):
+                student = students[candidates[0]]
+                try:
+                    max_scores[descriptor.location] = _instantiated_max_score(course, descriptor, student, request)
+                except Exception:  # pylint: disable=broad-except
+                    # Let the per-student path report the error for each student
+                    log.exception(u"Unable to load %s for bulk grading", descriptor.location)
+                    max_scores[descriptor.location] = _NO_MAX_SCORE
+            max_score = max_scores.get(descriptor.location, _NO_MAX_SCORE)
+            if max_score is _NO_MAX_SCORE:
+                needs_per_student_grading |= ungraded
+            else:
+                total[ungraded] = max_score if max_score is not None else numpy.nan
+
+    # Now we re-weight the problem, if specified
+    weight = descriptor.weight
+    if weight is not None:
+        reweight = ~numpy.isnan(total) & (total != 0)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            correct = numpy.where(reweight, correct * weight / total, correct)
+        total = numpy.where(reweight, weight, total)
+
+    return correct, total
+
+
+def _instantiated_max_score(course, descriptor, student, request):
+    """
+    Returns the max score of `descriptor` as seen by `student`, or None if the
+    problem can't be loaded or can't be scored.
+    """
+    _attach_student_to_request(request, student)
+    with manual_transaction():
+        field_data_cache = FieldDataCache([descriptor], course.id, student)
+    problem = get_module_for_descriptor(student, request, descriptor, field_data_cache, course.id)
+    if problem is None:
+        return None
+    return problem.max_score()
@@ -2,21 +2,32 @@
 Classes to provide the LMS runtime data storage to XBlocks
 """
 
+import hashlib
 import json
-from collections import defaultdict
+import threading
+from collections import defaultdict, OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
 from itertools import chain
 from .models import (
+    PersistentCourseGrade,
     StudentModule,
+    StudentModuleHistory,
+    XBlockFieldBase,
     XModuleUserStateSummaryField,
     XModuleStudentPrefsField,
     XModuleStudentInfoField
 )
 import logging
-from opaque_keys.edx.keys import CourseKey
+from pytz import UTC
+from opaque_keys.edx.keys import CourseKey, UsageKey
 from opaque_keys.edx.block_types import BlockTypeKeyV1
 from opaque_keys.edx.asides import AsideUsageKeyV1
 
-from django.db import DatabaseError
+from django.core.cache import cache
+from django.db import connection, transaction, DatabaseError
+
+import dogstats_wrapper as dog_stats_api
 
 from xblock.runtime import KeyValueStore
 from xblock.exceptions import KeyValueMultiSaveError, InvalidScopeError
@@ -34,6 +45,25 @@ class InvalidWriteError(Exception):
     """
 
 
+# Scopes for which FieldDataCache prefetches rows, by name. The names are used
+# to store field lists in the cross-request descendants cache.
+PREFETCHED_SCOPES = {
+    'user_state': Scope.user_state,
+    'user_state_summary': Scope.user_state_summary,
+    'preferences': Scope.preferences,
+    'user_info': Scope.user_info,
+}
+
+# How long cache_for_descriptor_descendents keeps the flattened list of
+# descendants of a block. Entries are keyed by the block's subtree_edited_on,
+# so this only bounds the lifetime of entries for old versions of a course.
+DESCENDANTS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Number of consecutive descendants (in tree order) whose usage-keyed rows a
+# lazy FieldDataCache loads together on the first access to any of them
+LAZY_LOAD_WINDOW_SIZE = 100
+
+
 def chunks(items, chunk_size):
     """
     Yields the values from items in chunks of size chunk_size
@@ -47,7 +77,8 @@ class FieldDataCache(object):
     A cache of django model objects needed to supply the data
     for a module and its decendants
     """
-    def __init__(self, descriptors, course_id, user, select_for_update=False, asides=None):
+    def __init__(self, descriptors, course_id, user, select_for_update=False, asides=None,
+                 descriptors_summary=None, lazy=False):
         '''
         Find any courseware.models objects that are needed by any descriptor
         in descriptors. Attempts to minimize the number of queries to the database.
@@ -60,11 +91,29 @@ class FieldDataCache(object):
         user: The user for which to cache data
         select_for_update: True if rows should be locked until end of transaction
         asides: The list of aside types to load, or None to prefetch no asides.
+        descriptors_summary: A DescriptorsSummary of descriptors, if one is already
+            available. In that case, descriptors may be None.
+        lazy: If True, nothing is loaded up front. Instead, the first access to
+            a scope loads its rows. For usage-keyed scopes (user_state and
+            user_state_summary), that's the rows for the accessed block's window
+            of LAZY_LOAD_WINDOW_SIZE consecutive descriptors, in one chunked
+            query. For the other scopes, it's all rows for the scope.
+
+        The number of queries issued so far is available as `num_queries`.
         '''
         self.cache = {}
+        self.lazy = lazy
+        self.num_queries = 0
+        # Scopes, and (scope, window) pairs for usage-keyed scopes, that have
+        # been loaded by a lazy FieldDataCache
+        self._loaded = set()
         self.descriptors = descriptors
         self.select_for_update = select_for_update
 
+        if descriptors_summary is None:
+            descriptors_summary = DescriptorsSummary.from_descriptors(descriptors)
+        self.descriptors_summary = descriptors_summary
+
         if asides is None:
             self.asides = []
         else:
@@ -74,15 +123,27 @@ class FieldDataCache(object):
         self.course_id = course_id
         self.user = user
 
-        if user.is_authenticated():
-            for scope, fields in self._fields_to_cache().items():
-                for field_object in self._retrieve_fields(scope, fields):
-                    self.cache[self._cache_key_from_field_object(scope, field_object)] = field_object
+        # The usage ids (and aside usage ids) in each lazy load window, and
+        # the window each of them is in
+        self._windows = []
+        self._usage_id_windows = {}
+        if lazy:
+            for window, usage_ids in enumerate(chunks(self.descriptors_summary.usage_ids, LAZY_LOAD_WINDOW_SIZE)):
+                window_usage_ids = list(usage_ids)
+                for usage_id in usage_ids:
+                    window_usage_ids.extend(AsideUsageKeyV1(usage_id, aside_type) for aside_type in self.asides)
+                self._windows.append(window_usage_ids)
+                for usage_id in window_usage_ids:
+                    self._usage_id_windows[usage_id] = window
+
+        if user.is_authenticated() and not lazy:
+            for scope in self._fields_to_cache():
+                self._load_scope(scope)
 
     @classmethod
     def cache_for_descriptor_descendents(cls, course_id, user, descriptor, depth=None,
-                                         descriptor_filter=lambda descriptor: True,
-                                         select_for_update=False, asides=None):
+                                         descriptor_filter=None,
+                                         select_for_update=False, asides=None, lazy=False):
         """
         course_id: the course in the context of which we want StudentModules.
         user: the django user for whom to load modules.
@@ -90,8 +151,14 @@ class FieldDataCache(object):
         depth is the number of levels of descendent modules to load StudentModules for, in addition to
             the supplied descriptor. If depth is None, load all descendent StudentModules
         descriptor_filter is a function that accepts a descriptor and return wether the StudentModule
-            should be cached
+            should be cached. If None, all descendents are cached.
         select_for_update: Flag indicating whether the rows should be locked until end of transaction
+        lazy: Flag indicating whether rows should only be loaded when first accessed (see __init__)
+
+        Without a descriptor_filter, the flattened list of descendents is kept in
+        the django cache, keyed by the descriptor's subtree_edited_on, so later
+        requests for the same version of the content don't have to walk (and load)
+        the descendents again.
         """
 
         def get_child_descriptors(descriptor, depth, descriptor_filter):
@@ -104,7 +171,7 @@ class FieldDataCache(object):
             descriptor_filter(descriptor): A function that returns True
                 if descriptor should be included in the results
             """
-            if descriptor_filter(descriptor):
+            if descriptor_filter is None or descriptor_filter(descriptor):
                 descriptors = [descriptor]
             else:
                 descriptors = []
@@ -117,16 +184,34 @@ class FieldDataCache(object):
 
             return descriptors
 
+        cache_key = None
+        if descriptor_filter is None:
+            cache_key = _descendants_cache_key(descriptor, depth)
+
+        if cache_key is not None:
+            cached_summary = cache.get(cache_key)
+            if cached_summary is not None:
+                return FieldDataCache(
+                    None, course_id, user, select_for_update, asides=asides,
+                    descriptors_summary=DescriptorsSummary.from_cache_value(cached_summary),
+                    lazy=lazy,
+                )
+
         with modulestore().bulk_operations(descriptor.location.course_key):
             descriptors = get_child_descriptors(descriptor, depth, descriptor_filter)
 
-        return FieldDataCache(descriptors, course_id, user, select_for_update, asides=asides)
+        field_data_cache = FieldDataCache(descriptors, course_id, user, select_for_update, asides=asides, lazy=lazy)
+        if cache_key is not None:
+            cache.set(cache_key, field_data_cache.descriptors_summary.to_cache_value(), DESCENDANTS_CACHE_TIMEOUT)
+        return field_data_cache
 
     def _query(self, model_class, **kwargs):
         """
         Queries model_class with **kwargs, optionally adding select_for_update if
         self.select_for_update is set
         """
+        self.num_queries += 1
+        dog_stats_api.increment('lms.field_data_cache.query', tags=[u'model:{}'.format(model_class.__name__)])
         query = model_class.objects
         if self.select_for_update:
             query = query.select_for_update()
@@ -147,6 +232,20 @@ class FieldDataCache(object):
         )
         return res
 
+    def prime(self, scope, field_objects):
+        """
+        Fill a lazy FieldDataCache with `field_objects`, rows of `scope` that
+        the caller has already loaded (e.g. for many users at once), so that
+        they aren't queried for again. They must be all of the user's rows in
+        `scope` for the cached descriptors.
+        """
+        for field_object in field_objects:
+            self.cache[self._cache_key_from_field_object(scope, field_object)] = field_object
+        if scope in (Scope.user_state, Scope.user_state_summary):
+            self._loaded.update((scope, window) for window in xrange(len(self._windows)))
+        else:
+            self._loaded.add(scope)
+
     @property
     def _all_usage_ids(self):
         """
@@ -154,11 +253,11 @@ class FieldDataCache(object):
         against, and well as all asides for those descriptors.
         """
         usage_ids = set()
-        for descriptor in self.descriptors:
-            usage_ids.add(descriptor.scope_ids.usage_id)
+        for usage_id in self.descriptors_summary.usage_ids:
+            usage_ids.add(usage_id)
 
             for aside_type in self.asides:
-                usage_ids.add(AsideUsageKeyV1(descriptor.scope_ids.usage_id, aside_type))
+                usage_ids.add(AsideUsageKeyV1(usage_id, aside_type))
 
         return usage_ids
 
@@ -167,24 +266,55 @@ class FieldDataCache(object):
         """
         Return a set of all block_types that are cached by this FieldDataCache.
         """
-        block_types = set()
-        for descriptor in self.descriptors:
-            block_types.add(BlockTypeKeyV1(descriptor.entry_point, descriptor.scope_ids.block_type))
+        block_types = set(self.descriptors_summary.block_types)
 
         for aside_type in self.asides:
             block_types.add(BlockTypeKeyV1(XBlockAside.entry_point, aside_type))
 
         return block_types
 
-    def _retrieve_fields(self, scope, fields):
+    def _load_scope(self, scope, usage_ids=None):
+        """
+        Loads the rows for all fields in `scope` into the cache, limited to
+        `usage_ids` for usage-keyed scopes if given.
+        """
+        field_names = self._fields_to_cache().get(scope)
+        if not field_names:
+            return
+        for field_object in self._retrieve_fields(scope, field_names, usage_ids):
+            self.cache[self._cache_key_from_field_object(scope, field_object)] = field_object
+
+    def _load_for_key(self, key):
+        """
+        Loads the rows that a lazy FieldDataCache needs to answer `key`, if
+        they haven't been loaded yet.
+        """
+        if not self.user.is_authenticated():
+            return
+
+        if key.scope in (Scope.user_state, Scope.user_state_summary):
+            window = self._usage_id_windows.get(key.block_scope_id)
+            if window is None or (key.scope, window) in self._loaded:
+                return
+            self._loaded.add((key.scope, window))
+            self._load_scope(key.scope, self._windows[window])
+        elif key.scope not in self._loaded:
+            self._loaded.add(key.scope)
+            self._load_scope(key.scope)
+
+    def _retrieve_fields(self, scope, field_names, usage_ids=None):
         """
-        Queries the database for all of the fields in the specified scope
+        Queries the database for all of the fields in the specified scope,
+        limited to `usage_ids` for usage-keyed scopes if given.
         """
+        if usage_ids is None:
+            usage_ids = self._all_usage_ids
+
         if scope == Scope.user_state:
             return self._chunked_query(
                 StudentModule,
                 'module_state_key__in',
-                self._all_usage_ids,
+                usage_ids,
                 course_id=self.course_id,
                 student=self.user.pk,
             )
@@ -192,8 +322,8 @@ class FieldDataCache(object):
             return self._chunked_query(
                 XModuleUserStateSummaryField,
                 'usage_id__in',
-                self._all_usage_ids,
-                field_name__in=set(field.name for field in fields),
+                usage_ids,
+                field_name__in=field_names,
             )
         elif scope == Scope.preferences:
             return self._chunked_query(
@@ -201,26 +331,22 @@ class FieldDataCache(object):
                 'module_type__in',
                 self._all_block_types,
                 student=self.user.pk,
-                field_name__in=set(field.name for field in fields),
+                field_name__in=field_names,
             )
         elif scope == Scope.user_info:
             return self._query(
                 XModuleStudentInfoField,
                 student=self.user.pk,
-                field_name__in=set(field.name for field in fields),
+                field_name__in=field_names,
             )
         else:
             return []
 
     def _fields_to_cache(self):
         """
-        Returns a map of scopes to fields in that scope that should be cached
+        Returns a map of scopes to the names of fields in that scope that should be cached
         """
-        scope_map = defaultdict(set)
-        for descriptor in self.descriptors:
-            for field in descriptor.fields.values():
-                scope_map[field.scope].add(field)
-        return scope_map
+        return self.descriptors_summary.field_names
 
     def _cache_key_from_kvs_key(self, key):
         """
@@ -262,6 +388,9 @@ class FieldDataCache(object):
             # user we were constructed for.
             assert key.user_id == self.user.id
 
+        if self.lazy:
+            self._load_for_key(key)
+
         return self.cache.get(self._cache_key_from_kvs_key(key))
 
     def find_or_create(self, key):
@@ -306,6 +435,329 @@ class FieldDataCache(object):
         return field_object
 
 
+class DescriptorsSummary(object):
+    """
+    The parts of a list of descriptors that FieldDataCache needs in order to
+    prefetch field data: their usage ids, their block types, and the names of
+    their fields in each prefetched scope.
+    """
+    def __init__(self, usage_ids, block_types, field_names):
+        self.usage_ids = usage_ids
+        self.block_types = block_types
+        self.field_names = field_names
+
+    @classmethod
+    def from_descriptors(cls, descriptors):
+        """
+        Summarize a list of XModuleDescriptors.
+        """
+        usage_ids = []
+        block_types = set()
+        field_names = defaultdict(set)
+        for descriptor in descriptors:
+            usage_ids.append(descriptor.scope_ids.usage_id)
+            block_types.add(BlockTypeKeyV1(descriptor.entry_point, descriptor.scope_ids.block_type))
+            for field in descriptor.fields.values():
+                if field.scope in PREFETCHED_SCOPES.values():
+                    field_names[field.scope].add(field.name)
+        return cls(usage_ids, block_types, dict(field_names))
+
+    def to_cache_value(self):
+        """
+        Returns a picklable representation of this summary, built only from
+        strings, for storing in the django cache.
+        """
+        scope_names = dict((scope, name) for name, scope in PREFETCHED_SCOPES.items())
+        return {
+            'usage_ids': [unicode(usage_id) for usage_id in self.usage_ids],
+            'block_types': [(block_type.block_family, block_type.block_type) for block_type in self.block_types],
+            'field_names': dict(
+                (scope_names[scope], sorted(names)) for scope, names in self.field_names.items()
+            ),
+        }
+
+    @classmethod
+    def from_cache_value(cls, value):
+        """
+        Rebuild a summary from the output of to_cache_value.
+        """
+        return cls(
+            [UsageKey.from_string(usage_id) for usage_id in value['usage_ids']],
+            set(BlockTypeKeyV1(block_family, block_type) for block_family, block_type in value['block_types']),
+            dict((PREFETCHED_SCOPES[name], set(names)) for name, names in value['field_names'].items()),
+        )
+
+
+def _descendants_cache_key(descriptor, depth):
+    """
+    Returns the django cache key for the summary of the descendants of
+    `descriptor` down to `depth`, or None if the descriptor's content can't
+    be versioned (and so the summary can't be cached).
+
+    Any change to the descriptor or its descendants updates its
+    subtree_edited_on, which makes old entries unreachable.
+    """
+    try:
+        subtree_edited_on = descriptor.subtree_edited_on
+    except (AttributeError, NotImplementedError):
+        return None
+    if subtree_edited_on is None:
+        return None
+
+    # Usage ids can be long, so hash them to keep under memcached's key length limit
+    version = hashlib.md5(u"{}|{}|{}".format(
+        descriptor.scope_ids.usage_id,
+        depth,
+        subtree_edited_on.isoformat(),
+    ).encode('utf-8')).hexdigest()
+    return "field_data_cache.descendants.{}".format(version)
+
+
+class FieldDataWriteBuffer(object):
+    """
+    Collects the rows that DjangoKeyValueStore changes while an XBlock is
+    rendered or handles a request, so that each changed row is written once,
+    when the runtime call ends (see `buffered_writes`).
+
+    Rows are written in the order they were first changed. StudentModule rows
+    are saved individually, so that their post_save receivers (history, grade
+    invalidation) still run. All other rows only change `value`, and are
+    written with one UPDATE statement per model.
+
+    If `bulk` is True, StudentModule rows are written in bulk as well, with the
+    work of their post_save receivers done in bulk too, and the grades blocks
+    publish are buffered rather than saved straight away. That's only safe when
+    nothing reads the rows back from the database before the flush, as when an
+    instructor task rescores a batch of submissions.
+    """
+    def __init__(self, bulk=False):
+        self.bulk = bulk
+        self._field_objects = OrderedDict()
+        self._field_names = defaultdict(list)
+
+    def __len__(self):
+        return len(self._field_objects)
+
+    def add(self, field_object, field_names=()):
+        """
+        Mark `field_object` as changed, because of a change to the fields
+        `field_names`. Changing it again before the flush doesn't cause
+        another write.
+        """
+        self._field_objects.setdefault(id(field_object), field_object)
+        self._field_names[id(field_object)].extend(field_names)
+
+    def remove(self, field_object):
+        """
+        Forget about `field_object`, e.g. because it's being deleted.
+        """
+        self._field_objects.pop(id(field_object), None)
+        self._field_names.pop(id(field_object), None)
+
+    def flush(self):
+        """
+        Write all changed rows to the database.
+
+        Raises KeyValueMultiSaveError, listing the fields that were saved, if
+        a write fails.
+        """
+        field_objects = self._field_objects.values()
+        field_names = dict(self._field_names)
+        self._field_objects.clear()
+        self._field_names.clear()
+
+        saved_fields = []
+        with dog_stats_api.timer('lms.field_data.write_buffer.flush'):
+            value_rows = defaultdict(list)
+            student_modules = []
+            try:
+                for field_object in field_objects:
+                    if isinstance(field_object, XBlockFieldBase):
+                        # Rows deleted since they were changed have no pk any more
+                        if field_object.pk is not None:
+                            value_rows[field_object.__class__].append(field_object)
+                    elif self.bulk and field_object.pk is not None:
+                        student_modules.append(field_object)
+                    else:
+                        field_object.save()
+                        saved_fields.extend(field_names.get(id(field_object), []))
+
+                for model_class, model_rows in value_rows.items():
+                    for chunk in chunks(model_rows, 500):
+                        _bulk_update_values(model_class, chunk)
+                        for field_object in chunk:
+                            saved_fields.extend(field_names.get(id(field_object), []))
+
+                for chunk in chunks(student_modules, 500):
+                    _bulk_update_student_modules(chunk)
+                    for field_object in chunk:
+                        saved_fields.extend(field_names.get(id(field_object), []))
+            except DatabaseError:
+                log.exception('Error writing buffered fields; saved %r', saved_fields)
+                raise KeyValueMultiSaveError(saved_fields)
+
+        dog_stats_api.histogram('lms.field_data.write_buffer.rows', len(field_objects))
+
+
+def _execute_update(sql, params):
+    """
+    Run the raw UPDATE `sql`. The ORM isn't involved, so tell the transaction
+    manager about the write: otherwise TransactionMiddleware and
+    commit_on_success see a clean transaction and never commit it.
+    """
+    connection.cursor().execute(sql, params)
+    if transaction.is_managed():
+        transaction.set_dirty()
+    else:
+        transaction.commit_unless_managed()
+
+
+def _bulk_update_values(model_class, field_objects):
+    """
+    Write the `value` of each of `field_objects` (XBlockFieldBase rows of
+    `model_class`) with a single UPDATE statement.
+    """
+    now = datetime.now(UTC)
+    for field_object in field_objects:
+        field_object.modified = now
+
+    quote_name = connection.ops.quote_name
+    pk_column = quote_name(model_class._meta.pk.column)
+    sql = "UPDATE {table} SET {value} = CASE {pk} {cases} END, {modified} = %s WHERE {pk} IN ({pks})".format(
+        table=quote_name(model_class._meta.db_table),
+        value=quote_name('value'),
+        modified=quote_name('modified'),
+        pk=pk_column,
+        cases=" ".join(["WHEN %s THEN %s"] * len(field_objects)),
+        pks=", ".join(["%s"] * len(field_objects)),
+    )
+    params = []
+    for field_object in field_objects:
+        params.extend([field_object.pk, field_object.value])
+    params.append(model_class._meta.get_field('modified').get_db_prep_value(now, connection))
+    params.extend(field_object.pk for field_object in field_objects)
+
+    _execute_update(sql, params)
+
+
+def _bulk_update_student_modules(student_modules):
+    """
+    Write the state and grades of `student_modules` with a single UPDATE
+    statement, then do what StudentModule's post_save receivers would have
+    done for them: record their history, and discard the stored course grades
+    of their students.
+    """
+    now = datetime.now(UTC)
+    for student_module in student_modules:
+        student_module.modified = now
+
+    quote_name = connection.ops.quote_name
+    pk_column = quote_name(StudentModule._meta.pk.column)
+    cases = " ".join(["WHEN %s THEN %s"] * len(student_modules))
+    sql = (
+        "UPDATE {table} SET {state} = CASE {pk} {cases} END, {grade} = CASE {pk} {cases} END, "
+        "{max_grade} = CASE {pk} {cases} END, {modified} = %s WHERE {pk} IN ({pks})"
+    ).format(
+        table=quote_name(StudentModule._meta.db_table),
+        state=quote_name('state'),
+        grade=quote_name('grade'),
+        max_grade=quote_name('max_grade'),
+        modified=quote_name('modified'),
+        pk=pk_column,
+        cases=cases,
+        pks=", ".join(["%s"] * len(student_modules)),
+    )
+    params = []
+    for field_name in ('state', 'grade', 'max_grade'):
+        for student_module in student_modules:
+            params.extend([student_module.pk, getattr(student_module, field_name)])
+    params.append(StudentModule._meta.get_field('modified').get_db_prep_value(now, connection))
+    params.extend(student_module.pk for student_module in student_modules)
+
+    _execute_update(sql, params)
+
+    StudentModuleHistory.objects.bulk_create([
+        StudentModuleHistory(
+            student_module=student_module,
+            version=None,
+            created=student_module.modified,
+            state=student_module.state,
+            grade=student_module.grade,
+            max_grade=student_module.max_grade,
+        )
+        for student_module in student_modules
+        if student_module.module_type in StudentModuleHistory.HISTORY_SAVING_TYPES
+    ])
+
+    graded_students = defaultdict(set)
+    for student_module in student_modules:
+        if student_module.grade is not None or student_module.max_grade is not None:
+            graded_students[student_module.course_id].add(student_module.student_id)
+    for course_id, student_ids in graded_students.items():
+        PersistentCourseGrade.invalidate_users(student_ids, course_id)
+
+
+_write_buffer = threading.local()
+
+
+def start_write_buffer(bulk=False):
+    """
+    Start buffering DjangoKeyValueStore writes on this thread. See
+    FieldDataWriteBuffer for `bulk`.
+    """
+    _write_buffer.buffer = FieldDataWriteBuffer(bulk)
+
+
+def get_write_buffer():
+    """
+    Returns the FieldDataWriteBuffer for this thread, or None if writes
+    aren't being buffered.
+    """
+    return getattr(_write_buffer, 'buffer', None)
+
+
+def flush_write_buffer():
+    """
+    Write all buffered rows and stop buffering on this thread.
+    """
+    write_buffer = get_write_buffer()
+    _write_buffer.buffer = None
+    if write_buffer is not None:
+        write_buffer.flush()
+
+
+def discard_write_buffer():
+    """
+    Drop all buffered rows without writing them, and stop buffering on this
+    thread. Used when the request fails, which rolls back its transaction.
+    """
+    _write_buffer.buffer = None
+
+
+@contextmanager
+def buffered_writes():
+    """
+    Buffer DjangoKeyValueStore writes made inside the `with` block, and flush
+    them when it exits, so that a failed write raises KeyValueMultiSaveError
+    to the code that made it, before any response is built. Writes are
+    dropped if the block raises.
+
+    If writes are already being buffered, e.g. by an enclosing runtime call
+    or an instructor task, they're left to that buffer.
+    """
+    if get_write_buffer() is not None:
+        yield
+        return
+
+    start_write_buffer()
+    try:
+        yield
+    except:
+        discard_write_buffer()
+        raise
+    flush_write_buffer()
+
+
 class DjangoKeyValueStore(KeyValueStore):
     """
     This KeyValueStore will read and write data in the following scopes to django models
@@ -386,7 +838,12 @@ class DjangoKeyValueStore(KeyValueStore):
                 # we don't have to worry about conflicts
                 field_object.value = json.dumps(kv_dict[field])
 
+        write_buffer = get_write_buffer()
         for field_object in field_objects:
+            if write_buffer is not None:
+                write_buffer.add(field_object, [field.field_name for field in field_objects[field_object]])
+                continue
+
             try:
                 # Save the field object that we made above
                 field_object.save()
@@ -405,12 +862,18 @@ class DjangoKeyValueStore(KeyValueStore):
         if field_object is None:
             raise KeyError(key.field_name)
 
+        write_buffer = get_write_buffer()
         if key.scope == Scope.user_state:
             state = json.loads(field_object.state)
             del state[key.field_name]
             field_object.state = json.dumps(state)
-            field_object.save()
+            if write_buffer is not None:
+                write_buffer.add(field_object)
+            else:
+                field_object.save()
         else:
+            if write_buffer is not None:
+                write_buffer.remove(field_object)
             field_object.delete()
 
     def has(self, key):
@@ -12,13 +12,16 @@ file and check it in at the same time as your model changes. To do that,
 ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 """
+import uuid
+
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.core.cache import cache
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
-from xmodule_django.models import CourseKeyField, LocationKeyField, BlockTypeKeyField
+from xmodule_django.models import CourseKeyField, LocationKeyField, BlockTypeKeyField, UsageKeyField
 
 
 class StudentModule(models.Model):
@@ -230,3 +233,147 @@ class OfflineComputedGradeLog(models.Model):
 
     def __unicode__(self):
         return "[OCGLog] %s: %s" % (self.course_id.to_deprecated_string(), self.created)  # pylint: disable=no-member
+
+
+class PersistentCourseGrade(models.Model):
+    """
+    The most recently computed gradeset for a given user and course.
+
+    courseware.grades.grade() reads from this table instead of walking the
+    course tree, and writes to it whenever it has to compute a grade. A row is
+    only read back while its context_hash matches: that covers the version of
+    the course, what the user has access to, and a token in the cache which is
+    replaced whenever one of the user's scored StudentModules for the course
+    changes. The token is read before the grade is computed, so a grade
+    computed while a score changes is never read back.
+    """
+    user = models.ForeignKey(User, db_index=True)
+    course_id = CourseKeyField(max_length=255, db_index=True)
+
+    # The gradeset returned by courseware.grades.grade, including the
+    # per-subsection totaled_scores and raw_scores, stored as JSON
+    gradeset = models.TextField()
+
+    # Hash of the submissions API scores the gradeset was computed against.
+    # Those scores don't live in StudentModule, so they're compared on read.
+    submissions_hash = models.CharField(max_length=40)
+
+    # Hash of the course version, the user's access to the course, and the
+    # user's grade token, when the gradeset was computed
+    context_hash = models.CharField(max_length=40, default='')
+
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    modified = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        unique_together = (('user', 'course_id'),)
+
+    @staticmethod
+    def _token_cache_key(user_id, course_id):
+        """
+        Returns the cache key of the user's grade token for the course.
+        """
+        return u'persistent_course_grade.token.{}.{}'.format(user_id, course_id)
+
+    @classmethod
+    def token(cls, user_id, course_id):
+        """
+        Returns the user's current grade token for the course. It changes
+        whenever one of the user's scores does, or when it's evicted from the
+        cache, and a stored grade is only good for the token it was computed with.
+        """
+        cache_key = cls._token_cache_key(user_id, course_id)
+        token = cache.get(cache_key)
+        if token is None:
+            cache.add(cache_key, uuid.uuid4().hex)
+            token = cache.get(cache_key) or ''
+        return token
+
+    @classmethod
+    def invalidate(cls, user_id, course_id):
+        """
+        Discard the stored grade for a single user in a course.
+        """
+        cls.invalidate_users([user_id], course_id)
+
+    @classmethod
+    def invalidate_users(cls, user_ids, course_id):
+        """
+        Discard the stored grades for the users in a course.
+        """
+        cache.delete_many([cls._token_cache_key(user_id, course_id) for user_id in user_ids])
+        cls.objects.filter(user_id__in=user_ids, course_id=course_id).delete()
+
+    def __unicode__(self):
+        return u"[PersistentCourseGrade] {}: {} ({})".format(self.user_id, self.course_id, self.modified)
+
+
+@receiver(post_save, sender=StudentModule)
+def invalidate_persistent_grade_on_save(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Discard the student's stored course grade when a scored module changes.
+
+    Modules that have never been scored (video positions, sequence positions,
+    etc.) can't affect the grade, so saving them doesn't cost an extra query.
+    """
+    if instance.grade is None and instance.max_grade is None:
+        return
+    PersistentCourseGrade.invalidate(instance.student_id, instance.course_id)
+
+
+@receiver(post_delete, sender=StudentModule)
+def invalidate_persistent_grade_on_delete(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Discard the student's stored course grade when a module's state is deleted,
+    e.g. when an instructor resets a student's attempts.
+    """
+    PersistentCourseGrade.invalidate(instance.student_id, instance.course_id)
+
+
+class CourseMetricsRefresh(models.Model):
+    """
+    How far the class dashboard's aggregates of a course's StudentModules,
+    ProblemGradeCount and SequentialOpenCount, are up to date.
+
+    The aggregates are refreshed incrementally: only the modules with a
+    StudentModule modified since `last_modified` are counted again. Deleting a
+    StudentModule clears `last_modified`, so the next refresh counts everything.
+    """
+    course_id = CourseKeyField(max_length=255, unique=True)
+
+    # The most recent StudentModule.modified counted in the aggregates
+    last_modified = models.DateTimeField(null=True)
+
+    refreshed = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __unicode__(self):
+        return u"[CourseMetricsRefresh] {}: {} ({})".format(self.course_id, self.last_modified, self.refreshed)
+
+
+class ProblemGradeCount(models.Model):
+    """
+    The number of students with a grade on a problem, for the class dashboard.
+    """
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    module_state_key = UsageKeyField(max_length=255, db_index=True)
+    grade = models.FloatField()
+    max_grade = models.FloatField(null=True)
+    count = models.IntegerField()
+
+
+class SequentialOpenCount(models.Model):
+    """
+    The number of students who opened a subsection, for the class dashboard.
+    """
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    module_state_key = UsageKeyField(max_length=255, db_index=True)
+    count = models.IntegerField()
+
+
+@receiver(post_delete, sender=StudentModule)
+def reset_course_metrics_on_delete(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    A deleted StudentModule can't be found by its modification time, so count
+    the whole course again at the next refresh of its aggregates.
+    """
+    CourseMetricsRefresh.objects.filter(course_id=instance.course_id).update(last_modified=None)
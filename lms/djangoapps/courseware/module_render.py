@@ -25,10 +25,11 @@ from django.core.urlresolvers import reverse
 from django.http import Http404, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 
+from capa.safe_exec import TwoTierCache
 from capa.xqueue_interface import XQueueInterface
 from courseware.access import has_access, get_user_role
 from courseware.masquerade import setup_masquerade
-from courseware.model_data import FieldDataCache, DjangoKeyValueStore
+from courseware.model_data import FieldDataCache, DjangoKeyValueStore, get_write_buffer
 from courseware.models import StudentModule
 from lms.djangoapps.lms_xblock.field_data import LmsFieldData
 from lms.djangoapps.lms_xblock.runtime import LmsModuleSystem, unquote_slashes, quote_slashes
@@ -83,6 +84,9 @@ XQUEUE_INTERFACE = XQueueInterface(
     REQUESTS_AUTH,
 )
 
+# Results of running problem code, kept in this process in front of the django cache
+SAFE_EXEC_CACHE = TwoTierCache(cache)
+
 # TODO: course_id and course_key are used interchangeably in this file, which is wrong.
 # Some brave person should make the variable names consistently someday, but the code's
 # coupled enough that it's kind of tricky--you've been warned!
@@ -449,8 +453,13 @@ def get_module_system_for_user(user, field_data_cache,
         # Update the grades
         student_module.grade = event.get('value')
         student_module.max_grade = event.get('max_value')
-        # Save all changes to the underlying KeyValueStore
-        student_module.save()
+        write_buffer = get_write_buffer()
+        if write_buffer is not None and write_buffer.bulk:
+            # Written along with the rest of the batch
+            write_buffer.add(student_module)
+        else:
+            # Save all changes to the underlying KeyValueStore
+            student_module.save()
 
         # Bin score into range and increment stats
         score_bucket = get_score_bucket(student_module.grade, student_module.max_grade)
@@ -636,7 +645,7 @@ def get_module_system_for_user(user, field_data_cache,
         course_id=course_id,
         open_ended_grading_interface=open_ended_grading_interface,
         s3_interface=s3_interface,
-        cache=cache,
+        cache=SAFE_EXEC_CACHE,
         can_execute_unsafe_code=(lambda: can_execute_unsafe_code(course_id)),
         get_python_lib_zip=(lambda: get_python_lib_zip(contentstore, course_id)),
         # TODO: When we merge the descriptor and module systems, we can stop reaching into the mixologist (cpennington)
@@ -1,19 +1,30 @@
 """
 Test grade calculation.
 """
+import datetime
+
 from django.http import Http404
+from django.test.client import RequestFactory
 from django.test.utils import override_settings
 from mock import patch
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
+from pytz import UTC
 
+from courseware import grades as grades_module
 from courseware.grades import grade, iterate_grades_for
+from courseware.models import PersistentCourseGrade
+from courseware.tests.factories import StudentModuleFactory
 from xmodule.modulestore.tests.django_utils import TEST_DATA_MOCK_MODULESTORE
+from student.roles import CourseBetaTesterRole
 from student.tests.factories import UserFactory
-from xmodule.modulestore.tests.factories import CourseFactory
+from capa.tests.response_xml_factory import OptionResponseXMLFactory
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
 
-def _grade_with_errors(student, request, course, keep_raw_scores=False):
+def _grade_with_errors(student, request, course, keep_raw_scores=False, force_recompute=False):
     """This fake grade method will throw exceptions for student3 and
     student4, but allow any other students to go through normal grading.
 
@@ -24,7 +35,7 @@ def _grade_with_errors(student, request, course, keep_raw_scores=False):
     if student.username in ['student3', 'student4']:
         raise Exception("I don't like {}".format(student.username))
 
-    return grade(student, request, course, keep_raw_scores=keep_raw_scores)
+    return grade(student, request, course, keep_raw_scores=keep_raw_scores, force_recompute=force_recompute)
 
 
 class TestGradeIteration(ModuleStoreTestCase):
@@ -121,3 +132,203 @@ class TestGradeIteration(ModuleStoreTestCase):
                 students_to_errors[student] = err_msg
 
         return students_to_gradesets, students_to_errors
+
+
+@patch.dict('django.conf.settings.FEATURES', {'ENABLE_PERSISTENT_GRADES': True})
+class TestPersistentGrades(ModuleStoreTestCase):
+    """
+    Test that grades are stored, read back, and invalidated.
+    """
+    def setUp(self):
+        super(TestPersistentGrades, self).setUp()
+        self.course = CourseFactory.create()
+        self.student = UserFactory.create()
+        self.request = RequestFactory().get('/')
+        self.request.user = self.student
+        self.request.session = {}
+
+    def _grade(self, **kwargs):
+        """Grade self.student, counting how many times the course tree was walked."""
+        compute_grade = grades_module._compute_grade  # pylint: disable=protected-access
+        with patch('courseware.grades._compute_grade', wraps=compute_grade) as compute:
+            gradeset = grade(self.student, self.request, self.course, **kwargs)
+        return gradeset, compute.call_count
+
+    def test_grade_is_stored_and_reused(self):
+        first, computed = self._grade()
+        self.assertEqual(computed, 1)
+        self.assertTrue(PersistentCourseGrade.objects.filter(user=self.student, course_id=self.course.id).exists())
+
+        second, computed = self._grade()
+        self.assertEqual(computed, 0)
+        self.assertEqual(first['percent'], second['percent'])
+        self.assertEqual(first['grade'], second['grade'])
+        self.assertNotIn('raw_scores', second)
+
+    def test_raw_scores_from_store(self):
+        self._grade()
+        gradeset, computed = self._grade(keep_raw_scores=True)
+        self.assertEqual(computed, 0)
+        self.assertEqual(gradeset['raw_scores'], [])
+
+    def test_force_recompute(self):
+        self._grade()
+        _, computed = self._grade(force_recompute=True)
+        self.assertEqual(computed, 1)
+
+    def _create_student_module(self, **kwargs):
+        """Create a StudentModule for self.student in self.course."""
+        return StudentModuleFactory.create(
+            student=self.student,
+            course_id=self.course.id,
+            module_state_key=self.course.id.make_usage_key('problem', 'test_problem'),
+            **kwargs
+        )
+
+    def test_scored_module_change_invalidates(self):
+        self._grade()
+        self._create_student_module(grade=1, max_grade=2)
+        self.assertFalse(PersistentCourseGrade.objects.filter(user=self.student).exists())
+        _, computed = self._grade()
+        self.assertEqual(computed, 1)
+
+    def test_unscored_module_change_does_not_invalidate(self):
+        self._grade()
+        self._create_student_module(grade=None, max_grade=None)
+        _, computed = self._grade()
+        self.assertEqual(computed, 0)
+
+    def test_module_delete_invalidates(self):
+        student_module = self._create_student_module(grade=1, max_grade=2)
+        self._grade()
+        student_module.delete()
+        _, computed = self._grade()
+        self.assertEqual(computed, 1)
+
+    def test_course_version_invalidates(self):
+        self._grade()
+        with patch.object(type(self.course), 'subtree_edited_on', datetime.datetime(2015, 1, 1, tzinfo=UTC)):
+            _, computed = self._grade()
+        self.assertEqual(computed, 1)
+
+    def test_beta_tester_invalidates(self):
+        self._grade()
+        CourseBetaTesterRole(self.course.id).add_users(self.student)
+        _, computed = self._grade()
+        self.assertEqual(computed, 1)
+
+    def test_score_change_while_computing_invalidates(self):
+        compute_grade = grades_module._compute_grade  # pylint: disable=protected-access
+
+        def compute_then_change_score(*args):
+            """Compute the grade, while a score changes."""
+            gradeset = compute_grade(*args)
+            self._create_student_module(grade=1, max_grade=2)
+            return gradeset
+
+        with patch('courseware.grades._compute_grade', side_effect=compute_then_change_score):
+            grade(self.student, self.request, self.course)
+        _, computed = self._grade()
+        self.assertEqual(computed, 1)
+
+    def test_submissions_change_invalidates(self):
+        self._grade()
+        with patch('courseware.grades.sub_api.get_scores', return_value={'i4x://a/b/openassessment/c': (1, 2)}):
+            _, computed = self._grade()
+        self.assertEqual(computed, 1)
+
+    @patch.dict('django.conf.settings.FEATURES', {'ENABLE_PERSISTENT_GRADES': False})
+    def test_disabled(self):
+        self._grade()
+        self.assertFalse(PersistentCourseGrade.objects.exists())
+
+
+class TestBulkGradeIteration(ModuleStoreTestCase):
+    """
+    Test that bulk grading produces the same gradesets as grading one student
+    at a time.
+    """
+    def setUp(self):
+        super(TestBulkGradeIteration, self).setUp()
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(parent_location=self.course.location, category='chapter')
+        self.problems = []
+        for section_index in range(2):
+            section = ItemFactory.create(
+                parent_location=chapter.location,
+                category='sequential',
+                metadata={'graded': True, 'format': 'Homework'},
+                display_name='Homework {}'.format(section_index),
+            )
+            for problem_index in range(3):
+                self.problems.append(ItemFactory.create(
+                    parent_location=section.location,
+                    category='problem',
+                    display_name='Problem {} {}'.format(section_index, problem_index),
+                    data=OptionResponseXMLFactory().build_xml(
+                        question_text='The correct answer is Correct',
+                        options=['Correct', 'Incorrect'],
+                        correct_option='Correct',
+                        num_responses=2,
+                    ),
+                    metadata={'weight': 3} if problem_index == 0 else {},
+                ))
+        self.students = [UserFactory.create() for __ in range(4)]
+
+        # student 0 hasn't started anything, student 1 has partially completed
+        # the first homework, and students 2 and 3 have answered everything
+        StudentModuleFactory.create(
+            student=self.students[1], course_id=self.course.id,
+            module_state_key=self.problems[0].location, grade=1, max_grade=2,
+        )
+        for student, grade_value in ((self.students[2], 2), (self.students[3], 0)):
+            for problem in self.problems:
+                StudentModuleFactory.create(
+                    student=student, course_id=self.course.id,
+                    module_state_key=problem.location, grade=grade_value, max_grade=2,
+                )
+
+    def _gradesets(self, bulk):
+        """Return a dict of student -> gradeset."""
+        results = {}
+        for student, gradeset, err_msg in iterate_grades_for(
+                self.course.id, self.students, force_recompute=True, bulk=bulk
+        ):
+            self.assertEqual(err_msg, "")
+            results[student] = gradeset
+        return results
+
+    def test_bulk_matches_per_student(self):
+        self.assertEqual(self._gradesets(bulk=False), self._gradesets(bulk=True))
+
+    @patch('courseware.grades.BULK_GRADING_CHUNK_SIZE', 3)
+    def test_bulk_chunks(self):
+        self.assertEqual(self._gradesets(bulk=False), self._gradesets(bulk=True))
+
+    def test_bulk_falls_back_for_submissions(self):
+        grade_for_iteration = grades_module._grade_for_iteration  # pylint: disable=protected-access
+        with patch('courseware.grades.sub_api.get_scores', return_value={'i4x://a/b/openassessment/c': (1, 2)}):
+            with patch('courseware.grades._grade_for_iteration', wraps=grade_for_iteration) as per_student:
+                list(iterate_grades_for(self.course.id, self.students, bulk=True))
+        self.assertEqual(per_student.call_count, len(self.students))
+
+    def test_bulk_falls_back_for_beta_testers(self):
+        CourseBetaTesterRole(self.course.id).add_users(self.students[1])
+        grade_for_iteration = grades_module._grade_for_iteration  # pylint: disable=protected-access
+        with patch('courseware.grades._grade_for_iteration', wraps=grade_for_iteration) as per_student:
+            list(iterate_grades_for(self.course.id, self.students, bulk=True))
+        self.assertEqual([call[0][0] for call in per_student.call_args_list], [self.students[1]])
+
+    def test_ancestor_restrictions(self):
+        store = modulestore()
+        # Updating self.course would drop the chapter added since it was created
+        course = store.get_course(self.course.id)
+        course.start = datetime.datetime(2014, 1, 1, tzinfo=UTC)
+        store.update_item(course, ModuleStoreEnum.UserID.test)
+        section = store.get_item(store.get_parent_location(self.problems[0].location))
+        section.visible_to_staff_only = True
+        store.update_item(section, ModuleStoreEnum.UserID.test)
+
+        is_uniformly_accessible = grades_module._is_uniformly_accessible  # pylint: disable=protected-access
+        self.assertFalse(is_uniformly_accessible(store.get_item(self.problems[0].location)))
+        self.assertTrue(is_uniformly_accessible(store.get_item(self.problems[3].location)))
@@ -2,12 +2,15 @@
 Test for lms courseware app, module data (runtime data storage for XBlocks)
 """
 import json
+from datetime import datetime
 from mock import Mock, patch
 from functools import partial
 
 from courseware.model_data import DjangoKeyValueStore
-from courseware.model_data import InvalidScopeError, FieldDataCache
-from courseware.models import StudentModule
+from courseware.model_data import InvalidScopeError, FieldDataCache, DescriptorsSummary
+from courseware.model_data import start_write_buffer, flush_write_buffer, discard_write_buffer, get_write_buffer
+from courseware.model_data import buffered_writes
+from courseware.models import PersistentCourseGrade, StudentModule, StudentModuleHistory
 from courseware.models import XModuleStudentInfoField, XModuleStudentPrefsField
 
 from student.tests.factories import UserFactory
@@ -18,6 +21,7 @@ from courseware.tests.factories import StudentPrefsFactory, StudentInfoFactory
 from xblock.fields import Scope, BlockScope, ScopeIds
 from xblock.exceptions import KeyValueMultiSaveError
 from xblock.core import XBlock
+from django.core.cache import cache
 from django.test import TestCase
 from django.db import DatabaseError
 
@@ -343,3 +347,226 @@ class TestStudentInfoStorage(OtherUserFailureTestMixin, StorageTestBase, TestCas
     storage_class = XModuleStudentInfoField
     other_key_factory = partial(DjangoKeyValueStore.Key, Scope.user_info, 2, 'mock_problem')  # user_id=2, not 1
     existing_field_name = "existing_field"
+
+
+@patch('courseware.model_data.modulestore', Mock())
+class TestDescendantsCache(TestCase):
+    """Tests for the cross-request cache of descendants in cache_for_descriptor_descendents"""
+    def setUp(self):
+        super(TestDescendantsCache, self).setUp()
+        cache.clear()
+        self.user = UserFactory.create()
+        self.descriptor = mock_descriptor([
+            mock_field(Scope.user_state, 'a_field'),
+            mock_field(Scope.preferences, 'a_pref'),
+            mock_field(Scope.settings, 'a_setting'),
+        ])
+        self.descriptor.get_children.return_value = []
+        self.descriptor.get_required_module_descriptors.return_value = []
+        self.descriptor.subtree_edited_on = datetime(2015, 1, 1)
+
+    def _field_data_cache(self, **kwargs):
+        """Return a FieldDataCache for the descendants of self.descriptor"""
+        return FieldDataCache.cache_for_descriptor_descendents(course_id, self.user, self.descriptor, **kwargs)
+
+    def test_summary_round_trip(self):
+        summary = DescriptorsSummary.from_descriptors([self.descriptor])
+        restored = DescriptorsSummary.from_cache_value(summary.to_cache_value())
+        self.assertEqual(summary.usage_ids, restored.usage_ids)
+        self.assertEqual(summary.block_types, restored.block_types)
+        self.assertEqual(summary.field_names, restored.field_names)
+        self.assertEqual(
+            restored.field_names,
+            {Scope.user_state: {'a_field'}, Scope.preferences: {'a_pref'}},
+        )
+
+    def test_second_request_skips_walk(self):
+        first = self._field_data_cache()
+        self.assertEqual(self.descriptor.get_children.call_count, 1)
+
+        second = self._field_data_cache()
+        self.assertEqual(self.descriptor.get_children.call_count, 1)
+        self.assertEqual(first._all_usage_ids, second._all_usage_ids)  # pylint: disable=protected-access
+        self.assertEqual(first._all_block_types, second._all_block_types)  # pylint: disable=protected-access
+
+    def test_new_version_walks_again(self):
+        self._field_data_cache()
+        self.descriptor.subtree_edited_on = datetime(2015, 1, 2)
+        self._field_data_cache()
+        self.assertEqual(self.descriptor.get_children.call_count, 2)
+
+    def test_depth_is_part_of_key(self):
+        self._field_data_cache(depth=None)
+        self._field_data_cache(depth=1)
+        self.assertEqual(self.descriptor.get_children.call_count, 2)
+
+    def test_filter_is_not_cached(self):
+        self._field_data_cache(descriptor_filter=lambda descriptor: True)
+        self._field_data_cache(descriptor_filter=lambda descriptor: True)
+        self.assertEqual(self.descriptor.get_children.call_count, 2)
+
+
+class TestLazyFieldDataCache(TestCase):
+    """Tests for FieldDataCache(lazy=True)"""
+    def setUp(self):
+        super(TestLazyFieldDataCache, self).setUp()
+        student_module = StudentModuleFactory(state=json.dumps({'a_field': 'a_value'}))
+        self.user = student_module.student
+        self.assertEqual(self.user.id, 1)   # check our assumption hard-coded in the key functions above.
+        StudentPrefsFactory.create(student=self.user, field_name='a_pref', value=json.dumps('pref_value'))
+        self.field_data_cache = FieldDataCache(
+            [mock_descriptor([mock_field(Scope.user_state, 'a_field'), mock_field(Scope.preferences, 'a_pref')])],
+            course_id,
+            self.user,
+            lazy=True,
+        )
+        self.kvs = DjangoKeyValueStore(self.field_data_cache)
+
+    def test_nothing_loaded_up_front(self):
+        self.assertEqual(self.field_data_cache.num_queries, 0)
+
+    def test_scope_loaded_on_first_access(self):
+        self.assertEquals('a_value', self.kvs.get(user_state_key('a_field')))
+        self.assertEqual(self.field_data_cache.num_queries, 1)
+
+        # Later accesses to the same scope are served from the cache
+        self.assertTrue(self.kvs.has(user_state_key('a_field')))
+        self.assertEqual(self.field_data_cache.num_queries, 1)
+
+        self.assertEquals('pref_value', self.kvs.get(prefs_key('a_pref')))
+        self.assertEqual(self.field_data_cache.num_queries, 2)
+
+    def test_prime(self):
+        student_module = StudentModule.objects.get(student=self.user)
+        self.field_data_cache.prime(Scope.user_state, [student_module])
+        self.assertEquals('a_value', self.kvs.get(user_state_key('a_field')))
+        self.assertEqual(self.field_data_cache.num_queries, 0)
+        self.assertIs(self.field_data_cache.find(user_state_key('a_field')), student_module)
+
+    def test_set_after_lazy_load(self):
+        self.kvs.set(user_state_key('a_field'), 'new_value')
+        self.assertEquals(json.loads(StudentModule.objects.get(student=self.user).state)['a_field'], 'new_value')
+
+    @patch('courseware.model_data.LAZY_LOAD_WINDOW_SIZE', 1)
+    def test_windows(self):
+        descriptors = [
+            mock_descriptor([mock_field(Scope.user_state, 'a_field')]),
+            mock_descriptor([mock_field(Scope.user_state, 'a_field')]),
+        ]
+        descriptors[1].scope_ids = ScopeIds('user1', 'mock_problem', location('def_id'), location('other_usage_id'))
+        field_data_cache = FieldDataCache(descriptors, course_id, self.user, lazy=True)
+        kvs = DjangoKeyValueStore(field_data_cache)
+
+        self.assertEquals('a_value', kvs.get(user_state_key('a_field')))
+        self.assertEqual(field_data_cache.num_queries, 1)
+        self.assertFalse(kvs.has(DjangoKeyValueStore.Key(Scope.user_state, 1, location('other_usage_id'), 'a_field')))
+        self.assertEqual(field_data_cache.num_queries, 2)
+
+
+class TestWriteBuffer(TestCase):
+    """Tests for buffering DjangoKeyValueStore writes until the end of a runtime call"""
+    def setUp(self):
+        super(TestWriteBuffer, self).setUp()
+        student_module = StudentModuleFactory(state=json.dumps({'a_field': 'a_value'}))
+        self.user = student_module.student
+        self.assertEqual(self.user.id, 1)   # check our assumption hard-coded in the key functions above.
+        StudentPrefsFactory.create(student=self.user, field_name='a_pref', value=json.dumps('pref_value'))
+        self.field_data_cache = FieldDataCache(
+            [mock_descriptor([mock_field(Scope.user_state, 'a_field'), mock_field(Scope.preferences, 'a_pref')])],
+            course_id,
+            self.user,
+        )
+        self.kvs = DjangoKeyValueStore(self.field_data_cache)
+        start_write_buffer()
+        self.addCleanup(discard_write_buffer)
+
+    def _stored_state(self):
+        """Return the field value stored in the database for a_field"""
+        return json.loads(StudentModule.objects.get(student=self.user).state)['a_field']
+
+    def _stored_pref(self):
+        """Return the field value stored in the database for a_pref"""
+        return json.loads(XModuleStudentPrefsField.objects.get(student=self.user, field_name='a_pref').value)
+
+    def test_writes_wait_for_flush(self):
+        self.kvs.set_many({user_state_key('a_field'): 'new_value', prefs_key('a_pref'): 'new_pref'})
+        self.assertEquals('a_value', self._stored_state())
+        self.assertEquals('pref_value', self._stored_pref())
+        # Reads through the cache see the new values right away
+        self.assertEquals('new_value', self.kvs.get(user_state_key('a_field')))
+
+        flush_write_buffer()
+        self.assertEquals('new_value', self._stored_state())
+        self.assertEquals('new_pref', self._stored_pref())
+
+    def test_repeated_writes_collapse(self):
+        self.kvs.set(user_state_key('a_field'), 'first_value')
+        self.kvs.set(user_state_key('a_field'), 'second_value')
+        with patch.object(StudentModule, 'save') as mock_save:
+            flush_write_buffer()
+        self.assertEqual(mock_save.call_count, 1)
+
+    def test_discard(self):
+        self.kvs.set(user_state_key('a_field'), 'new_value')
+        discard_write_buffer()
+        flush_write_buffer()
+        self.assertEquals('a_value', self._stored_state())
+
+    def test_delete_of_buffered_row(self):
+        self.kvs.set(prefs_key('a_pref'), 'new_pref')
+        self.kvs.delete(prefs_key('a_pref'))
+        flush_write_buffer()
+        self.assertFalse(XModuleStudentPrefsField.objects.filter(student=self.user, field_name='a_pref').exists())
+
+    def test_bulk_student_modules(self):
+        discard_write_buffer()
+        start_write_buffer(bulk=True)
+        PersistentCourseGrade.objects.create(user=self.user, course_id=course_id, gradeset='{}', submissions_hash='')
+        history_count = StudentModuleHistory.objects.count()
+
+        self.kvs.set(user_state_key('a_field'), 'new_value')
+        student_module = self.field_data_cache.find(user_state_key('a_field'))
+        student_module.grade = 1
+        student_module.max_grade = 2
+        with patch.object(StudentModule, 'save') as mock_save:
+            flush_write_buffer()
+        self.assertFalse(mock_save.called)
+
+        stored = StudentModule.objects.get(student=self.user)
+        self.assertEquals('new_value', json.loads(stored.state)['a_field'])
+        self.assertEquals((1, 2), (stored.grade, stored.max_grade))
+        history = StudentModuleHistory.objects.latest()
+        self.assertEquals(history_count + 1, StudentModuleHistory.objects.count())
+        self.assertEquals((stored.state, 1, 2), (history.state, history.grade, history.max_grade))
+        self.assertFalse(PersistentCourseGrade.objects.filter(user=self.user).exists())
+
+    def test_flush_failure(self):
+        self.kvs.set_many({user_state_key('a_field'): 'new_value', prefs_key('a_pref'): 'new_pref'})
+        with patch('courseware.model_data._execute_update', Mock(side_effect=DatabaseError)):
+            with self.assertRaises(KeyValueMultiSaveError) as exception_context:
+                flush_write_buffer()
+        self.assertEquals(exception_context.exception.saved_field_names, ['a_field'])
+
+    def test_buffered_writes(self):
+        discard_write_buffer()
+        with buffered_writes():
+            self.kvs.set(user_state_key('a_field'), 'new_value')
+            self.assertEquals('a_value', self._stored_state())
+        self.assertEquals('new_value', self._stored_state())
+        self.assertIsNone(get_write_buffer())
+
+    def test_buffered_writes_discarded_on_exception(self):
+        discard_write_buffer()
+        with self.assertRaises(ValueError):
+            with buffered_writes():
+                self.kvs.set(user_state_key('a_field'), 'new_value')
+                raise ValueError()
+        self.assertEquals('a_value', self._stored_state())
+        self.assertIsNone(get_write_buffer())
+
+    def test_buffered_writes_join_enclosing_buffer(self):
+        write_buffer = get_write_buffer()
+        with buffered_writes():
+            self.kvs.set(user_state_key('a_field'), 'new_value')
+        self.assertIs(write_buffer, get_write_buffer())
+        self.assertEquals('a_value', self._stored_state())
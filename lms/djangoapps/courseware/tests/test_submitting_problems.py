@@ -1049,6 +1049,51 @@ class TestAnswerDistributions(TestSubmittingProblems):
                 }
             )
 
+    @patch('courseware.grades.ANSWER_DISTRIBUTION_CHUNK_SIZE', 1)
+    def test_chunks(self):
+        # The rows are read one query per chunk, and all of them are counted
+        self.submit_question_answer('p1', {'2_1': u'Correct'})
+        self.submit_question_answer('p2', {'2_1': u'Incorrect'})
+        self.submit_question_answer('p3', {'2_1': u'Correct'})
+
+        self.assertEqual(
+            grades.answer_distributions(self.course.id),
+            {
+                ('p1', 'p1', '{}_2_1'.format(self.p1_html_id)): {'Correct': 1},
+                ('p2', 'p2', '{}_2_1'.format(self.p2_html_id)): {'Incorrect': 1},
+                ('p3', 'p3', '{}_2_1'.format(self.p3_html_id)): {'Correct': 1},
+            }
+        )
+
+    def test_checkpoint(self):
+        self.submit_question_answer('p1', {'2_1': u'Correct'})
+        self.submit_question_answer('p2', {'2_1': u'Incorrect'})
+        checkpoint = {}
+        grades.answer_distributions(self.course.id, checkpoint=checkpoint)
+        self.assertIsNotNone(checkpoint['last_modified'])
+
+        # Only the problem submitted since the checkpoint is counted again
+        p2_module = StudentModule.objects.get(
+            course_id=self.course.id,
+            student=self.student_user,
+            module_state_key=self.problem_location('p2'),
+        )
+        state = json.loads(p2_module.state)
+        state["student_answers"]['{}_2_1'.format(self.p2_html_id)] = u'Correct'
+        p2_module.state = json.dumps(state)
+        p2_module.save()
+
+        with patch('courseware.grades._count_answers', wraps=grades._count_answers) as count_answers:
+            distributions = grades.answer_distributions(self.course.id, checkpoint=checkpoint)
+        count_answers.assert_called_once_with(self.course.id, unicode(p2_module.module_state_key))
+        self.assertEqual(
+            distributions,
+            {
+                ('p1', 'p1', '{}_2_1'.format(self.p1_html_id)): {'Correct': 1},
+                ('p2', 'p2', '{}_2_1'.format(self.p2_html_id)): {'Correct': 1},
+            }
+        )
+
 
 class TestConditionalContent(TestSubmittingProblems):
     """
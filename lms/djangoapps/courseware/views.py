@@ -9,6 +9,7 @@ import cgi
 
 from datetime import datetime
 from collections import defaultdict
+import dogstats_wrapper as dog_stats_api
 from django.utils import translation
 from django.utils.translation import ugettext as _
 from django.utils.translation import ungettext
@@ -375,8 +376,9 @@ def _index_bulk_op(request, course_key, chapter, section, position):
     masquerade = setup_masquerade(request, course_key, staff_access)
 
     try:
+        lazy_field_data = settings.FEATURES.get('ENABLE_LAZY_FIELD_DATA_CACHE', False)
         field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
-            course_key, user, course, depth=2)
+            course_key, user, course, depth=2, lazy=lazy_field_data)
 
         course_module = get_module_for_descriptor(user, request, course, field_data_cache, course_key)
         if course_module is None:
@@ -470,7 +472,8 @@ def _index_bulk_op(request, course_key, chapter, section, position):
             # Load all descendants of the section, because we're going to display its
             # html, which in general will need all of its children
             section_field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
-                course_key, user, section_descriptor, depth=None, asides=XBlockAsidesConfig.possible_asides()
+                course_key, user, section_descriptor, depth=None, asides=XBlockAsidesConfig.possible_asides(),
+                lazy=lazy_field_data,
             )
 
             # Verify that position a string is in fact an int
@@ -498,6 +501,11 @@ def _index_bulk_op(request, course_key, chapter, section, position):
             save_child_position(chapter_module, section)
             context['fragment'] = section_module.render(STUDENT_VIEW)
             context['section_title'] = section_descriptor.display_name_with_default
+            dog_stats_api.histogram(
+                'lms.courseware.index.field_data_queries',
+                field_data_cache.num_queries + section_field_data_cache.num_queries,
+                tags=[u'lazy:{}'.format(lazy_field_data)],
+            )
         else:
             # section is none, so display a message
             studio_url = get_studio_url(course, 'course')
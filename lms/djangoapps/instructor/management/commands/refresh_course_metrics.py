@@ -0,0 +1,32 @@
+"""
+django management command: refresh the aggregates shown in the Metrics tab
+of the instructor dashboard, for use by periodic batch processes
+"""
+from django.core.management.base import BaseCommand
+
+from class_dashboard.dashboard_data import refresh_course_metrics
+from courseware.models import CourseMetricsRefresh
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+from opaque_keys.edx.locations import SlashSeparatedCourseKey
+
+
+class Command(BaseCommand):
+    help = "Refresh the grade and open distributions of the Metrics tab.\n"
+    help += "Usage: refresh_course_metrics [course_id ...]\n"
+    help += "   Without course ids, refreshes every course whose metrics have been shown before."
+
+    def handle(self, *args, **options):
+        if args:
+            course_keys = []
+            for course_id in args:
+                try:
+                    course_keys.append(CourseKey.from_string(course_id))
+                except InvalidKeyError:
+                    course_keys.append(SlashSeparatedCourseKey.from_deprecated_string(course_id))
+        else:
+            course_keys = [refresh.course_id for refresh in CourseMetricsRefresh.objects.all()]
+
+        for course_key in course_keys:
+            print "Refreshing metrics for {}".format(course_key)
+            refresh_course_metrics(course_key)
@@ -8,6 +8,7 @@ import csv
 import json
 import logging
 import os
+import pickle
 import re
 import requests
 import urllib
@@ -19,6 +20,7 @@ from StringIO import StringIO
 
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.http import HttpResponse
 from django_future.csrf import ensure_csrf_cookie
 from django.views.decorators.cache import cache_control
@@ -66,6 +68,11 @@ FORUM_ROLE_REMOVE = 'remove'
 # For determining if a shibboleth course
 SHIBBOLETH_DOMAIN_PREFIX = 'shib:'
 
+# Seconds the answer counts of the answer distribution report are kept for the next report
+ANSWER_DISTRIBUTION_CHECKPOINT_TIMEOUT = 60 * 60 * 24
+# Bigger checkpoints aren't kept, as memcached refuses values over 1MB
+ANSWER_DISTRIBUTION_CHECKPOINT_MAX_SIZE = 1000 * 1000
+
 
 def split_by_comma_and_whitespace(a_str):
     """
@@ -1084,7 +1091,20 @@ def get_answers_distribution(request, course_key):
     """
     course = get_course_with_access(request.user, 'staff', course_key)
 
-    course_answer_distributions = grades.answer_distributions(course.id)
+    # Only count again the answers to problems submitted since the last report
+    checkpoint_key = u'answer_distributions.checkpoint.{}'.format(course.id)
+    checkpoint = cache.get(checkpoint_key) or {}
+    course_answer_distributions = grades.answer_distributions(
+        course.id, checkpoint=checkpoint, processes=settings.ANSWER_DISTRIBUTION_PROCESSES
+    )
+    checkpoint_size = len(pickle.dumps(checkpoint))
+    if checkpoint_size <= ANSWER_DISTRIBUTION_CHECKPOINT_MAX_SIZE:
+        cache.set(checkpoint_key, checkpoint, ANSWER_DISTRIBUTION_CHECKPOINT_TIMEOUT)
+    else:
+        log.info(
+            u"Not caching the answer distribution checkpoint of %s, which is %d bytes",
+            course.id, checkpoint_size
+        )
 
     dist = {}
     dist['header'] = ['url_name', 'display name', 'answer id', 'answer', 'count']
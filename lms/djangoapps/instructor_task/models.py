@@ -12,13 +12,14 @@ file and check it in at the same time as your model changes. To do that,
 ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 """
-from cStringIO import StringIO
 from gzip import GzipFile
 from uuid import uuid4
 import csv
 import json
 import hashlib
+import os
 import os.path
+import tempfile
 import urllib
 
 from boto.s3.connection import S3Connection
@@ -193,9 +194,9 @@ class InstructorTask(models.Model):
 class ReportStore(object):
     """
     Simple abstraction layer that can fetch and store CSV files for reports
-    download. Should probably refactor later to create a ReportFile object that
-    can simply be appended to for the sake of memory efficiency, rather than
-    passing in the whole dataset. Doing that for now just because it's simpler.
+    download. `store_rows` takes any iterable of rows, including a generator,
+    and writes them out as they come, so a report never has to be held in
+    memory all at once.
     """
     @classmethod
     def from_config(cls):
@@ -218,6 +219,29 @@ class ReportStore(object):
         for row in rows:
             yield [unicode(item).encode('utf-8') for item in row]
 
+    def _write_rows(self, fileobj, rows):
+        """
+        Write `rows` to `fileobj` as CSV, one row at a time.
+        """
+        csvwriter = csv.writer(fileobj)
+        for row in self._get_utf8_encoded_rows(rows):
+            csvwriter.writerow(row)
+
+    def _read_rows(self, fileobj):
+        """
+        Yield the rows of the CSV in `fileobj`, as lists of unicode strings.
+        """
+        for row in csv.reader(fileobj):
+            yield [item.decode('utf-8') for item in row]
+
+    @staticmethod
+    def is_hidden(filename):
+        """
+        Files whose names start with a dot, such as partial reports, are
+        stored like any other but not listed by `links_for`.
+        """
+        return filename.startswith('.')
+
 
 class S3ReportStore(ReportStore):
     """
@@ -308,19 +332,50 @@ class S3ReportStore(ReportStore):
     def store_rows(self, course_id, filename, rows):
         """
         Given a `course_id`, `filename`, and `rows` (each row is an iterable of
-        strings), create a buffer that is a gzip'd csv file, and then `store()`
-        that buffer.
+        strings), write a gzip'd csv file, and then upload it to S3.
+
+        The rows are compressed into a temporary file as they are produced, so
+        `rows` can be a generator of any length. Nothing is uploaded until the
+        last row has been written.
 
         Even though we store it in gzip format, browsers will transparently
         download and decompress it. Filenames should end in `.csv`, not `.gz`.
         """
-        output_buffer = StringIO()
-        gzip_file = GzipFile(fileobj=output_buffer, mode="wb")
-        csvwriter = csv.writer(gzip_file)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
-        gzip_file.close()
+        with tempfile.TemporaryFile() as output_file:
+            gzip_file = GzipFile(fileobj=output_file, mode="wb")
+            self._write_rows(gzip_file, rows)
+            gzip_file.close()
+
+            size = output_file.tell()
+            output_file.seek(0)
+            key = self.key_for(course_id, filename)
+            key.content_encoding = "gzip"
+            key.content_type = "text/csv"
+            key.set_contents_from_file(
+                output_file,
+                headers={
+                    "Content-Encoding": "gzip",
+                    "Content-Length": size,
+                    "Content-Type": "text/csv",
+                }
+            )
+
+    def read_rows(self, course_id, filename):
+        """
+        Yield the rows of a file stored by `store_rows`, as lists of unicode
+        strings. The file is downloaded to a temporary file first.
+        """
+        with tempfile.TemporaryFile() as input_file:
+            self.key_for(course_id, filename).get_contents_to_file(input_file)
+            input_file.seek(0)
+            for row in self._read_rows(GzipFile(fileobj=input_file, mode="rb")):
+                yield row
 
-        self.store(course_id, filename, output_buffer)
+    def delete(self, course_id, filename):
+        """
+        Delete a stored file.
+        """
+        self.key_for(course_id, filename).delete()
 
     def links_for(self, course_id):
         """
@@ -328,9 +383,13 @@ class S3ReportStore(ReportStore):
         can be plugged straight into an href
         """
         course_dir = self.key_for(course_id, '')
+        keys = [
+            key for key in self.bucket.list(prefix=course_dir.key)
+            if not self.is_hidden(key.key.split("/")[-1])
+        ]
         return [
             (key.key.split("/")[-1], key.generate_url(expires_in=300))
-            for key in sorted(self.bucket.list(prefix=course_dir.key), reverse=True, key=lambda k: k.last_modified)
+            for key in sorted(keys, reverse=True, key=lambda k: k.last_modified)
         ]
 
 
@@ -390,12 +449,44 @@ class LocalFSReportStore(ReportStore):
         """
         Given a course_id, filename, and rows (each row is an iterable of strings),
         write this data out.
+
+        The rows are written to a temporary file as they are produced, which is
+        renamed once they are all written, so the file is never seen half-written.
         """
-        output_buffer = StringIO()
-        csvwriter = csv.writer(output_buffer)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+        full_path = self.path_to(course_id, filename)
+        directory = os.path.dirname(full_path)
+        if not os.path.exists(directory):
+            os.mkdir(directory)
 
-        self.store(course_id, filename, output_buffer)
+        # Hidden until it's complete
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp')
+        try:
+            with os.fdopen(fd, "wb") as f:
+                # mkstemp makes the file readable only by us; give it the mode
+                # open() would have, so that the web server can serve it
+                umask = os.umask(0)
+                os.umask(umask)
+                os.fchmod(f.fileno(), 0666 & ~umask)
+                self._write_rows(f, rows)
+            os.rename(temp_path, full_path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+    def read_rows(self, course_id, filename):
+        """
+        Yield the rows of a file stored by `store_rows`, as lists of unicode
+        strings.
+        """
+        with open(self.path_to(course_id, filename), "rb") as f:
+            for row in self._read_rows(f):
+                yield row
+
+    def delete(self, course_id, filename):
+        """
+        Delete a stored file.
+        """
+        os.remove(self.path_to(course_id, filename))
 
     def links_for(self, course_id):
         """
@@ -408,7 +499,11 @@ class LocalFSReportStore(ReportStore):
         course_dir = self.path_to(course_id, '')
         if not os.path.exists(course_dir):
             return []
-        files = [(filename, os.path.join(course_dir, filename)) for filename in os.listdir(course_dir)]
+        files = [
+            (filename, os.path.join(course_dir, filename)) for filename in os.listdir(course_dir)
+            # Skip partial reports, and reports that are still being written
+            if not self.is_hidden(filename)
+        ]
         files.sort(key=lambda (filename, full_path): os.path.getmtime(full_path), reverse=True)
 
         return [
@@ -18,6 +18,9 @@ object contains a 'task_input' row which is a JSON-encoded dict containing
 a problem URL and optionally a student.  These are used to set up the initial value
 of the query for traversing StudentModule objects.
 
+Rescoring all of the submissions to a problem is split up into subtasks, in the
+way that sending bulk email is, since each submission is expensive to rescore.
+
 """
 from django.conf import settings
 from django.utils.translation import ugettext_noop
@@ -27,6 +30,8 @@ from instructor_task.tasks_helper import (
     run_main_task,
     BaseInstructorTask,
     perform_module_state_update,
+    perform_delegate_rescore_batches,
+    run_rescore_subtask,
     rescore_problem_module_state,
     reset_attempts_module_state,
     delete_problem_module_state,
@@ -64,10 +69,36 @@ def rescore_problem(entry_id, xmodule_instance_args):
         """Filter that matches problems which are marked as being done"""
         return modules_to_update.filter(state__contains='"done": true')
 
-    visit_fcn = partial(perform_module_state_update, update_fcn, filter_fcn)
+    def create_subtask_fcn(module_ids, initial_subtask_status):
+        """Creates a subtask to rescore the StudentModules with ids `module_ids`."""
+        return rescore_problem_subtask.subtask(
+            (
+                entry_id,
+                xmodule_instance_args,
+                module_ids,
+                action_name,
+                initial_subtask_status.to_dict(),
+            ),
+            task_id=initial_subtask_status.task_id,
+        )
+
+    visit_fcn = partial(perform_delegate_rescore_batches, update_fcn, create_subtask_fcn, filter_fcn)
     return run_main_task(entry_id, visit_fcn, action_name)
 
 
+@task  # pylint: disable=not-callable
+def rescore_problem_subtask(entry_id, xmodule_instance_args, module_ids, action_name, subtask_status_dict):
+    """Rescores a batch of submissions to a problem, as a subtask of `rescore_problem`.
+
+    `entry_id` is the id value of the InstructorTask entry that the results are recorded in.
+
+    `module_ids` are the ids of the StudentModules to rescore.
+
+    `subtask_status_dict` is the subtask's initial SubtaskStatus, as a dict.
+    """
+    return run_rescore_subtask(entry_id, xmodule_instance_args, module_ids, action_name, subtask_status_dict)
+
+
 @task(base=BaseInstructorTask)  # pylint: disable=not-callable
 def reset_problem_attempts(entry_id, xmodule_instance_args):
     """Resets problem attempts to zero for a particular problem for all students in a course.
@@ -133,10 +164,16 @@ def send_bulk_course_email(entry_id, _xmodule_instance_args):
     return run_main_task(entry_id, visit_fcn, action_name)
 
 
-@task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
+# Acknowledged late, so that if the worker is killed the task is delivered again,
+# and resumes from its last checkpoint.
+@task(  # pylint: disable=not-callable
+    base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY, acks_late=True
+)
 def calculate_grades_csv(entry_id, xmodule_instance_args):
     """
     Grade a course and push the results to an S3 bucket for download.
+
+    Progress is checkpointed as chunks of students are graded; see upload_grades_csv.
     """
     # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
     action_name = ugettext_noop('graded')
@@ -6,12 +6,14 @@ running state of a course.
 import json
 from datetime import datetime
 from time import time
+from uuid import uuid4
 import unicodecsv
 import logging
 
 from celery import Task, current_task
 from celery.states import SUCCESS, FAILURE
 from django.contrib.auth.models import User
+from django.conf import settings
 from django.core.files.storage import DefaultStorage
 from django.db import transaction, reset_queries
 import dogstats_wrapper as dog_stats_api
@@ -20,16 +22,23 @@ from pytz import UTC
 from track.views import task_track
 from util.file import course_filename_prefix_generator, UniversalNewlineIterator
 from xmodule.modulestore.django import modulestore
+from xblock.fields import Scope
 from xmodule.split_test_module import get_split_user_partitions
 
 from courseware.courses import get_course_by_id, get_problems_in_section
 from courseware.grades import iterate_grades_for
 from courseware.models import StudentModule
-from courseware.model_data import FieldDataCache
+from courseware.model_data import FieldDataCache, start_write_buffer, flush_write_buffer, discard_write_buffer
 from courseware.module_render import get_module_for_descriptor_internal
 from instructor_analytics.basic import enrolled_students_features
 from instructor_analytics.csvs import format_dictlist
 from instructor_task.models import ReportStore, InstructorTask, PROGRESS
+from instructor_task.subtasks import (
+    SubtaskStatus,
+    queue_subtasks_for_query,
+    check_subtask_is_valid,
+    update_subtask_status,
+)
 from lms.djangoapps.lms_xblock.runtime import LmsPartitionService
 from openedx.core.djangoapps.course_groups.cohorts import get_cohort
 from openedx.core.djangoapps.course_groups.models import CourseUserGroup
@@ -297,11 +306,43 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
 
     """
     start_time = time()
+    usage_keys, problems = _get_problems_for_task(course_id, task_input)
+    modules_to_update = _get_modules_to_update(course_id, task_input, usage_keys, filter_fcn)
+
+    task_progress = TaskProgress(action_name, modules_to_update.count(), start_time)
+    task_progress.update_task_state()
+
+    for module_to_update in modules_to_update:
+        task_progress.attempted += 1
+        module_descriptor = problems[unicode(module_to_update.module_state_key)]
+        # There is no try here:  if there's an error, we let it throw, and the task will
+        # be marked as FAILED, with a stack trace.
+        with dog_stats_api.timer('instructor_tasks.module.time.step', tags=[u'action:{name}'.format(name=action_name)]):
+            update_status = update_fcn(module_descriptor, module_to_update)
+            if update_status == UPDATE_STATUS_SUCCEEDED:
+                # If the update_fcn returns true, then it performed some kind of work.
+                # Logging of failures is left to the update_fcn itself.
+                task_progress.succeeded += 1
+            elif update_status == UPDATE_STATUS_FAILED:
+                task_progress.failed += 1
+            elif update_status == UPDATE_STATUS_SKIPPED:
+                task_progress.skipped += 1
+            else:
+                raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
+
+    return task_progress.update_task_state()
+
+
+def _get_problems_for_task(course_id, task_input):
+    """
+    Returns the usage keys of the problems named by `task_input` (its
+    'problem_url' or 'entrance_exam_url'), and a dict of their descriptors
+    keyed by unicode(usage_key).
+    """
     usage_keys = []
+    problems = {}
     problem_url = task_input.get('problem_url')
     entrance_exam_url = task_input.get('entrance_exam_url')
-    student_identifier = task_input.get('student')
-    problems = {}
 
     # if problem_url is present make a usage key from it
     if problem_url:
@@ -317,6 +358,18 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
         problems = get_problems_in_section(entrance_exam_url)
         usage_keys = [UsageKey.from_string(location) for location in problems.keys()]
 
+    return usage_keys, problems
+
+
+def _get_modules_to_update(course_id, task_input, usage_keys, filter_fcn):
+    """
+    Returns the query for the StudentModules of `usage_keys` that a task should
+    update: those of the student named by `task_input`, if there is one, and
+    otherwise those of every student who has responded to the problems so far.
+    `filter_fcn`, if not None, is then applied to the query.
+    """
+    student_identifier = task_input.get('student')
+
     # find the modules in question
     modules_to_update = StudentModule.objects.filter(course_id=course_id, module_state_key__in=usage_keys)
 
@@ -337,28 +390,144 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     if filter_fcn is not None:
         modules_to_update = filter_fcn(modules_to_update)
 
-    task_progress = TaskProgress(action_name, modules_to_update.count(), start_time)
-    task_progress.update_task_state()
+    return modules_to_update
 
-    for module_to_update in modules_to_update:
-        task_progress.attempted += 1
-        module_descriptor = problems[unicode(module_to_update.module_state_key)]
-        # There is no try here:  if there's an error, we let it throw, and the task will
-        # be marked as FAILED, with a stack trace.
-        with dog_stats_api.timer('instructor_tasks.module.time.step', tags=[u'action:{name}'.format(name=action_name)]):
-            update_status = update_fcn(module_descriptor, module_to_update)
+
+def perform_delegate_rescore_batches(update_fcn, create_subtask_fcn, filter_fcn, entry_id, course_id, task_input,
+                                     action_name):
+    """
+    Rescores the StudentModules that perform_module_state_update would visit, by
+    chopping them up into batches of no more than settings.RESCORE_SUBMISSIONS_PER_TASK
+    and queueing up a subtask for each batch.
+
+    `create_subtask_fcn` takes the list of ids of the StudentModules in a batch,
+    and the SubtaskStatus of the new subtask, and returns the subtask.  If there
+    aren't enough StudentModules to fill more than one batch, they are instead
+    updated here with `update_fcn`, by perform_module_state_update.
+    """
+    usage_keys, __ = _get_problems_for_task(course_id, task_input)
+    modules_to_update = _get_modules_to_update(course_id, task_input, usage_keys, filter_fcn)
+    items_per_task = settings.RESCORE_SUBMISSIONS_PER_TASK
+    if modules_to_update.count() <= items_per_task:
+        return perform_module_state_update(update_fcn, filter_fcn, entry_id, course_id, task_input, action_name)
+
+    # As with bulk email, if the task has been run again, e.g. because it was requeued
+    # after a loss of connection, the subtasks queued the first time carry on.
+    entry = InstructorTask.objects.get(pk=entry_id)
+    if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+        TASK_LOG.warning(u"Task %s has already been processed!  InstructorTask = %s", entry.task_id, entry)
+        return json.loads(entry.task_output)
+
+    def _create_rescore_subtask(item_list, initial_subtask_status):
+        """Creates a subtask to rescore the StudentModules in `item_list`."""
+        return create_subtask_fcn([item['pk'] for item in item_list], initial_subtask_status)
+
+    return queue_subtasks_for_query(
+        entry,
+        action_name,
+        _create_rescore_subtask,
+        [modules_to_update],
+        [],
+        items_per_task,
+    )
+
+
+def run_rescore_subtask(entry_id, xmodule_instance_args, module_ids, action_name, subtask_status_dict):
+    """
+    Rescores the StudentModules with ids `module_ids` as a subtask of the
+    InstructorTask `entry_id`, and records the results in the InstructorTask.
+
+    Returns the subtask's status, as a dict.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    TASK_LOG.info(u"Preparing to rescore %d submissions as subtask %s for instructor task %d",
+                  len(module_ids), current_task_id, entry_id)
+
+    # Raises DuplicateTaskException if the subtask has been requeued, or already run.
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    try:
+        action_tag = u'action:{name}'.format(name=action_name)
+        with dog_stats_api.timer('instructor_tasks.subtask.time.overall', tags=[action_tag]):
+            new_subtask_status = _rescore_problem_batch(
+                xmodule_instance_args, entry_id, module_ids, action_name, subtask_status
+            )
+    except Exception:
+        # Nothing from the batch has been written, so count all of it as failed.
+        TASK_LOG.exception(
+            u"Rescore subtask %s for instructor task %d: failed unexpectedly!", current_task_id, entry_id
+        )
+        subtask_status.increment(failed=len(module_ids), state=FAILURE)
+        update_subtask_status(entry_id, current_task_id, subtask_status)
+        raise
+
+    TASK_LOG.info(u"Rescore subtask %s for instructor task %d: succeeded", current_task_id, entry_id)
+    update_subtask_status(entry_id, current_task_id, new_subtask_status)
+    return new_subtask_status.to_dict()
+
+
+def _rescore_problem_batch(xmodule_instance_args, entry_id, module_ids, action_name, subtask_status):
+    """
+    Rescores the StudentModules with ids `module_ids`, and returns
+    `subtask_status` incremented with the results.
+
+    The StudentModules are loaded with one query, and each problem descriptor
+    once, to be bound to every student in turn (capa's problem_cache also
+    keeps the parsed problem and the results of its script).  The new states
+    and grades are buffered, and all written together at the end, so a batch
+    that raises an exception doesn't write anything.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+    course_id = entry.course_id
+    __, problems = _get_problems_for_task(course_id, json.loads(entry.task_input))
+    descriptors_summaries = {}
+    action_tag = u'action:{name}'.format(name=action_name)
+    succeeded = failed = skipped = 0
+
+    start_write_buffer(bulk=True)
+    try:
+        student_modules = StudentModule.objects.filter(pk__in=module_ids).select_related('student')
+        for student_module in student_modules:
+            location = unicode(student_module.module_state_key)
+            module_descriptor = problems[location]
+
+            # All students share the work of finding the problem's descendants,
+            # and their StudentModule for the problem has already been loaded.
+            descriptors_summary = descriptors_summaries.get(location)
+            if descriptors_summary is None:
+                field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
+                    course_id, student_module.student, module_descriptor, lazy=True
+                )
+                descriptors_summary = descriptors_summaries[location] = field_data_cache.descriptors_summary
+            else:
+                field_data_cache = FieldDataCache(
+                    None, course_id, student_module.student, descriptors_summary=descriptors_summary, lazy=True
+                )
+            if len(descriptors_summary.usage_ids) == 1:
+                field_data_cache.prime(Scope.user_state, [student_module])
+
+            with dog_stats_api.timer('instructor_tasks.module.time.step', tags=[action_tag]):
+                update_status = rescore_problem_module_state(
+                    xmodule_instance_args, module_descriptor, student_module, field_data_cache=field_data_cache
+                )
             if update_status == UPDATE_STATUS_SUCCEEDED:
-                # If the update_fcn returns true, then it performed some kind of work.
-                # Logging of failures is left to the update_fcn itself.
-                task_progress.succeeded += 1
+                succeeded += 1
             elif update_status == UPDATE_STATUS_FAILED:
-                task_progress.failed += 1
-            elif update_status == UPDATE_STATUS_SKIPPED:
-                task_progress.skipped += 1
+                failed += 1
             else:
                 raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
+    except Exception:
+        discard_write_buffer()
+        raise
 
-    return task_progress.update_task_state()
+    with transaction.commit_on_success():
+        flush_write_buffer()
+
+    # StudentModules deleted since the subtask was queued aren't there to rescore.
+    skipped = len(module_ids) - succeeded - failed
+    subtask_status.increment(succeeded=succeeded, failed=failed, skipped=skipped, state=SUCCESS)
+    return subtask_status
 
 
 def _get_task_id_from_xmodule_args(xmodule_instance_args):
@@ -388,16 +557,19 @@ def _get_track_function_for_task(student, xmodule_instance_args=None, source_pag
 
 
 def _get_module_instance_for_task(course_id, student, module_descriptor, xmodule_instance_args=None,
-                                  grade_bucket_type=None):
+                                  grade_bucket_type=None, field_data_cache=None):
     """
     Fetches a StudentModule instance for a given `course_id`, `student` object, and `module_descriptor`.
 
     `xmodule_instance_args` is used to provide information for creating a track function and an XQueue callback.
     These are passed, along with `grade_bucket_type`, to get_module_for_descriptor_internal, which sidesteps
     the need for a Request object when instantiating an xmodule instance.
+
+    If `field_data_cache` is None, a FieldDataCache for the student and the descriptor's descendants is loaded.
     """
     # reconstitute the problem's corresponding XModule:
-    field_data_cache = FieldDataCache.cache_for_descriptor_descendents(course_id, student, module_descriptor)
+    if field_data_cache is None:
+        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(course_id, student, module_descriptor)
 
     # get request-related tracking information from args passthrough, and supplement with task-specific
     # information:
@@ -431,11 +603,13 @@ def _get_module_instance_for_task(course_id, student, module_descriptor, xmodule
 
 
 @transaction.autocommit
-def rescore_problem_module_state(xmodule_instance_args, module_descriptor, student_module):
+def rescore_problem_module_state(xmodule_instance_args, module_descriptor, student_module, field_data_cache=None):
     '''
     Takes an XModule descriptor and a corresponding StudentModule object, and
     performs rescoring on the student's problem submission.
 
+    `field_data_cache` is passed to _get_module_instance_for_task.
+
     Throws exceptions if the rescoring is fatal and should be aborted if in a loop.
     In particular, raises UpdateProblemModuleStateError if module fails to instantiate,
     or if the module doesn't support rescoring.
@@ -447,7 +621,10 @@ def rescore_problem_module_state(xmodule_instance_args, module_descriptor, stude
     course_id = student_module.course_id
     student = student_module.student
     usage_key = student_module.module_state_key
-    instance = _get_module_instance_for_task(course_id, student, module_descriptor, xmodule_instance_args, grade_bucket_type='rescore')
+    instance = _get_module_instance_for_task(
+        course_id, student, module_descriptor, xmodule_instance_args, grade_bucket_type='rescore',
+        field_data_cache=field_data_cache,
+    )
 
     if instance is None:
         # Either permissions just changed, or someone is trying to be clever
@@ -533,6 +710,8 @@ def upload_csv_to_report_store(rows, csv_name, course_id, timestamp):
                 [row1_colum1, row1_colum2, ...],
                 ...
             ]
+            Any iterable of rows will do, including a generator, which
+            is consumed as the CSV is written.
         csv_name: Name of the resulting CSV
         course_id: ID of the course
     """
@@ -548,7 +727,38 @@ def upload_csv_to_report_store(rows, csv_name, course_id, timestamp):
     )
 
 
-def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
+def _partial_report_name(report_id, csv_name, chunk):
+    """
+    The name of the hidden file in which upload_grades_csv stores the rows of
+    `csv_name` for one chunk of students.
+    """
+    return u".{}_{}_{:06d}.csv".format(report_id, csv_name, chunk)
+
+
+def _concatenate_partial_reports(report_store, course_id, filenames):
+    """
+    Yield the rows of the partial reports `filenames`, in order, under the
+    header of the first of them that has one. Rows of a partial report with
+    a different header are rearranged to match it, with 0.0 for any grade
+    that the partial report doesn't have.
+    """
+    header = None
+    for filename in filenames:
+        rows = report_store.read_rows(course_id, filename)
+        part_header = next(rows, None)
+        if part_header is None:
+            continue
+        if header is None:
+            header = part_header
+            yield header
+        for row in rows:
+            if part_header != header:
+                values = dict(zip(part_header, row))
+                row = [values.get(column, 0.0) for column in header]
+            yield row
+
+
+def upload_grades_csv(_xmodule_instance_args, entry_id, course_id, _task_input, action_name):
     """
     For a given `course_id`, generate a grades CSV file for all students that
     are enrolled, and store using a `ReportStore`. Once created, the files can
@@ -557,15 +767,30 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     buffered, so we'll never write part of a CSV file to S3 -- i.e. any files
     that are visible in ReportStore will be complete ones.
 
-    As we start to add more CSV downloads, it will probably be worthwhile to
-    make a more general CSVDoc class instead of building out the rows like we
-    do here.
+    Students are graded in chunks of settings.GRADES_DOWNLOAD_STUDENTS_PER_CHUNK,
+    in order of id. The rows of each chunk are stored as hidden partial reports,
+    and then the progress made is checkpointed in the InstructorTask's
+    task_output. If the task is run again, e.g. because its worker was killed
+    and Celery redelivered it, it resumes after the last checkpointed chunk.
+    Once all students are graded, the partial reports are concatenated into
+    the final ones.
     """
-    start_time = time()
-    start_date = datetime.now(UTC)
+    entry = InstructorTask.objects.get(pk=entry_id) if entry_id is not None else None
+    checkpoint = {}
+    if entry is not None and entry.task_output:
+        checkpoint = json.loads(entry.task_output).get('checkpoint', {})
+        if checkpoint:
+            TASK_LOG.info(u"Task %s: resuming grade report after %d chunks", entry.task_id, checkpoint['chunks'])
+    report_id = entry.task_id if entry is not None else str(uuid4())
+
+    start_time = checkpoint.get('start_time', time())
+    start_date = datetime.fromtimestamp(start_time, UTC)
     status_interval = 100
-    enrolled_students = CourseEnrollment.users_enrolled_in(course_id)
+    enrolled_students = CourseEnrollment.users_enrolled_in(course_id).order_by('id')
     task_progress = TaskProgress(action_name, enrolled_students.count(), start_time)
+    task_progress.attempted = checkpoint.get('attempted', 0)
+    task_progress.succeeded = checkpoint.get('succeeded', 0)
+    task_progress.failed = checkpoint.get('failed', 0)
 
     course = get_course_by_id(course_id)
     cohorts_header = ['Cohort Name'] if course.is_cohorted else []
@@ -573,68 +798,103 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     experiment_partitions = get_split_user_partitions(course.user_partitions)
     group_configs_header = [u'Experiment Group ({})'.format(partition.name) for partition in experiment_partitions]
 
-    # Loop over all our students and build our CSV lists in memory
-    header = None
-    rows = []
-    err_rows = [["id", "username", "error_msg"]]
     current_step = {'step': 'Calculating Grades'}
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students):
-        # Periodically update task status (this is a cache write)
-        if task_progress.attempted % status_interval == 0:
-            task_progress.update_task_state(extra_meta=current_step)
-        task_progress.attempted += 1
+    bulk = settings.FEATURES.get('ENABLE_BULK_GRADE_REPORTS', False)
 
-        if gradeset:
-            # We were able to successfully grade this student for this course.
-            task_progress.succeeded += 1
-            if not header:
-                header = [section['label'] for section in gradeset[u'section_breakdown']]
-                rows.append(
-                    ["id", "email", "username", "grade"] + header + cohorts_header + group_configs_header
+    def grade_rows(students, err_rows):
+        """
+        Grade each of `students` in turn, and yield the rows of the grades CSV,
+        starting with its header. The rows of students who can't be graded are
+        added to `err_rows`.
+        """
+        header = None
+        for student, gradeset, err_msg in iterate_grades_for(course_id, students, bulk=bulk):
+            # Periodically update task status (this is a cache write)
+            if task_progress.attempted % status_interval == 0:
+                task_progress.update_task_state(extra_meta=current_step)
+            task_progress.attempted += 1
+
+            if gradeset:
+                # We were able to successfully grade this student for this course.
+                task_progress.succeeded += 1
+                if not header:
+                    header = [section['label'] for section in gradeset[u'section_breakdown']]
+                    yield ["id", "email", "username", "grade"] + header + cohorts_header + group_configs_header
+
+                percents = {
+                    section['label']: section.get('percent', 0.0)
+                    for section in gradeset[u'section_breakdown']
+                    if 'label' in section
+                }
+
+                cohorts_group_name = []
+                if course.is_cohorted:
+                    group = get_cohort(student, course_id, assign=False)
+                    cohorts_group_name.append(group.name if group else '')
+
+                group_configs_group_names = []
+                for partition in experiment_partitions:
+                    group = LmsPartitionService(student, course_id).get_group(partition, assign=False)
+                    group_configs_group_names.append(group.name if group else '')
+
+                # Not everybody has the same gradable items. If the item is not
+                # found in the user's gradeset, just assume it's a 0. The aggregated
+                # grades for their sections and overall course will be calculated
+                # without regard for the item they didn't have access to, so it's
+                # possible for a student to have a 0.0 show up in their row but
+                # still have 100% for the course.
+                row_percents = [percents.get(label, 0.0) for label in header]
+                yield (
+                    [student.id, student.email, student.username, gradeset['percent']] +
+                    row_percents + cohorts_group_name + group_configs_group_names
                 )
+            else:
+                # An empty gradeset means we failed to grade a student.
+                task_progress.failed += 1
+                err_rows.append([student.id, student.username, err_msg])
 
-            percents = {
-                section['label']: section.get('percent', 0.0)
-                for section in gradeset[u'section_breakdown']
-                if 'label' in section
+    report_store = ReportStore.from_config()
+    num_chunks = checkpoint.get('chunks', 0)
+    last_student_id = checkpoint.get('last_student_id', 0)
+    while True:
+        students = list(enrolled_students.filter(id__gt=last_student_id)[:settings.GRADES_DOWNLOAD_STUDENTS_PER_CHUNK])
+        if not students:
+            break
+
+        err_rows = [["id", "username", "error_msg"]]
+        report_store.store_rows(
+            course_id, _partial_report_name(report_id, 'grade_report', num_chunks), grade_rows(students, err_rows)
+        )
+        report_store.store_rows(course_id, _partial_report_name(report_id, 'grade_report_err', num_chunks), err_rows)
+        num_chunks += 1
+        last_student_id = students[-1].id
+
+        if entry is not None:
+            progress = task_progress.update_task_state(extra_meta=current_step)
+            progress['checkpoint'] = {
+                'chunks': num_chunks,
+                'last_student_id': last_student_id,
+                'start_time': start_time,
+                'attempted': task_progress.attempted,
+                'succeeded': task_progress.succeeded,
+                'failed': task_progress.failed,
             }
+            entry.task_output = InstructorTask.create_output_for_success(progress)
+            entry.save_now()
 
-            cohorts_group_name = []
-            if course.is_cohorted:
-                group = get_cohort(student, course_id, assign=False)
-                cohorts_group_name.append(group.name if group else '')
-
-            group_configs_group_names = []
-            for partition in experiment_partitions:
-                group = LmsPartitionService(student, course_id).get_group(partition, assign=False)
-                group_configs_group_names.append(group.name if group else '')
-
-            # Not everybody has the same gradable items. If the item is not
-            # found in the user's gradeset, just assume it's a 0. The aggregated
-            # grades for their sections and overall course will be calculated
-            # without regard for the item they didn't have access to, so it's
-            # possible for a student to have a 0.0 show up in their row but
-            # still have 100% for the course.
-            row_percents = [percents.get(label, 0.0) for label in header]
-            rows.append(
-                [student.id, student.email, student.username, gradeset['percent']] +
-                row_percents + cohorts_group_name + group_configs_group_names
-            )
-        else:
-            # An empty gradeset means we failed to grade a student.
-            task_progress.failed += 1
-            err_rows.append([student.id, student.username, err_msg])
-
-    # By this point, we've got the rows we're going to stuff into our CSV files.
     current_step = {'step': 'Uploading CSVs'}
     task_progress.update_task_state(extra_meta=current_step)
 
     # Perform the actual upload
-    upload_csv_to_report_store(rows, 'grade_report', course_id, start_date)
-
-    # If there are any error rows (don't count the header), write them out as well
-    if len(err_rows) > 1:
-        upload_csv_to_report_store(err_rows, 'grade_report_err', course_id, start_date)
+    for csv_name in ('grade_report', 'grade_report_err'):
+        partial_reports = [_partial_report_name(report_id, csv_name, chunk) for chunk in xrange(num_chunks)]
+        # If there are any error rows, write them out as well
+        if csv_name == 'grade_report' or task_progress.failed:
+            upload_csv_to_report_store(
+                _concatenate_partial_reports(report_store, course_id, partial_reports), csv_name, course_id, start_date
+            )
+        for partial_report in partial_reports:
+            report_store.delete(course_id, partial_report)
 
     # One last update before we close out...
     return task_progress.update_task_state(extra_meta=current_step)
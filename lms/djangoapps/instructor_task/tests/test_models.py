@@ -3,7 +3,9 @@ Tests for instructor_task/models.py.
 """
 
 from cStringIO import StringIO
+from gzip import GzipFile
 import mock
+import os
 import time
 from datetime import datetime
 from unittest import TestCase
@@ -23,8 +25,13 @@ class MockKey(object):
 
     def set_contents_from_string(self, contents, headers):  # pylint: disable=unused-argument
         """ Expected method on a Key object. """
+        self.contents = contents
         self.bucket.store_key(self)
 
+    def set_contents_from_file(self, fp, headers):  # pylint: disable=unused-argument
+        """ Expected method on a Key object. """
+        self.set_contents_from_string(fp.read(), headers)
+
     def generate_url(self, expires_in):  # pylint: disable=unused-argument
         """ Expected method on a Key object. """
         return "http://fake-edx-s3.edx.org/"
@@ -84,6 +91,15 @@ class ReportStoreTestMixin(object):
             ['new_file', 'middle_file', 'old_file']
         )
 
+    def test_store_rows_from_generator(self):
+        """
+        Test that rows can be stored as they're generated.
+        """
+        report_store = self.create_report_store()
+        report_store.store_rows(self.course_id, 'report.csv', ([u'r\xf6w', i] for i in xrange(3)))
+        self.assertEqual([link[0] for link in report_store.links_for(self.course_id)], ['report.csv'])
+        self.assertEqual(self.stored_contents(report_store, 'report.csv'), 'r\xc3\xb6w,0\r\nr\xc3\xb6w,1\r\nr\xc3\xb6w,2\r\n')
+
 
 class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase):
     """
@@ -93,6 +109,36 @@ class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase
         """ Create and return a LocalFSReportStore. """
         return LocalFSReportStore.from_config()
 
+    def stored_contents(self, report_store, filename):
+        """ Return the contents of a stored file. """
+        with open(report_store.path_to(self.course_id, filename)) as stored_file:
+            return stored_file.read()
+
+    def test_store_rows_failure(self):
+        """
+        Test that nothing is left behind if generating the rows fails.
+        """
+        def rows():
+            """ Generate a row, then fail. """
+            yield ['row']
+            raise ValueError()
+
+        report_store = self.create_report_store()
+        with self.assertRaises(ValueError):
+            report_store.store_rows(self.course_id, 'report.csv', rows())
+        self.assertEqual(os.listdir(os.path.dirname(report_store.path_to(self.course_id, 'report.csv'))), [])
+
+    def test_store_rows_mode(self):
+        """
+        Test that the stored file has the mode given by the umask, like any other new file.
+        """
+        umask = os.umask(022)
+        self.addCleanup(os.umask, umask)
+        report_store = self.create_report_store()
+        report_store.store_rows(self.course_id, 'report.csv', [['row']])
+        mode = os.stat(report_store.path_to(self.course_id, 'report.csv')).st_mode
+        self.assertEqual(mode & 0777, 0644)
+
 
 @mock.patch('instructor_task.models.S3Connection', new=MockS3Connection)
 @mock.patch('instructor_task.models.Key', new=MockKey)
@@ -105,3 +151,8 @@ class S3ReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase):
     def create_report_store(self):
         """ Create and return a S3ReportStore. """
         return S3ReportStore.from_config()
+
+    def stored_contents(self, report_store, filename):
+        """ Return the uncompressed contents of a stored file. """
+        key = next(key for key in report_store.bucket.keys if key.key.endswith('/' + filename))
+        return GzipFile(fileobj=StringIO(key.contents)).read()
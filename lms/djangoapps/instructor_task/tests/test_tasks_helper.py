@@ -7,10 +7,14 @@ Tests that CSV grade report generation works with unicode emails.
 
 """
 import ddt
+import json
 from mock import Mock, patch
+import os
 import tempfile
 import unicodecsv
 
+from django.test.utils import override_settings
+
 from xmodule.modulestore.tests.factories import CourseFactory
 from student.tests.factories import UserFactory
 from student.models import CourseEnrollment
@@ -20,11 +24,20 @@ from openedx.core.djangoapps.course_groups.models import CourseUserGroupPartitio
 from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
 import openedx.core.djangoapps.user_api.api.course_tag as course_tag_api
 from openedx.core.djangoapps.user_api.partition_schemes import RandomUserPartitionScheme
-from instructor_task.models import ReportStore
+from courseware.grades import iterate_grades_for
+from instructor_task.models import InstructorTask, ReportStore
 from instructor_task.tasks_helper import cohort_students_and_upload, upload_grades_csv, upload_students_csv
+from instructor_task.tests.factories import InstructorTaskFactory
 from instructor_task.tests.test_base import InstructorTaskCourseTestCase, TestReportMixin
 
 
+class WorkerKilled(Exception):
+    """
+    Raised to interrupt a task.
+    """
+    pass
+
+
 @ddt.ddt
 class TestInstructorGradeReport(TestReportMixin, InstructorTaskCourseTestCase):
     """
@@ -67,6 +80,74 @@ class TestInstructorGradeReport(TestReportMixin, InstructorTaskCourseTestCase):
         report_store = ReportStore.from_config()
         self.assertTrue(any('grade_report_err' in item[0] for item in report_store.links_for(self.course.id)))
 
+    @override_settings(GRADES_DOWNLOAD_STUDENTS_PER_CHUNK=1)
+    @patch('instructor_task.tasks_helper._get_current_task')
+    def test_grading_in_chunks(self, _mock_current_task):
+        """
+        Test that the partial reports of each chunk of students are
+        concatenated, and progress is checkpointed after each chunk.
+        """
+        usernames = ['student0', 'student1', 'student2']
+        for username in usernames:
+            self.create_student(username)
+        entry = InstructorTaskFactory.create(course_id=self.course.id, task_id='grades_task')
+
+        result = upload_grades_csv(None, entry.id, self.course.id, None, 'graded')
+        self.assertDictContainsSubset({'attempted': 3, 'succeeded': 3, 'failed': 0}, result)
+        checkpoint = json.loads(InstructorTask.objects.get(pk=entry.id).task_output)['checkpoint']
+        self.assertEqual(checkpoint['chunks'], 3)
+
+        report_store = ReportStore.from_config()
+        links = report_store.links_for(self.course.id)
+        self.assertEqual(len(links), 1)
+        # The partial reports have been deleted
+        report_path = report_store.path_to(self.course.id, links[0][0])
+        self.assertEqual(os.listdir(os.path.dirname(report_path)), [links[0][0]])
+        with open(report_path) as csv_file:
+            self.assertEqual([row['username'] for row in unicodecsv.DictReader(csv_file)], usernames)
+
+    @override_settings(GRADES_DOWNLOAD_STUDENTS_PER_CHUNK=1)
+    @patch('instructor_task.tasks_helper._get_current_task')
+    def test_resume_from_checkpoint(self, _mock_current_task):
+        """
+        Test that running the task again after it was interrupted resumes
+        after the last completed chunk.
+        """
+        students = [self.create_student('student0'), self.create_student('student1')]
+        entry = InstructorTaskFactory.create(course_id=self.course.id, task_id='grades_task')
+        graded = []
+
+        def iterate_grades_and_fail(course_id, chunk, bulk=False):
+            """Grade the first chunk, then fail as if the worker had been killed."""
+            if chunk[0] == students[1]:
+                raise WorkerKilled()
+            return iterate_grades_for(course_id, chunk, bulk=bulk)
+
+        def record_grading(course_id, chunk, bulk=False):
+            """Record the students graded."""
+            graded.extend(chunk)
+            return iterate_grades_for(course_id, chunk, bulk=bulk)
+
+        with patch('instructor_task.tasks_helper.iterate_grades_for', side_effect=iterate_grades_and_fail):
+            with self.assertRaises(WorkerKilled):
+                upload_grades_csv(None, entry.id, self.course.id, None, 'graded')
+        self.assertEqual(ReportStore.from_config().links_for(self.course.id), [])
+
+        with patch('instructor_task.tasks_helper.iterate_grades_for', side_effect=record_grading):
+            result = upload_grades_csv(None, entry.id, self.course.id, None, 'graded')
+        self.assertEqual(graded, [students[1]])
+        self.assertDictContainsSubset({'attempted': 2, 'succeeded': 2, 'failed': 0}, result)
+        self.assertEqual([row['username'] for row in self._report_rows()], ['student0', 'student1'])
+
+    def _report_rows(self):
+        """
+        Return the rows of the last grade report, as dicts.
+        """
+        report_store = ReportStore.from_config()
+        report_csv_filename = report_store.links_for(self.course.id)[0][0]
+        with open(report_store.path_to(self.course.id, report_csv_filename)) as csv_file:
+            return list(unicodecsv.DictReader(csv_file))
+
     def _verify_cell_data_for_user(self, username, course_id, column_header, expected_cell_content):
         """
         Verify cell data in the grades CSV for a particular user.
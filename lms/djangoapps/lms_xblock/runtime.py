@@ -8,6 +8,7 @@ import xblock.reference.plugins
 from django.conf import settings
 from django.core.urlresolvers import reverse
 from django.conf import settings
+from courseware.model_data import buffered_writes
 from lms.djangoapps.lms_xblock.models import XBlockAsidesConfig
 from openedx.core.djangoapps.user_api.api import course_tag as user_course_tag_api
 from xmodule.modulestore.django import modulestore
@@ -207,6 +208,22 @@ class LmsModuleSystem(LmsHandlerUrls, ModuleSystem):  # pylint: disable=abstract
         self.request_token = kwargs.pop('request_token', None)
         super(LmsModuleSystem, self).__init__(**kwargs)
 
+    def render(self, block, view_name, context=None):
+        """
+        Render `block`, writing the field data it changes once, when the
+        outermost render finishes.
+        """
+        with buffered_writes():
+            return super(LmsModuleSystem, self).render(block, view_name, context=context)
+
+    def handle(self, block, handler_name, request, suffix=''):
+        """
+        Run the handler of `block`, writing the field data it changes once,
+        before the response is returned.
+        """
+        with buffered_writes():
+            return super(LmsModuleSystem, self).handle(block, handler_name, request, suffix=suffix)
+
     def wrap_aside(self, block, aside, view, frag, context):
         """
         Creates a div which identifies the aside, points to the original block,
@@ -363,6 +363,7 @@ XQUEUE_INTERFACE = AUTH_TOKENS['XQUEUE_INTERFACE']
 # use the one from common.py
 MODULESTORE = convert_module_store_setting_if_needed(AUTH_TOKENS.get('MODULESTORE', MODULESTORE))
 CONTENTSTORE = AUTH_TOKENS.get('CONTENTSTORE', CONTENTSTORE)
+STATIC_CONTENT_DISK_CACHE = ENV_TOKENS.get('STATIC_CONTENT_DISK_CACHE', STATIC_CONTENT_DISK_CACHE)
 DOC_STORE_CONFIG = AUTH_TOKENS.get('DOC_STORE_CONFIG', DOC_STORE_CONFIG)
 MONGODB_LOG = AUTH_TOKENS.get('MONGODB_LOG', {})
 
@@ -436,6 +437,14 @@ VERIFY_STUDENT = AUTH_TOKENS.get("VERIFY_STUDENT", VERIFY_STUDENT)
 GRADES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
 
 GRADES_DOWNLOAD = ENV_TOKENS.get("GRADES_DOWNLOAD", GRADES_DOWNLOAD)
+GRADES_DOWNLOAD_STUDENTS_PER_CHUNK = ENV_TOKENS.get('GRADES_DOWNLOAD_STUDENTS_PER_CHUNK', GRADES_DOWNLOAD_STUDENTS_PER_CHUNK)
+ANSWER_DISTRIBUTION_PROCESSES = ENV_TOKENS.get('ANSWER_DISTRIBUTION_PROCESSES', ANSWER_DISTRIBUTION_PROCESSES)
+
+# Rescoring
+RESCORE_SUBMISSIONS_PER_TASK = ENV_TOKENS.get('RESCORE_SUBMISSIONS_PER_TASK', RESCORE_SUBMISSIONS_PER_TASK)
+
+# Metrics tab of the instructor dashboard
+CLASS_DASHBOARD_METRICS_MAX_AGE = ENV_TOKENS.get('CLASS_DASHBOARD_METRICS_MAX_AGE', CLASS_DASHBOARD_METRICS_MAX_AGE)
 
 ##### ORA2 ######
 # Prefix for uploads of example-based assessment AI classifiers
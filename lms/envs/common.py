@@ -255,6 +255,20 @@ FEATURES = {
     # only edX superusers can perform the downloads)
     'ALLOW_COURSE_STAFF_GRADE_DOWNLOADS': False,
 
+    # Store computed grades in the PersistentCourseGrade table and read them
+    # back from there until the student's scores, the course version or the
+    # student's access change, instead of walking the course tree on every
+    # grade request.
+    'ENABLE_PERSISTENT_GRADES': False,
+
+    # Grade reports grade students in chunks from a score matrix instead of
+    # walking the course tree for each student.
+    'ENABLE_BULK_GRADE_REPORTS': True,
+
+    # Load student field data on the courseware index page only when blocks
+    # first access it, instead of prefetching every row for the section.
+    'ENABLE_LAZY_FIELD_DATA_CACHE': False,
+
     'ENABLED_PAYMENT_REPORTS': [
         "refund_report",
         "itemized_purchase_report",
@@ -627,6 +641,17 @@ XBLOCK_SELECT_FUNCTION = prefer_xmodules
 
 MODULESTORE_BRANCH = 'published-only'
 CONTENTSTORE = None
+
+# Assets too big for memcache are copied to this local directory and served
+# from there, rather than being read from GridFS for every request.
+STATIC_CONTENT_DISK_CACHE = {
+    'DIRECTORY': os.path.join(tempfile.gettempdir(), 'edx_asset_cache'),
+    'MAX_SIZE': 2 * 1024 * 1024 * 1024,
+    'MAX_FILE_SIZE': 200 * 1024 * 1024,
+}
+# The size of the chunks in which assets are streamed to clients
+STATIC_CONTENT_STREAM_CHUNK_SIZE = 64 * 1024
+
 DOC_STORE_CONFIG = {
     'host': 'localhost',
     'db': 'xmodule',
@@ -649,6 +674,9 @@ MODULESTORE = {
                         'default_class': 'xmodule.hidden_module.HiddenDescriptor',
                         'fs_root': DATA_DIR,
                         'render_template': 'edxmako.shortcuts.render_to_string',
+                        # Structures and definitions never change, so keep the most recently used in memory
+                        'structure_cache_size': 50,
+                        'definition_cache_size': 5000,
                     }
                 },
                 {
@@ -659,6 +687,8 @@ MODULESTORE = {
                         'default_class': 'xmodule.hidden_module.HiddenDescriptor',
                         'fs_root': DATA_DIR,
                         'render_template': 'edxmako.shortcuts.render_to_string',
+                        # Serve the last metadata inheritance tree while edits are recomputing it
+                        'recompute_inheritance_async': True,
                     }
                 },
                 {
@@ -687,6 +717,16 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # Pre-started sandboxed Python processes which execute the code in forked
+    # children, so that each execution doesn't start Python and import numpy
+    # and scipy. 'size' is the number of idle processes kept in each LMS
+    # process, and 0 starts a process for each execution. Each process is
+    # replaced after 'max_executions'.
+    'pool': {
+        'size': 0,
+        'max_executions': 100,
+    },
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -1679,6 +1719,10 @@ FEATURES['CLASS_DASHBOARD'] = False
 if FEATURES.get('CLASS_DASHBOARD'):
     INSTALLED_APPS += ('class_dashboard',)
 
+# Seconds the Metrics tab shows the same grade and open distributions before
+# counting what students did since
+CLASS_DASHBOARD_METRICS_MAX_AGE = 15 * 60
+
 ######################## CAS authentication ###########################
 
 if FEATURES.get('AUTH_USE_CAS'):
@@ -1734,6 +1778,19 @@ GRADES_DOWNLOAD = {
     'ROOT_PATH': '/tmp/edx-s3/grades',
 }
 
+# The number of students graded between checkpoints of a grade report
+GRADES_DOWNLOAD_STUDENTS_PER_CHUNK = 500
+
+# The number of processes which count the answers of the legacy dashboard's answer
+# distribution report, one problem at a time. 1 counts them all in the web process.
+ANSWER_DISTRIBUTION_PROCESSES = 1
+
+###################### Rescoring ######################
+
+# Parameters for breaking down the submissions to a problem into rescoring subtasks.
+# Rescoring fewer submissions than this is done without subtasks.
+RESCORE_SUBMISSIONS_PER_TASK = 100
+
 
 #### PASSWORD POLICY SETTINGS #####
 PASSWORD_MIN_LENGTH = 8
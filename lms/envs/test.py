@@ -21,6 +21,7 @@ sessions. Assumes structure:
 from .common import *
 import os
 from path import path
+from xmodule.modulestore.modulestore_settings import get_mixed_stores
 from tempfile import mkdtemp
 from uuid import uuid4
 from warnings import filterwarnings, simplefilter
@@ -156,6 +157,14 @@ update_module_store_settings(
     },
 )
 
+# Don't let the structures read by one test change the Mongo call counts of the next,
+# and have edits take effect immediately
+for store in get_mixed_stores(MODULESTORE):
+    if store['NAME'] == 'split':
+        store['OPTIONS'].update({'structure_cache_size': 0, 'definition_cache_size': 0})
+    elif store['NAME'] == 'draft':
+        store['OPTIONS']['recompute_inheritance_async'] = False
+
 CONTENTSTORE = {
     'ENGINE': 'xmodule.contentstore.mongo.MongoContentStore',
     'DOC_STORE_CONFIG': {
@@ -30,6 +30,8 @@ def run():
 
     add_mimetypes()
 
+    configure_sandbox_pool()
+
     if settings.FEATURES.get('USE_CUSTOM_THEME', False):
         enable_theme()
 
@@ -65,6 +67,28 @@ def add_mimetypes():
     mimetypes.add_type('application/font-woff', '.woff')
 
 
+def configure_sandbox_pool():
+    """
+    Execute sandboxed code in a pool of pre-started sandboxed Python
+    processes, if the CODE_JAIL setting asks for one.
+    """
+    pool_settings = settings.CODE_JAIL.get('pool', {})
+    if not settings.CODE_JAIL.get('python_bin') or not pool_settings.get('size'):
+        return
+
+    from capa.safe_exec import configure_pool
+    from capa.safe_exec.safe_exec import ASSUMED_IMPORTS
+
+    configure_pool(
+        settings.CODE_JAIL['python_bin'],
+        user=settings.CODE_JAIL.get('user'),
+        size=pool_settings['size'],
+        max_executions=pool_settings.get('max_executions', 100),
+        limits=settings.CODE_JAIL.get('limits', {}),
+        preload=[module_name for __, module_name in ASSUMED_IMPORTS],
+    )
+
+
 def enable_theme():
     """
     Enable the settings for a custom theme, whose files should be stored